@@ -1,7 +1,8 @@
 """
 Master Agent (Supervisor)
 =========================
-Orchestrates the flow between specialized agents using a simple state machine.
+Orchestrates the flow between specialized agents as a LangGraph StateGraph
+(see "Supervisor Graph" below), checkpointed per session.
 
 Flow: Sales -> Verification -> Underwriting -> Sanction/Rejected
 
@@ -9,37 +10,39 @@ This is a DEMO-FIRST implementation for hackathon demonstration.
 Stability > Intelligence.
 """
 
-from typing import Dict, Any
 import asyncio
+import functools
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional, TypedDict
+
+from langgraph.graph import END, START, StateGraph
+
 from agents.sales import sales_agent_node
 from agents.verification import verification_agent_node
 from agents.underwriting import underwriting_agent_node
 from agents.sanction import sanction_agent_node
+from utils.stage_events import publish_stage_event
+from utils.agent_executor import agent_executor
+from utils.message_parser import parse_message
+from utils.checkpointer import get_checkpointer, prune_checkpoints, thread_config
+from utils.metrics import metrics
 
 
 # ============================================================================
-# DEMO MODE: Controlled Delays for Observability (DEMO-ONLY)
+# Agent Transition Events
 # ============================================================================
-# Set DEMO_MODE = False to disable all intentional delays.
-# These delays exist ONLY to make agent transitions visible during demos.
-# They do NOT affect decision logic or loan outcomes.
+# Transitions are pushed to clients over /events/{session_id} (SSE) as they
+# happen. There are no sleeps in the request path - any visual pacing of the
+# Sales -> Verification -> Underwriting -> Sanction flow happens on the client.
 # ============================================================================
-DEMO_MODE = True
-DEMO_TRANSITION_DELAY = 1.5  # seconds between agent transitions
 
-
-async def demo_delay(seconds: float = DEMO_TRANSITION_DELAY):
-    """
-    DEMO-ONLY: Add intentional delay between agent transitions.
-    
-    This enables demo observers to visually track which agent is active.
-    Does not affect decision logic or outcomes in any way.
-    
-    Args:
-        seconds: Delay duration (default: DEMO_TRANSITION_DELAY)
-    """
-    if DEMO_MODE:
-        await asyncio.sleep(seconds)
+def _transition(state: Dict, stage: str, agent_name: str, session_id: Optional[str]):
+    """Set the active stage/agent and publish an event if it changed."""
+    previous = (state.get("stage"), state.get("active_agent"))
+    state["stage"] = stage
+    state["active_agent"] = agent_name
+    if previous != (stage, agent_name):
+        publish_stage_event(session_id, stage, agent_name, previous_agent=previous[1])
 
 # ============================================================================
 # LangGraph State Definition (Simple Dict)
@@ -84,11 +87,8 @@ def determine_next_stage(state: Dict, user_message: str) -> str:
     - After intent captured -> "verification"
     - After KYC verified -> "underwriting"
     - After underwriting -> "sanction" or "rejected"
-    
-    TODO: Integrate with actual LangGraph routing when ready.
     """
     current_stage = state.get("stage", "sales")
-    message_lower = user_message.lower()
     
     print(f"[SUPERVISOR] Current stage: {current_stage}")
     print(f"[SUPERVISOR] User message: {user_message[:50]}...")
@@ -96,10 +96,11 @@ def determine_next_stage(state: Dict, user_message: str) -> str:
     
     if current_stage == "sales":
         # Move to verification when user expresses loan intent
-        if any(keyword in message_lower for keyword in ["loan", "lakh", "amount", "borrow", "need", "want", "rupees"]):
+        parsed = parse_message(user_message)
+        if parsed.intent:
             print("[SUPERVISOR] Loan intent detected -> Moving to VERIFICATION")
             # Extract loan amount if present
-            _extract_loan_amount(state, user_message)
+            _extract_loan_amount(state, parsed)
             return "verification"
         return "sales"
     
@@ -109,8 +110,7 @@ def determine_next_stage(state: Dict, user_message: str) -> str:
         # If attention is required (e.g., PAN format issue), wait for user acknowledgment
         # ================================================================
         if state.get("verification_attention_required"):
-            acknowledge_keywords = ["continue", "proceed", "okay", "ok", "yes", "go ahead", "confirm"]
-            if any(keyword in message_lower for keyword in acknowledge_keywords):
+            if parse_message(user_message).acknowledged:
                 # User acknowledged - clear flag and proceed
                 state["verification_attention_required"] = False
                 state["verification_acknowledged"] = True
@@ -126,7 +126,7 @@ def determine_next_stage(state: Dict, user_message: str) -> str:
         if state.get("verified") == True and state.get("verification_status") == "verified":
             print("[SUPERVISOR] Verification COMPLETE (verified=True) -> Moving to UNDERWRITING")
             # Extract salary if present in this or previous messages
-            _extract_salary(state, user_message)
+            _extract_salary(state, parse_message(user_message))
             return "underwriting"
         
         # If not verified, ALWAYS stay in verification stage
@@ -157,69 +157,215 @@ def determine_next_stage(state: Dict, user_message: str) -> str:
     return current_stage
 
 
-def _extract_loan_amount(state: Dict, message: str):
-    """Extract loan amount from user message and store in state."""
-    import re
-    # Match patterns like "100000", "1,00,000", "1 lakh", "50000"
-    message_lower = message.lower()
-    
-    # Try to extract number
-    numbers = re.findall(r'[\d,]+', message)
-    for num_str in numbers:
-        try:
-            num = int(num_str.replace(',', ''))
-            if num >= 1000:  # Minimum loan amount
-                state["loan_amount"] = num
-                print(f"[SUPERVISOR] Extracted loan_amount: {num}")
-                return
-        except:
-            pass
+def _extract_loan_amount(state: Dict, parsed):
+    """Store the loan amount parsed from the user message ("1,00,000", "5 lakh", "2.5 crore")."""
+    if parsed.amount is not None:
+        state["loan_amount"] = parsed.amount
+        print(f"[SUPERVISOR] Extracted loan_amount: {parsed.amount}")
+
+
+def _extract_salary(state: Dict, parsed):
+    """Store the salary parsed from the user message ("salary is 50,000", else any plausible number)."""
+    if parsed.salary is not None:
+        state["salary"] = parsed.salary
+        suffix = "" if parsed.salary_labelled else " (fallback)"
+        print(f"[SUPERVISOR] Extracted salary{suffix}: {parsed.salary}")
+
+
+# ============================================================================
+# Supervisor Graph
+# ============================================================================
+# One chat turn = one run of a compiled LangGraph StateGraph:
+#
+#   START -> route -+-> sales ---------------------------> END
+#                   +-> verification --------------------> END
+#                   +-> underwriting -+-> sanction ------> END
+#                   |                 +-> rejected ------> END
+#                   |                 +-----------------> END (no decision)
+#                   +-> sanction / rejected (terminal) --> END
+#                   +-> END (orchestration paused)
+#
+# Turns are checkpointed per session (thread_id = session_id) by the
+# checkpointer from utils/checkpointer.py. Every node goes through _traced(),
+# the graph-level hook for tracing and timing.
+# ============================================================================
+
+PAUSED_REPLY = (
+    "⚠️ Verification Notice\n\n"
+    "The PAN details or uploaded document do not match the expected format.\n\n"
+    "This demo will continue, but in production this would require correction "
+    "or manual review.\n\n"
+    "Please reply with **Continue** to proceed."
+)
+ACKNOWLEDGED_REPLY = """✅ Acknowledgment received.
+
+Thank you for confirming. Your KYC details have been recorded.
+Proceeding to evaluate your loan eligibility..."""
+REJECTED_REPLY = "We regret to inform you that your loan application could not be approved at this time based on our eligibility criteria. Please contact our support team for more information."
+TERMINAL_REPLY = "Thank you for your interest. Is there anything else I can help you with?"
+DEFAULT_REPLY = "How can I assist you today?"
+
+
+class TurnState(TypedDict, total=False):
+    """Graph state for one chat turn."""
+    session: Dict[str, Any]         # conversation state (mutated by the agents)
+    user_message: str
+    session_id: Optional[str]
+    next_stage: str                 # stage chosen by the router for this turn
+    reply: str
+    halt_agents: bool
+    response_stage: Optional[str]   # overrides session["stage"] in the response
+
+
+def _traced(name: str, node: Callable[[TurnState], Awaitable[Dict[str, Any]]]):
+    """Wrap a graph node with timing/tracing (wall time per node, see /metrics)."""
+    @functools.wraps(node)
+    async def wrapper(turn: TurnState) -> Dict[str, Any]:
+        with metrics.timed("graph_node", name, cpu=False):
+            return await node(turn)
+    return wrapper
+
+
+async def _run_agent(turn: TurnState, stage: str, agent_func) -> Dict[str, Any]:
+    """Activate a stage, run its agent on the executor and sync its outputs into the session."""
+    state = turn["session"]
+    _transition(state, stage, STAGE_TO_AGENT[stage][0], turn.get("session_id"))
+    print(f"[SUPERVISOR] Routing to: {STAGE_TO_AGENT[stage][0]}")
+    agent_response = await agent_executor.run(stage, agent_func, state, turn["user_message"])
     
-    # Check for "lakh" mentions
-    lakh_match = re.search(r'(\d+)\s*lakh', message_lower)
-    if lakh_match:
-        state["loan_amount"] = int(lakh_match.group(1)) * 100000
-        print(f"[SUPERVISOR] Extracted loan_amount: {state['loan_amount']}")
+    if "underwriting_decision" in agent_response:
+        state["underwriting_decision"] = agent_response["underwriting_decision"]
+    # CRITICAL: Sync verification status from agent response to state
+    if "verified" in agent_response:
+        state["verified"] = agent_response["verified"]
+        print(f"[SUPERVISOR] Synced verified={state['verified']} from agent response")
+    return agent_response
 
 
-def _extract_salary(state: Dict, message: str):
-    """Extract salary from user message and store in state."""
-    import re
-    message_lower = message.lower()
+async def _route_node(turn: TurnState) -> Dict[str, Any]:
+    """
+    Choose this turn's stage.
     
-    # Match patterns like "salary is 50000", "monthly salary 40000", "earn 30000"
-    salary_match = re.search(r'(?:salary|earn|income|monthly)\s*(?:is|of)?\s*(\d[\d,]*)', message_lower)
-    if salary_match:
-        try:
-            salary = int(salary_match.group(1).replace(',', ''))
-            state["salary"] = salary
-            print(f"[SUPERVISOR] Extracted salary: {salary}")
-            return
-        except:
-            pass
+    ORCHESTRATION CONTROL: while orchestration_paused is set, no agent runs
+    until the user acknowledges; acknowledging resumes at underwriting.
+    """
+    state = turn["session"]
+    user_message = turn["user_message"]
     
-    # Fallback: look for any number that could be salary
-    numbers = re.findall(r'[\d,]+', message)
-    for num_str in numbers:
-        try:
-            num = int(num_str.replace(',', ''))
-            if 5000 <= num <= 500000:  # Reasonable salary range
-                state["salary"] = num
-                print(f"[SUPERVISOR] Extracted salary (fallback): {num}")
-                return
-        except:
-            pass
-
-
-async def supervisor_node(state: Dict, user_message: str) -> Dict[str, Any]:
+    if state.get("orchestration_paused"):
+        print("[MASTER] Orchestration paused. Blocking downstream agents.")
+        if not parse_message(user_message).acknowledged:
+            print("[SUPERVISOR] ORCHESTRATION PAUSED - waiting for user acknowledgment")
+            return {
+                "next_stage": "paused",
+                "reply": PAUSED_REPLY,
+                "halt_agents": True,
+                "response_stage": "verification",
+            }
+        print("[SUPERVISOR] User acknowledged - clearing orchestration pause")
+        state["orchestration_paused"] = False
+        state["verification_attention_required"] = False
+        state["next_allowed_action"] = None
+        state["verification_acknowledged"] = True
+        return {"next_stage": "underwriting"}
+    
+    return {"next_stage": determine_next_stage(state, user_message)}
+
+
+def _agent_node(stage: str):
+    async def node(turn: TurnState) -> Dict[str, Any]:
+        agent_response = await _run_agent(turn, stage, STAGE_TO_AGENT[stage][1])
+        if turn["session"].get("orchestration_paused"):
+            print("[SUPERVISOR] Agent set orchestration_paused - halting further processing")
+            return {"reply": agent_response.get("reply", "Verification requires attention."), "halt_agents": True}
+        return {"reply": agent_response.get("reply", DEFAULT_REPLY)}
+    return node
+
+
+async def _underwriting_node(turn: TurnState) -> Dict[str, Any]:
+    state = turn["session"]
+    agent_response = await _run_agent(turn, "underwriting", underwriting_agent_node)
+    default_reply = DEFAULT_REPLY
+    if state.get("verification_acknowledged"):
+        # User just acknowledged a verification warning - confirm it
+        default_reply = ACKNOWLEDGED_REPLY
+        state["verification_acknowledged"] = False
+    return {"reply": agent_response.get("reply", default_reply)}
+
+
+async def _sanction_node(turn: TurnState) -> Dict[str, Any]:
+    agent_response = await _run_agent(turn, "sanction", sanction_agent_node)
+    return {"reply": agent_response.get("reply", turn.get("reply", DEFAULT_REPLY))}
+
+
+async def _rejected_node(turn: TurnState) -> Dict[str, Any]:
+    _transition(turn["session"], "rejected", STAGE_TO_AGENT["rejected"][0], turn.get("session_id"))
+    # Rejected in this turn vs. a message after an earlier rejection
+    return {"reply": REJECTED_REPLY if turn.get("next_stage") == "underwriting" else TERMINAL_REPLY}
+
+
+def _after_route(turn: TurnState) -> str:
+    stage = turn["next_stage"]
+    return stage if stage in STAGE_TO_AGENT else END
+
+
+def _after_underwriting(turn: TurnState) -> str:
+    """Auto-transition to sanction / rejected once underwriting has decided."""
+    decision = turn["session"].get("underwriting_decision")
+    if decision == "approved":
+        print("[SUPERVISOR] Loan APPROVED -> Moving to SANCTION")
+        return "sanction"
+    if decision == "rejected":
+        print("[SUPERVISOR] Loan REJECTED -> Moving to REJECTED")
+        return "rejected"
+    return END
+
+
+def build_supervisor_graph() -> StateGraph:
+    """Sales -> Verification -> Underwriting -> Sanction/Rejected as a StateGraph (uncompiled)."""
+    builder = StateGraph(TurnState)
+    builder.add_node("route", _traced("route", _route_node))
+    builder.add_node("sales", _traced("sales", _agent_node("sales")))
+    builder.add_node("verification", _traced("verification", _agent_node("verification")))
+    builder.add_node("underwriting", _traced("underwriting", _underwriting_node))
+    builder.add_node("sanction", _traced("sanction", _sanction_node))
+    builder.add_node("rejected", _traced("rejected", _rejected_node))
+    
+    builder.add_edge(START, "route")
+    builder.add_conditional_edges("route", _after_route, [*STAGE_TO_AGENT, END])
+    builder.add_conditional_edges("underwriting", _after_underwriting, ["sanction", "rejected", END])
+    for stage in ("sales", "verification", "sanction", "rejected"):
+        builder.add_edge(stage, END)
+    return builder
+
+
+_supervisor_builder = build_supervisor_graph()
+_compiled_graphs: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+async def get_supervisor_graph():
+    """Compiled supervisor graph bound to this event loop's checkpointer."""
+    loop = asyncio.get_running_loop()
+    graph = _compiled_graphs.get(loop)
+    if graph is None:
+        graph = _supervisor_builder.compile(checkpointer=await get_checkpointer())
+        _compiled_graphs[loop] = graph
+    return graph
+
+
+async def supervisor_node(state: Dict, user_message: str, session_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Main supervisor function that orchestrates the agent workflow.
     
-    This is the entry point called from the /chat endpoint.
+    This is the entry point called from the /chat endpoint. Runs one turn of
+    the supervisor graph and writes the resulting conversation state back
+    into `state`.
     
     Args:
         state: Current conversation state
         user_message: User's input message
+        session_id: Session to publish agent-transition events for (and the
+                    checkpoint thread id)
     
     Returns:
         Dict with: reply, stage, active_agent, halt_agents
@@ -229,171 +375,51 @@ async def supervisor_node(state: Dict, user_message: str) -> Dict[str, Any]:
     - Always returns valid response
     - Clear logging for mentor visibility
     
-    ORCHESTRATION CONTROL:
-    - Checks orchestration_paused flag BEFORE any routing
-    - No agents execute while paused
-    - Only user acknowledgment clears pause
+    CONCURRENCY:
+    - Agent nodes are blocking (Gemini, FPDF, PAN lookups), so each one runs
+      on the bounded agent executor instead of the event loop
     """
+    session_id = session_id or state.get("session_id")
+    if session_id:
+        # Agents key per-application artifacts (the sanction letter job) on it
+        state["session_id"] = session_id
+    
     try:
         print("\n" + "="*60)
         print("[SUPERVISOR] Processing message...")
         print("="*60)
         
-        message_lower = user_message.lower().strip()
-        
-        # ================================================================
-        # CRITICAL: Orchestration Pause Check (BEFORE any routing)
-        # STEP 4: When paused, NO agents may execute until user acknowledges
-        # ================================================================
-        if state.get("orchestration_paused"):
-            print("[MASTER] Orchestration paused. Blocking downstream agents.")
-            acknowledge_keywords = ["continue", "proceed", "okay", "ok", "yes", "go ahead", "confirm"]
-            
-            if any(keyword in message_lower for keyword in acknowledge_keywords):
-                # User acknowledged - clear all pause flags
-                print("[SUPERVISOR] User acknowledged - clearing orchestration pause")
-                state["orchestration_paused"] = False
-                state["verification_attention_required"] = False
-                state["next_allowed_action"] = None
-                state["verification_acknowledged"] = True
-                
-                # Now proceed to underwriting
-                state["stage"] = "underwriting"
-                state["active_agent"] = "UnderwritingAgent"
-                
-                # DEMO-ONLY: Delay before underwriting for visibility
-                await demo_delay()
-                
-                # Run underwriting agent
-                agent_response = underwriting_agent_node(state, user_message)
-                
-                # Handle auto-transition to sanction if approved
-                if state.get("underwriting_decision") == "approved":
-                    state["stage"] = "sanction"
-                    state["active_agent"] = "SanctionAgent"
-                    
-                    # DEMO-ONLY: Delay before sanction for visibility
-                    await demo_delay()
-                    
-                    sanction_response = sanction_agent_node(state, user_message)
-                    return {
-                        "reply": sanction_response.get("reply", agent_response.get("reply")),
-                        "stage": state["stage"],
-                        "active_agent": state["active_agent"],
-                        "halt_agents": False
-                    }
-                
-                return {
-                    "reply": agent_response.get("reply", "Proceeding with loan evaluation..."),
-                    "stage": state["stage"],
-                    "active_agent": state["active_agent"],
-                    "halt_agents": False
-                }
-            else:
-                # Still paused - return halt message, do NOT run any agents
-                print("[SUPERVISOR] ORCHESTRATION PAUSED - waiting for user acknowledgment")
-                return {
-                    "reply": (
-                        "⚠️ Verification Notice\n\n"
-                        "The PAN details or uploaded document do not match the expected format.\n\n"
-                        "This demo will continue, but in production this would require correction "
-                        "or manual review.\n\n"
-                        "Please reply with **Continue** to proceed."
-                    ),
-                    "stage": "verification",
-                    "active_agent": "VerificationAgent",
-                    "halt_agents": True
-                }
-        
-        # ================================================================
-        # Normal Routing (only when NOT paused)
-        # ================================================================
-        
-        # Determine the next stage
-        next_stage = determine_next_stage(state, user_message)
-        state["stage"] = next_stage
-        
-        # Get the appropriate agent
-        agent_name, agent_func = STAGE_TO_AGENT.get(next_stage, ("SalesAgent", sales_agent_node))
-        state["active_agent"] = agent_name
-        
-        print(f"[SUPERVISOR] Routing to: {agent_name}")
-        
-        # Call the agent to get response
-        if agent_func:
-            agent_response = agent_func(state, user_message)
+        graph = await get_supervisor_graph()
+        turn_input = {"session": state, "user_message": user_message, "session_id": session_id,
+                      "reply": DEFAULT_REPLY, "halt_agents": False, "response_stage": None}
+        if session_id and graph.checkpointer:
+            # One checkpoint per turn, written when the turn completes; only
+            # the latest is kept
+            turn = await graph.ainvoke(turn_input, config=thread_config(session_id), durability="exit")
+            await prune_checkpoints(session_id)
         else:
-            # Fallback for terminal states without agent
-            agent_response = {
-                "reply": "Thank you for your interest. Is there anything else I can help you with?",
-                "underwriting_decision": state.get("underwriting_decision")
-            }
-        
-        # Check if orchestration was paused by the agent we just called
-        if state.get("orchestration_paused"):
-            print("[SUPERVISOR] Agent set orchestration_paused - halting further processing")
-            return {
-                "reply": agent_response.get("reply", "Verification requires attention."),
-                "stage": state["stage"],
-                "active_agent": state["active_agent"],
-                "halt_agents": True
-            }
-        
-        # Extract reply from agent response
-        reply = agent_response.get("reply", "How can I assist you today?")
-        
-        # Handle acknowledgment confirmation - if user just acknowledged, provide confirmation
-        if state.get("verification_acknowledged") and next_stage == "underwriting":
-            reply = """✅ Acknowledgment received.
-
-Thank you for confirming. Your KYC details have been recorded.
-Proceeding to evaluate your loan eligibility..."""
-            # Clear the acknowledged flag after using it
-            state["verification_acknowledged"] = False
-            
-            # DEMO-ONLY: Delay before underwriting for visibility
-            await demo_delay()
-            
-            # Now run underwriting immediately
-            agent_response = underwriting_agent_node(state, user_message)
-            reply = agent_response.get("reply", reply)
-        
-        # Update state with any agent-provided data
-        if "underwriting_decision" in agent_response:
-            state["underwriting_decision"] = agent_response["underwriting_decision"]
+            turn = await graph.ainvoke(turn_input)
         
-        # CRITICAL: Sync verification status from agent response to state
-        if "verified" in agent_response:
-            state["verified"] = agent_response["verified"]
-            print(f"[SUPERVISOR] Synced verified={state['verified']} from agent response")
+        if turn["session"] is not state:
+            state.clear()
+            state.update(turn["session"])
         
-        # Check if we need to auto-transition after underwriting
-        if next_stage == "underwriting" and state.get("underwriting_decision"):
-            # Re-route based on decision
-            final_stage = determine_next_stage(state, user_message)
-            state["stage"] = final_stage
-            final_agent_name = STAGE_TO_AGENT.get(final_stage, ("SalesAgent", None))[0]
-            state["active_agent"] = final_agent_name
-            
-            # Get sanction/rejection message
-            if final_stage == "sanction":
-                # DEMO-ONLY: Delay before sanction for visibility
-                await demo_delay()
-                
-                sanction_response = sanction_agent_node(state, user_message)
-                reply = sanction_response.get("reply", reply)
-            elif final_stage == "rejected":
-                reply = "We regret to inform you that your loan application could not be approved at this time based on our eligibility criteria. Please contact our support team for more information."
+        if turn.get("response_stage"):
+            # Paused: report verification without touching the stored stage
+            stage, active_agent = turn["response_stage"], STAGE_TO_AGENT[turn["response_stage"]][0]
+        else:
+            stage, active_agent = state["stage"], state["active_agent"]
         
-        print(f"[SUPERVISOR] Final stage: {state['stage']}")
-        print(f"[SUPERVISOR] Active agent: {state['active_agent']}")
-        print(f"[SUPERVISOR] Reply: {reply[:50]}...")
+        print(f"[SUPERVISOR] Final stage: {stage}")
+        print(f"[SUPERVISOR] Active agent: {active_agent}")
+        print(f"[SUPERVISOR] Reply: {turn['reply'][:50]}...")
         print("="*60 + "\n")
         
         return {
-            "reply": reply,
-            "stage": state["stage"],
-            "active_agent": state["active_agent"]
+            "reply": turn["reply"],
+            "stage": stage,
+            "active_agent": active_agent,
+            "halt_agents": turn.get("halt_agents", False),
         }
     
     except Exception as e:
@@ -407,67 +433,10 @@ Proceeding to evaluate your loan eligibility..."""
 
 
 # ============================================================================
-# Underwriting Rules Engine (TODO: Move to rules/underwriting_rules.py)
+# Underwriting Rules Engine
 # ============================================================================
+# Policy lives in rules/policy.json (compiled by rules/engine.py); the
+# credit bureau / offer mart rules are in rules/underwriting_rules.py.
+# Re-exported here for callers that imported it from the supervisor.
 
-async def run_underwriting(customer_id: str, loan_details: dict):
-    """
-    Underwriting rules engine.
-    
-    TODO: This is placeholder code for the underwriting rules.
-    TODO: Integrate with services/credit_bureau.py and services/offer_mart.py
-    TODO: Move to rules/underwriting_rules.py when services are implemented.
-    """
-    # TODO: Import these when services are created
-    # from backend.services.credit_bureau import fetch_credit_score
-    # from backend.services.offer_mart import get_preapproved_limit
-
-    loan_amount = loan_details.get("amount", 0)
-    salary = loan_details.get("salary")
-    expected_emi = loan_details.get("expected_emi")
-
-    # TODO: Replace with actual service calls
-    credit_score = 750  # Mock: fetch_credit_score(customer_id)
-    preapproved_limit = 100000  # Mock: get_preapproved_limit(customer_id)
-
-    # Rule 3: Reject if credit score < 700
-    if credit_score < 700:
-        return {
-            "status": "rejected",
-            "reason": "Low credit score",
-            "credit_score": credit_score
-        }
-
-    # Rule 1: Instant approval if loan <= preapproved limit
-    if loan_amount <= preapproved_limit:
-        return {
-            "status": "approved",
-            "approval_type": "instant",
-            "credit_score": credit_score
-        }
-
-    # Rule 2: Salary slip required if loan <= 2x preapproved limit
-    if loan_amount <= 2 * preapproved_limit:
-        if not salary or not expected_emi:
-            return {
-                "status": "salary_slip_required",
-                "message": "Please upload your latest salary slip"
-            }
-
-        if expected_emi <= 0.5 * salary:
-            return {
-                "status": "approved",
-                "approval_type": "salary_verified",
-                "credit_score": credit_score
-            }
-
-        return {
-            "status": "rejected",
-            "reason": "EMI exceeds 50% of salary"
-        }
-
-    # Rule 3: Loan amount too high
-    return {
-        "status": "rejected",
-        "reason": "Loan amount exceeds eligibility"
-    }
+from rules.underwriting_rules import run_underwriting  # noqa: E402,F401
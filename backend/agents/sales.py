@@ -1,59 +1,47 @@
-import os
-import google.generativeai as genai
+from typing import Optional
 
-# Load .env file if python-dotenv is available
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass
-
-# Configure Gemini
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+from utils.llm_client import llm_registry
 
 # Sales Agent
 # Handles user conversation and intent extraction using Gemini
 
-def sales_agent_node(state):
+SALES_MODEL = "gemini-1.5-flash"
+
+SALES_SYSTEM_PROMPT = (
+    "You are a helpful and professional sales agent for a loan company. "
+    "Your goal is to assist users in understanding loan options, gathering necessary information, "
+    "and guiding them through the loan application process."
+)
+
+SALES_FALLBACK_REPLY = "I'm sorry, I encountered an error. Please try again later."
+
+
+def sales_agent_node(state, user_message: Optional[str] = None):
     """
     Handles user conversation and intent extraction using Gemini.
-    Enriches state with current agent and stage (NO logic change).
+    Enriches state with the current agent; the supervisor owns `stage`.
+
+    The model client is shared across requests via llm_registry.
     """
 
     # 🔹 Agent metadata for orchestration visibility
     state["current_agent"] = "SalesAgent"
-    state["stage"] = "SALES"
 
-    system_prompt = (
-        "You are a helpful and professional sales agent for a loan company. "
-        "Your goal is to assist users in understanding loan options, gathering necessary information, "
-        "and guiding them through the loan application process."
-    )
-
-    user_message = state.get("user_message", "")
+    if user_message is None:
+        user_message = state.get("user_message", "")
 
     try:
-        model = genai.GenerativeModel(
-            model_name="gemini-1.5-flash",
-            system_instruction=system_prompt
-        )
-
-        response = model.generate_content(user_message)
+        if not llm_registry.enabled:
+            raise RuntimeError("LLM backend unavailable")
 
-        reply = response.text
-
-        state.setdefault("messages", []).append(
-            {"role": "assistant", "content": reply}
+        reply = llm_registry.generate(
+            user_message,
+            model_name=SALES_MODEL,
+            system_instruction=SALES_SYSTEM_PROMPT,
         )
 
-        return state
+        return {"reply": reply}
 
     except Exception as e:
-        state.setdefault("messages", []).append(
-            {
-                "role": "assistant",
-                "content": "I'm sorry, I encountered an error. Please try again later."
-            }
-        )
         state["error"] = str(e)
-        return state
+        return {"reply": SALES_FALLBACK_REPLY}
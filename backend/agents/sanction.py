@@ -3,41 +3,38 @@ Sanction Letter Generator
 =========================
 Final stage - Generates PDF sanction letter for approved loans.
 
-Uses FPDF2 for PDF generation.
+Letters are rendered in the background (services/letter_jobs.py) with FPDF2
+(template-cached, services/sanction_letter.py).
 Implements policy-based automated approval vs human-in-the-loop gating.
 """
 
-import os
 from datetime import datetime
 from typing import Dict, Any
-from fpdf import FPDF
 from utils.crypto_utils import decrypt_data
 from utils.decision_rationale import generate_decision_rationale
+from utils.stage_events import emit_turn_event, is_streaming_turn
+from utils.agent_executor import agent_executor
+from rules.engine import rules_engine
+from models import LetterStatus
+from services.letter_jobs import get_letter_queue
+from services.sanction_letter import letter_name, write_sanction_letter
 
 
 # =============================================================================
 # POLICY CONFIGURATION
 # =============================================================================
-# Maximum loan amount eligible for automated approval (no human review required)
-# Loans above this threshold require human-in-the-loop review
-AUTO_APPROVAL_LIMIT = 50000  # Rs. 50,000
-
-
-# Ensure the generated folder exists
-GENERATED_DIR = os.path.join(os.path.dirname(__file__), "..", "generated")
-
-
-def ensure_generated_dir():
-    """Create the generated directory if it doesn't exist."""
-    if not os.path.exists(GENERATED_DIR):
-        os.makedirs(GENERATED_DIR)
-        print(f"[SANCTION AGENT] Created directory: {GENERATED_DIR}")
+# The automated approval limit (loans above it need human-in-the-loop review)
+# lives in the rules engine policy - see rules/policy.json, "sanction" ruleset.
 
 
 def generate_sanction_letter(data: dict) -> dict:
     """
     Generate a PDF sanction letter for approved loans.
     
+    The static layout is pre-rendered once; only the per-customer fields are
+    filled in, and the PDF is stored in the content-addressed artifact store
+    (see services/sanction_letter.py, services/artifact_store.py).
+    
     Args:
         data: Dict containing loan details:
             - session_id: str
@@ -53,158 +50,12 @@ def generate_sanction_letter(data: dict) -> dict:
             - file: filename of generated PDF
     """
     try:
-        ensure_generated_dir()
-        
-        # Extract data with defaults
-        session_id = data.get("session_id", "unknown")
-        customer_name = data.get("customer_name", "Valued Customer")
-        loan_amount = data.get("loan_amount", 100000)
-        tenure = data.get("tenure", 24)
-        emi = data.get("emi", 4650.0)
-        interest_rate = data.get("interest_rate", 10.5)
-        
-        # Generate filename
-        filename = f"sanction_{session_id}.pdf"
-        filepath = os.path.join(GENERATED_DIR, filename)
-        
-        # Current date for the letter
-        approval_date = datetime.now().strftime("%d %B %Y")
-        
-        print(f"[SANCTION AGENT] Generating PDF: {filename}")
-        
-        # Create PDF
-        pdf = FPDF()
-        pdf.add_page()
-        
-        # =====================================================================
-        # HEADER
-        # =====================================================================
-        pdf.set_font("Helvetica", "B", 20)
-        pdf.cell(0, 15, "LOANOPS FINANCIAL SERVICES", ln=True, align="C")
-        
-        pdf.set_font("Helvetica", "", 10)
-        pdf.cell(0, 6, "Registered NBFC | CIN: U65100MH2024PLC123456", ln=True, align="C")
-        pdf.cell(0, 6, "Email: support@loanops.ai | Phone: 1800-XXX-XXXX", ln=True, align="C")
-        
-        pdf.ln(10)
-        
-        # Horizontal line
-        pdf.set_draw_color(0, 0, 0)
-        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-        pdf.ln(5)
-        
-        # =====================================================================
-        # TITLE
-        # =====================================================================
-        pdf.set_font("Helvetica", "B", 16)
-        pdf.cell(0, 12, "PERSONAL LOAN SANCTION LETTER", ln=True, align="C")
-        pdf.ln(5)
-        
-        # =====================================================================
-        # DATE AND REFERENCE
-        # =====================================================================
-        pdf.set_font("Helvetica", "", 11)
-        pdf.cell(0, 8, f"Date: {approval_date}", ln=True)
-        pdf.cell(0, 8, f"Reference No: LOA/{session_id.upper()}/{datetime.now().strftime('%Y%m%d')}", ln=True)
-        pdf.ln(5)
-        
-        # =====================================================================
-        # SALUTATION
-        # =====================================================================
-        pdf.set_font("Helvetica", "", 11)
-        pdf.cell(0, 8, f"Dear {customer_name},", ln=True)
-        pdf.ln(3)
-        
-        # =====================================================================
-        # BODY TEXT
-        # =====================================================================
-        pdf.set_font("Helvetica", "", 11)
-        body_text = (
-            "We are pleased to inform you that your Personal Loan application has been "
-            "approved. Please find the details of your sanctioned loan below:"
-        )
-        pdf.multi_cell(0, 7, body_text)
-        pdf.ln(8)
+        print(f"[SANCTION AGENT] Generating PDF: sanction_{data.get('session_id', 'unknown')}.pdf")
         
-        # =====================================================================
-        # LOAN DETAILS TABLE
-        # =====================================================================
-        pdf.set_font("Helvetica", "B", 12)
-        pdf.cell(0, 10, "LOAN DETAILS", ln=True)
+        result = write_sanction_letter(data)
         
-        pdf.set_font("Helvetica", "", 11)
-        
-        # Table with loan details
-        col_width = 95
-        row_height = 10
-        
-        # Draw table rows
-        details_table = [
-            ("Applicant Name", customer_name),
-            ("Sanctioned Loan Amount", f"Rs. {loan_amount:,}"),
-            ("Rate of Interest", f"{interest_rate}% per annum"),
-            ("Loan Tenure", f"{tenure} months"),
-            ("Equated Monthly Instalment (EMI)", f"Rs. {emi:,.2f}"),
-            ("Processing Fee", "Rs. 1,000 + GST"),
-            ("Disbursement Mode", "Direct Bank Transfer"),
-        ]
-        
-        for label, value in details_table:
-            pdf.set_font("Helvetica", "B", 10)
-            pdf.cell(col_width, row_height, label, border=1)
-            pdf.set_font("Helvetica", "", 10)
-            pdf.cell(col_width, row_height, str(value), border=1, ln=True)
-        
-        pdf.ln(10)
-        
-        # =====================================================================
-        # TERMS AND CONDITIONS
-        # =====================================================================
-        pdf.set_font("Helvetica", "B", 12)
-        pdf.cell(0, 10, "TERMS AND CONDITIONS", ln=True)
-        
-        pdf.set_font("Helvetica", "", 10)
-        terms = [
-            "1. This sanction is valid for 30 days from the date of issue.",
-            "2. Loan disbursement is subject to document verification.",
-            "3. Prepayment charges may apply as per RBI guidelines.",
-            "4. EMI payment via auto-debit/NACH mandate is mandatory.",
-            "5. The borrower agrees to all terms in the loan agreement.",
-        ]
-        
-        for term in terms:
-            pdf.cell(0, 7, term, ln=True)
-        
-        pdf.ln(10)
-        
-        # =====================================================================
-        # SIGNATURE SECTION
-        # =====================================================================
-        pdf.cell(0, 8, "For LoanOps Financial Services,", ln=True)
-        pdf.ln(15)
-        pdf.set_font("Helvetica", "B", 11)
-        pdf.cell(0, 8, "Authorized Signatory", ln=True)
-        
-        pdf.ln(10)
-        
-        # =====================================================================
-        # FOOTER
-        # =====================================================================
-        pdf.set_font("Helvetica", "I", 9)
-        pdf.set_text_color(100, 100, 100)
-        pdf.cell(0, 6, "This is a system-generated sanction letter and does not require a physical signature.", ln=True, align="C")
-        pdf.cell(0, 6, "For any queries, please contact our customer support.", ln=True, align="C")
-        
-        # Save PDF
-        pdf.output(filepath)
-        
-        print(f"[SANCTION AGENT] PDF generated successfully: {filepath}")
-        
-        return {
-            "status": "generated",
-            "file": filename,
-            "path": filepath
-        }
+        print(f"[SANCTION AGENT] PDF generated successfully: {result['path']}")
+        return result
     
     except Exception as e:
         print(f"[SANCTION AGENT] PDF generation failed: {str(e)}")
@@ -215,13 +66,58 @@ def generate_sanction_letter(data: dict) -> dict:
         }
 
 
+def enqueue_sanction_letter(data: dict) -> dict:
+    """
+    Queue a sanction letter for background generation.
+    
+    The filename is fixed by the session id, so it can be shown to the
+    customer right away; poll GET /applications/{id}/sanction-letter (or
+    watch /events) until the job is ready.
+    
+    Returns:
+        Dict with status and file:
+            - status: "pending" or "error"
+            - file: filename the PDF will be written to
+    """
+    try:
+        session_id = str(data.get("session_id", "unknown"))
+        get_letter_queue().enqueue(session_id, data)
+        print(f"[SANCTION AGENT] Queued PDF: {letter_name(data)}")
+        return {"status": LetterStatus.PENDING.value, "file": letter_name(data)}
+    
+    except Exception as e:
+        print(f"[SANCTION AGENT] Could not queue PDF generation: {str(e)}")
+        return {"status": "error", "error": str(e), "file": None}
+
+
+def _explain_decision(decision: dict) -> str:
+    """
+    Generate the customer-facing explanation for a decision.
+    
+    When the turn is streamed (/chat/stream), Gemini output is forwarded to
+    the client chunk by chunk as `explanation_delta` events.
+    """
+    # Bound concurrent Gemini calls separately from PDF rendering
+    with agent_executor.limit("explanation"):
+        if not is_streaming_turn():
+            from utils.gemini_explainer import generate_explanation
+            return generate_explanation(decision)
+        
+        from utils.gemini_explainer import stream_explanation
+        parts = []
+        for chunk in stream_explanation(decision):
+            parts.append(chunk)
+            emit_turn_event("explanation_delta", text=chunk)
+        return "".join(parts)
+
+
 def sanction_agent_node(state: Dict, user_message: str) -> Dict[str, Any]:
     """
     Sanction Agent - Handles loan approval finalization with policy-based gating.
     
     Policy:
-    - Loans <= AUTO_APPROVAL_LIMIT (Rs. 50,000): Automated approval
-    - Loans > AUTO_APPROVAL_LIMIT: Forwarded to human review
+    - Loans <= auto_approval_limit (policy, Rs. 50,000 by default): Automated approval
+    - Loans > auto_approval_limit: Forwarded to human review
     
     Args:
         state: Current conversation state
@@ -276,72 +172,73 @@ def sanction_agent_node(state: Dict, user_message: str) -> Dict[str, Any]:
     # =========================================================================
     # POLICY-BASED DECISION: AUTOMATED vs HUMAN REVIEW
     # =========================================================================
-    if loan_amount <= AUTO_APPROVAL_LIMIT:
+    policy = rules_engine.policy()
+    auto_approval_limit = policy.params["auto_approval_limit"]
+    sanction_rule = rules_engine.evaluate("sanction", policy=policy, loan_amount=loan_amount)
+    
+    if sanction_rule["decision_type"] == "AUTOMATED":
         # AUTOMATED APPROVAL - within policy threshold
         decision_type = "AUTOMATED"
         decision_source = "System (Policy-Based)"
-        decision_reason = f"Loan amount (Rs. {loan_amount:,}) is within the automated approval limit of Rs. {AUTO_APPROVAL_LIMIT:,}"
-        policy_applied = f"AUTO_APPROVAL_LIMIT: Rs. {AUTO_APPROVAL_LIMIT:,}"
+        decision_reason = f"Loan amount (Rs. {loan_amount:,}) is within the automated approval limit of Rs. {auto_approval_limit:,}"
+        policy_applied = f"AUTO_APPROVAL_LIMIT: Rs. {auto_approval_limit:,}"
         
-        print(f"[SANCTION AGENT] Automated approval: {loan_amount} <= {AUTO_APPROVAL_LIMIT}")
+        print(f"[SANCTION AGENT] Automated approval: {loan_amount} <= {auto_approval_limit}")
         
-        # Generate PDF sanction letter
-        pdf_result = generate_sanction_letter(loan_details)
+        # The letter is dated by the decision, so re-rendering it yields the
+        # same PDF (kept if the turn is replayed)
+        loan_details["decided_at"] = state.setdefault("decided_at", datetime.now().isoformat(timespec="seconds"))
         
-        if pdf_result["status"] == "generated":
-            try:
-                from utils.gemini_explainer import generate_explanation
-                
-                explanation = generate_explanation({
-                    "status": "APPROVED_AUTOMATED",
-                    "reason": "All eligibility criteria met - within automated approval policy",
-                    "loan_amount": loan_details["loan_amount"],
-                    "salary": state.get("salary", "N/A"),
-                    "emi": loan_details["emi"]
-                })
-                
-                reply = f"""{explanation}
-
-📄 Loan Summary:
-- Amount: Rs. {loan_details['loan_amount']:,}
-- Interest Rate: {loan_details['interest_rate']}% p.a.
-- Tenure: {loan_details['tenure']} months
-- Monthly EMI: Rs. {loan_details['emi']:,.2f}
-
-✅ This loan falls within the automated approval policy (up to Rs. {AUTO_APPROVAL_LIMIT:,}) and has been approved.
-
-📋 Decision: Approved by System (Policy-Based)
-Your sanction letter has been generated: {pdf_result['file']}"""
-                
-            except Exception as e:
-                print(f"[SANCTION AGENT] Gemini explainer failed, using default: {e}")
-                reply = f"""🎉 LOAN SANCTIONED SUCCESSFULLY!
-
-Congratulations! Your loan application has been approved.
-
-📄 Loan Summary:
+        # Queue the PDF sanction letter - rendered by a background worker
+        # (services/letter_jobs.py) so a slow or failing render cannot hold up
+        # this reply; the application records pending -> ready / failed
+        pdf_result = enqueue_sanction_letter(loan_details)
+        
+        summary = f"""📄 Loan Summary:
 - Amount: Rs. {loan_details['loan_amount']:,}
 - Interest Rate: {loan_details['interest_rate']}% p.a.
 - Tenure: {loan_details['tenure']} months
 - Monthly EMI: Rs. {loan_details['emi']:,.2f}
 
-✅ This loan falls within the automated approval policy (up to Rs. {AUTO_APPROVAL_LIMIT:,}) and has been approved.
+✅ This loan falls within the automated approval policy (up to Rs. {auto_approval_limit:,}) and has been approved.
 
-📋 Decision: Approved by System (Policy-Based)
-Your sanction letter has been generated: {pdf_result['file']}"""
-            
-            # Store sanction letter filename in state
+📋 Decision: Approved by System (Policy-Based)"""
+        
+        if pdf_result["status"] == LetterStatus.PENDING.value:
+            letter_note = f"Your sanction letter is being prepared: {pdf_result['file']}"
+            # Name is known up front; /files serves it once the job is ready
             state["sanction_letter"] = pdf_result["file"]
-            sanction_status = "completed"
-            
+            state["sanction_letter_status"] = LetterStatus.PENDING.value
+            emit_turn_event(
+                "sanction_letter",
+                status=LetterStatus.PENDING.value,
+                file=pdf_result["file"],
+                url=f"/files/{pdf_result['file']}",
+                status_url=f"/applications/{session_id}/sanction-letter",
+            )
         else:
-            reply = f"""✅ LOAN APPROVED!
+            letter_note = ("However, there was an issue generating the sanction letter.\n"
+                           "Our team will send you the sanction letter shortly via email.")
+        
+        try:
+            explanation = _explain_decision({
+                "status": "APPROVED_AUTOMATED",
+                "reason": "All eligibility criteria met - within automated approval policy",
+                "loan_amount": loan_details["loan_amount"],
+                "salary": state.get("salary", "N/A"),
+                "emi": loan_details["emi"]
+            })
+        except Exception as e:
+            print(f"[SANCTION AGENT] Gemini explainer failed, using default: {e}")
+            explanation = """🎉 LOAN SANCTIONED SUCCESSFULLY!
 
-Your loan has been approved under the automated approval policy. However, there was an issue generating the sanction letter.
-Our team will send you the sanction letter shortly via email.
+Congratulations! Your loan application has been approved."""
+        
+        reply = f"""{explanation}
 
-📋 Decision: Approved by System (Policy-Based)"""
-            sanction_status = "completed"
+{summary}
+{letter_note}"""
+        sanction_status = "completed"
             
         print("[SANCTION AGENT] Automated approval completed!")
         
@@ -349,11 +246,11 @@ Our team will send you the sanction letter shortly via email.
         # HUMAN REVIEW REQUIRED - exceeds policy threshold
         decision_type = "HUMAN_REVIEW"
         decision_source = "Human-in-the-Loop"
-        decision_reason = f"Loan amount (Rs. {loan_amount:,}) exceeds the automated approval limit of Rs. {AUTO_APPROVAL_LIMIT:,}"
-        policy_applied = f"AUTO_APPROVAL_LIMIT: Rs. {AUTO_APPROVAL_LIMIT:,}"
+        decision_reason = f"Loan amount (Rs. {loan_amount:,}) exceeds the automated approval limit of Rs. {auto_approval_limit:,}"
+        policy_applied = f"AUTO_APPROVAL_LIMIT: Rs. {auto_approval_limit:,}"
         pdf_result = {"status": "not_generated", "file": None}
         
-        print(f"[SANCTION AGENT] Human review required: {loan_amount} > {AUTO_APPROVAL_LIMIT}")
+        print(f"[SANCTION AGENT] Human review required: {loan_amount} > {auto_approval_limit}")
         
         reply = f"""📋 APPLICATION FORWARDED FOR REVIEW
 
@@ -365,7 +262,7 @@ Your loan application has passed all automated eligibility checks and has been f
 - Tenure: {loan_details['tenure']} months
 - Monthly EMI: Rs. {loan_details['emi']:,.2f}
 
-⏳ This loan exceeds the automated approval limit (Rs. {AUTO_APPROVAL_LIMIT:,}) and has been forwarded for manual review by our credit team.
+⏳ This loan exceeds the automated approval limit (Rs. {auto_approval_limit:,}) and has been forwarded for manual review by our credit team.
 
 📋 Decision: Pending Human Review
 Expected turnaround: 1-2 business days
@@ -2,21 +2,24 @@
 Underwriting Agent
 Evaluates loan eligibility based on salary and loan amount.
 
-DEMO IMPLEMENTATION: Uses simple EMI < 50% of salary rule.
+DEMO IMPLEMENTATION: Uses simple EMI <= 50% of salary rule (the
+"affordability" ruleset in rules/policy.json).
 For demo, auto-approves most loans to show the full flow.
 """
 
 from typing import Dict, Any
-from utils.risk_scoring import compute_risk_score
+from utils.risk_scoring import compute_risk_score, compute_emi
 from utils.decision_rationale import generate_decision_rationale
+from utils.stage_events import emit_turn_event
+from rules.engine import rules_engine
 
 
 def underwriting_agent_node(state: Dict, user_message: str) -> Dict[str, Any]:
     """
     Underwriting Agent - Evaluates loan eligibility.
     
-    DEMO LOGIC:
-    - If EMI < 50% of salary -> APPROVED
+    DEMO LOGIC (policy: rules/policy.json, "affordability"):
+    - If EMI <= 50% of salary -> APPROVED
     - Otherwise -> REJECTED
     - If salary unknown, auto-approve for demo
     
@@ -40,10 +43,8 @@ def underwriting_agent_node(state: Dict, user_message: str) -> Dict[str, Any]:
     
     print(f"[UNDERWRITING AGENT] Loan: {loan_amount}, Salary: {salary}")
     
-    # Calculate EMI (simple formula for demo)
-    monthly_rate = interest_rate / 100 / 12
-    emi = loan_amount * monthly_rate * (1 + monthly_rate)**tenure / ((1 + monthly_rate)**tenure - 1)
-    emi = round(emi, 2)
+    # Calculate EMI (same formula as the batch scorer in utils/batch_scoring.py)
+    emi = compute_emi(loan_amount, interest_rate, tenure)
     
     # Store EMI in state for sanction letter
     state["emi"] = emi
@@ -68,10 +69,13 @@ def underwriting_agent_node(state: Dict, user_message: str) -> Dict[str, Any]:
     state["risk_level"] = risk_result["risk_level"]
     state["risk_factors"] = risk_result["risk_factors"]
     
-    # Decision Rule: EMI should be less than 50% of salary
+    # Decision Rule: EMI should be at most max_emi_to_salary (50%) of salary
+    policy = rules_engine.policy()
+    max_emi_ratio = policy.params["max_emi_to_salary"]
     emi_to_salary_ratio = emi / salary if salary > 0 else 1
+    affordability = rules_engine.evaluate("affordability", policy=policy, emi=emi, salary=salary)
     
-    if emi_to_salary_ratio <= 0.5:
+    if affordability["decision"] == "approved":
         # APPROVED
         decision = "approved"
         reason = f"EMI ({emi:.0f}) is {emi_to_salary_ratio*100:.1f}% of salary - within acceptable limits"
@@ -82,7 +86,7 @@ def underwriting_agent_node(state: Dict, user_message: str) -> Dict[str, Any]:
 - Loan Amount: Rs. {loan_amount:,}
 - Monthly EMI: Rs. {emi:,.2f}
 - Your Salary: Rs. {salary:,}
-- EMI/Salary Ratio: {emi_to_salary_ratio*100:.1f}% (Max allowed: 50%)
+- EMI/Salary Ratio: {emi_to_salary_ratio*100:.1f}% (Max allowed: {max_emi_ratio:.0%})
 
 📈 Risk Assessment: {risk_result['risk_level']} ({risk_result['risk_score']}/100)
 
@@ -93,7 +97,7 @@ Your application meets all our eligibility criteria. Proceeding to generate your
     else:
         # REJECTED
         decision = "rejected"
-        reason = f"EMI ({emi:.0f}) is {emi_to_salary_ratio*100:.1f}% of salary - exceeds 50% limit"
+        reason = f"EMI ({emi:.0f}) is {emi_to_salary_ratio*100:.1f}% of salary - exceeds {max_emi_ratio:.0%} limit"
         
         reply = f"""❌ We regret to inform you that your loan application cannot be approved at this time.
 
@@ -105,7 +109,7 @@ Your application meets all our eligibility criteria. Proceeding to generate your
 
 📈 Risk Assessment: {risk_result['risk_level']} ({risk_result['risk_score']}/100)
 
-⚠️ Reason: The EMI exceeds 50% of your monthly salary.
+⚠️ Reason: The EMI exceeds {max_emi_ratio:.0%} of your monthly salary.
 
 💡 Suggestion: You may consider:
 - Reducing the loan amount
@@ -130,6 +134,19 @@ Thank you for your interest in LoanOps."""
         )
         state["decision_rationale"] = decision_rationale
     
+    # Deterministic summary is ready before any LLM/PDF work - stream it first
+    emit_turn_event(
+        "underwriting_summary",
+        decision=decision,
+        reply=reply,
+        emi=emi,
+        loan_amount=loan_amount,
+        salary=salary,
+        risk_score=risk_result["risk_score"],
+        risk_level=risk_result["risk_level"],
+        risk_factors=risk_result["risk_factors"],
+    )
+    
     return {
         "reply": reply,
         "underwriting_decision": decision,
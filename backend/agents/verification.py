@@ -16,7 +16,7 @@ Key Design Principles:
 - All external checks are sandbox / simulated
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 from utils.crypto_utils import encrypt_data
 from utils.pan_verification import verify_pan_sandbox
 import json
@@ -106,7 +106,24 @@ def process_video_kyc(video_data: Dict[str, Any], state: Dict) -> Dict[str, Any]
 # ================================================================
 # Main Verification Agent
 # ================================================================
-def verification_agent_node(state: Dict, user_message: Any) -> Dict[str, Any]:
+def extract_pan_inputs(details: Any) -> Tuple[str, str]:
+    """Return (pan_number, full_name) from a structured KYC payload."""
+    if not isinstance(details, dict):
+        return "", ""
+    kyc_data = details.get("kyc_data") or {}
+    identity = kyc_data.get("identity", {})
+    personal = kyc_data.get("personal", {})
+    return identity.get("panNumber", ""), personal.get("fullName", "")
+
+
+def verification_agent_node(state: Dict, user_message: Any, pan_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Process a KYC submission.
+    
+    pan_result: Optional PAN verification result already fetched by the
+    caller (e.g. via verify_pan_sandbox_async in an async handler). When
+    omitted, the PAN is verified synchronously here.
+    """
     print("[VERIFICATION AGENT] Processing KYC submission...")
 
     # ============================================================
@@ -133,7 +150,8 @@ def verification_agent_node(state: Dict, user_message: Any) -> Dict[str, Any]:
             # ====================================================
             pan_number = identity.get("panNumber", "")
             full_name = personal.get("fullName", "")
-            pan_result = verify_pan_sandbox(pan_number, full_name)
+            if pan_result is None:
+                pan_result = verify_pan_sandbox(pan_number, full_name)
 
             state["pan_verification_status"] = pan_result.get("pan_verified")
             state["pan_verification_source"] = pan_result.get("verification_source")
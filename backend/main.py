@@ -5,38 +5,104 @@ Main entry point for the LoanOps AI hackathon project.
 
 Endpoints:
 - GET  /health           - Health check
+- GET  /metrics          - Prometheus latency histograms (agents, external calls, store)
+- GET  /metrics/agents   - Agent executor queue depth / concurrency
+- GET  /metrics/caches   - Result cache hit/miss counters
 - POST /signup           - User registration
 - POST /login            - User authentication
 - GET  /me               - Get current user
 - POST /logout           - User logout
+- POST /refresh-token    - Extend (or, for signed tokens, reissue) the current token
 - POST /chat             - Main chat interface (requires auth)
-- GET  /applications     - List all loan applications
+- POST /chat/stream      - Streaming chat (SSE: stages, summary, explanation, letter)
+- GET  /events/{id}      - SSE stream of agent transitions for a session
+- GET  /applications     - List loan applications (paginated, filterable)
 - GET  /applications/{id} - Get application details
+- GET  /applications/{id}/sanction-letter - Sanction letter job status (pending/ready/failed)
+- GET  /exports/sanction-letters - Streamed ZIP of sanction letters (date range / user)
+- GET  /files/{name}     - Generated PDF by name (ETag, Range)
+- GET  /files/objects/{digest} - Generated PDF by content hash (immutable)
+- POST /underwriting/batch - Bulk underwriting of a CSV/JSONL prospect list (streamed)
 - GET  /session/{id}     - Debug: View session
 - DELETE /session/{id}   - Debug: Clear session
 """
 
-from fastapi import FastAPI, HTTPException, Header
+from fastapi import Depends, FastAPI, HTTPException, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Literal, Any, List, Optional
 from datetime import datetime
+import asyncio
+import io
+import os
+import tempfile
+import threading
 import traceback
 import uuid
 
 # Import loan application models
 from models import (
-    LoanApplication, LoanStatus, LoanApplicationResponse, LoanApplicationListResponse,
+    LoanApplication, LoanStatus, LetterStatus, LoanApplicationResponse, LoanApplicationListResponse,
+    ApplicationStatsResponse,
     User, EmailAuthRequest, AuthResponse, UserResponse
 )
 
 # Import the LangGraph supervisor
 from agents.master import supervisor_node, create_initial_state
 from agents.sales import sales_agent_node
-from agents.verification import verification_agent_node
+from agents.verification import verification_agent_node, extract_pan_inputs
 from agents.underwriting import underwriting_agent_node
-from agents.sanction import sanction_agent_node
+from agents.sanction import sanction_agent_node, generate_sanction_letter
+
+# Agent-transition event stream (SSE)
+from utils.stage_events import stage_event_bus, publish_stage_event, format_sse, turn_stream_sink
+
+# Pooled async PAN verification client
+from utils.pan_verification import verify_pan_sandbox_async, aclose_pan_clients, pan_cache
+
+# Bounded executor for blocking agent work
+from utils.agent_executor import agent_executor
+
+# Per-stage latency histograms (Prometheus /metrics)
+from utils.metrics import metrics
+
+# Cached Gemini explanations
+from utils.explanation_cache import explanation_cache
+
+# Bulk (campaign list) underwriting
+from services.bulk_underwriting import (
+    DEFAULT_CHUNK_SIZE,
+    detect_format,
+    format_results,
+    iter_records,
+    shutdown_pool,
+    underwrite_stream,
+)
+
+# Content-addressed store for generated PDFs (served at /files)
+from services.artifact_store import get_artifact_store, is_valid_name, DIGEST_RE
+
+# Streamed ZIP export of sanction letters
+from services.letter_export import iter_letter_zip, LETTER_EXPORT_WORKERS
+
+# Sanction letter render pool and background job queue
+from services.sanction_letter import shutdown_pool as shutdown_letter_pool
+from services.letter_jobs import get_letter_queue, shutdown_letter_queue, LetterJob
+
+# Supervisor graph checkpoints (resume a session on any worker)
+from utils.checkpointer import get_checkpointed_session, delete_checkpoints, close_checkpointer
+
+# Async credit bureau / offer mart clients (coalesced, cached)
+from services.credit_bureau import get_credit_bureau_client
+from services.offer_mart import get_offer_mart_client
+from services.service_client import aclose_service_clients
+
+# Storage backend (in-memory or SQLite)
+from services.store import get_store, ApplicationFilter
+
+# Expiring auth tokens (opaque or signed)
+from services.auth_tokens import get_token_manager
 
 app = FastAPI(title="Agentic Loan Orchestrator API")
 
@@ -54,13 +120,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount generated files for PDF downloads
-app.mount(
-    "/files",
-    StaticFiles(directory="generated"),
-    name="files"
-)
-
 # ============================================================================
 # Pydantic Models for Request/Response
 # ============================================================================
@@ -79,7 +138,8 @@ class ChatResponse(BaseModel):
     stage: Literal["sales", "verification", "underwriting", "sanction", "rejected"]
     active_agent: Literal["SalesAgent", "VerificationAgent", "UnderwritingAgent", "SanctionAgent"]
     application_status: str  # Current loan application status
-    sanction_letter: Optional[str] = None  # PDF filename when sanctioned
+    sanction_letter: Optional[str] = None  # PDF filename (downloadable once status is "ready")
+    sanction_letter_status: Optional[str] = None  # pending / ready / failed
     # Risk Assessment Fields (from underwriting)
     risk_score: Optional[int] = None  # 0-100, lower is better
     risk_level: Optional[str] = None  # Low / Medium / High
@@ -99,46 +159,102 @@ class ChatResponse(BaseModel):
 
 
 # ============================================================================
-# In-Memory Session State (Minimal, for hackathon demo)
+# Persistent Storage (sessions, applications, users, auth tokens)
 # ============================================================================
-
-# Simple in-memory store for session states
-session_store: Dict[str, dict] = {}
-
-# ============================================================================
-# Loan Application Store (In-Memory for Hackathon Demo)
-# ============================================================================
-
-application_store: Dict[str, LoanApplication] = {}
-
-# ============================================================================
-# User Store (In-Memory for Hackathon Demo)
-# ============================================================================
-
-user_store: Dict[str, User] = {}  # user_id -> User
-email_to_user_id: Dict[str, str] = {}  # email -> user_id (for login lookup)
-auth_sessions: Dict[str, str] = {}  # token -> user_id
+# Backend is selected via STORE_BACKEND (memory | sqlite) - see services/store.py
+
+store = get_store()
+tokens = get_token_manager()
+
+# Serializes read-modify-write of an application between request handlers
+# and the sanction letter workers
+application_lock = threading.Lock()
+
+
+class SanctionLetterJobResponse(BaseModel):
+    """Status of an application's background sanction letter job."""
+    application_id: str
+    status: str  # pending / ready / failed
+    attempts: int
+    file: Optional[str] = None
+    url: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+def record_sanction_letter(application_id: str, job: LetterJob) -> None:
+    """Letter job finished (worker thread): record it on the application and notify /events."""
+    with application_lock:
+        app = store.get_application(application_id)
+        if app is not None:
+            app.sanction_letter_status = job.status
+            if job.status == LetterStatus.READY.value:
+                app.sanction_letter = job.file
+            store.save_application(app)
+    stage_event_bus.publish(application_id, {
+        "type": "sanction_letter",
+        "status": job.status,
+        "file": job.file,
+        "url": f"/files/{job.file}" if job.file else None,
+        "timestamp": datetime.now().isoformat(),
+    })
+
+
+get_letter_queue().on_complete(record_sanction_letter)
+
+
+@app.on_event("startup")
+def start_letter_jobs():
+    """Resume letters left pending by a previous run (workers otherwise start on first enqueue)."""
+    get_letter_queue().start()
+
+
+@app.on_event("shutdown")
+def flush_store():
+    """Persist any buffered writes before the worker exits."""
+    shutdown_letter_queue()
+    store.close()
+    agent_executor.shutdown()
+    shutdown_pool()
+    shutdown_letter_pool()
+
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Close pooled outbound HTTP clients."""
+    await aclose_pan_clients()
+    await aclose_service_clients()
+    await close_checkpointer()
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """Token from an "Authorization: Bearer <token>" header, if well-formed."""
+    if not authorization:
+        return None
+    parts = authorization.split(" ")
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        return None
+    return parts[1]
 
 
 def get_current_user(authorization: Optional[str] = Header(None)) -> Optional[User]:
     """
     Extract current user from Authorization header.
     Returns None if not authenticated (for optional auth).
-    """
-    if not authorization:
-        return None
     
-    # Expect: "Bearer <token>"
-    parts = authorization.split(" ")
-    if len(parts) != 2 or parts[0].lower() != "bearer":
+    Expired tokens are rejected; live ones have their expiry slid forward
+    (see services/auth_tokens.py).
+    """
+    token = bearer_token(authorization)
+    if not token:
         return None
     
-    token = parts[1]
-    user_id = auth_sessions.get(token)
+    user_id = tokens.validate(token)
     if not user_id:
         return None
     
-    return user_store.get(user_id)
+    return store.get_user(user_id)
 
 
 def require_auth(authorization: Optional[str] = Header(None)) -> User:
@@ -151,26 +267,47 @@ def require_auth(authorization: Optional[str] = Header(None)) -> User:
     return user
 
 
-def get_or_create_session(session_id: str, user_id: Optional[str] = None) -> dict:
+def get_or_create_session(session_id: str, user_id: Optional[str] = None, initial_state: Optional[dict] = None) -> dict:
     """Get existing session or create a new one using LangGraph initial state."""
-    if session_id not in session_store:
-        session_store[session_id] = create_initial_state()
+    session = store.get_session(session_id)
+    if session is None:
+        session = initial_state or create_initial_state()
+        store.save_session(session_id, session)
         # Create a corresponding loan application record
-        if session_id not in application_store:
-            application_store[session_id] = LoanApplication(
+        if store.get_application(session_id) is None:
+            store.save_application(LoanApplication(
                 application_id=session_id,
                 user_id=user_id,  # Link to authenticated user
                 status=LoanStatus.INITIATED,
                 created_at=datetime.now()
-            )
+            ))
             print(f"[APPLICATION] Created new application: {session_id} (User: {user_id})")
     else:
         # Update user_id if not set (for existing sessions)
-        if user_id and session_id in application_store:
-            app = application_store[session_id]
-            if not app.user_id:
+        if user_id:
+            app = store.get_application(session_id)
+            if app and not app.user_id:
                 app.user_id = user_id
-    return session_store[session_id]
+                store.save_application(app)  # re-index under the new owner
+    return session
+
+
+async def resume_or_create_session(session_id: str, user_id: Optional[str] = None) -> dict:
+    """
+    get_or_create_session(), resuming from the session's last supervisor graph
+    checkpoint when this worker's store has no copy of it (e.g. earlier turns
+    were served by another worker sharing GRAPH_CHECKPOINTER=sqlite).
+    """
+    if store.get_session(session_id) is None:
+        checkpointed = await get_checkpointed_session(session_id)
+        if checkpointed is not None:
+            print(f"[SESSION] Resuming {session_id} from graph checkpoint")
+            return get_or_create_session(session_id, user_id, initial_state=checkpointed)
+    return get_or_create_session(session_id, user_id)
+
+
+# Statuses that block a user from opening another loan application
+ACTIVE_LOAN_STATUSES = (LoanStatus.SANCTIONED, LoanStatus.PENDING_REVIEW)
 
 
 def has_active_loan(user_id: str) -> tuple[bool, Optional[str]]:
@@ -186,11 +323,13 @@ def has_active_loan(user_id: str) -> tuple[bool, Optional[str]]:
     if not user_id:
         return False, None
     
-    for app_id, app in application_store.items():
-        if app.user_id == user_id:
-            if app.status in [LoanStatus.SANCTIONED, LoanStatus.PENDING_REVIEW]:
-                print(f"[ACTIVE LOAN CHECK] User {user_id} has active loan: {app_id} ({app.status.value})")
-                return True, app_id
+    # O(1) lookup via the store's per-user status index (no full scan)
+    app_id = store.find_user_application(user_id, ACTIVE_LOAN_STATUSES)
+    if app_id:
+        app = store.get_application(app_id)
+        status = LoanStatus(app.status).value if app else "unknown"
+        print(f"[ACTIVE LOAN CHECK] User {user_id} has active loan: {app_id} ({status})")
+        return True, app_id
     
     return False, None
 
@@ -208,18 +347,22 @@ def update_application_status(session_id: str, stage: str, loan_amount: float =
     
     CRITICAL: Includes hard guard to prevent sanction without verification
     """
-    if session_id not in application_store:
+    with application_lock:
+        _update_application_status(session_id, stage, loan_amount)
+
+
+def _update_application_status(session_id: str, stage: str, loan_amount: float = None):
+    app = store.get_application(session_id)
+    if app is None:
         return
     
-    app = application_store[session_id]
-    
     # Update loan amount if provided
     if loan_amount:
         app.loan_amount = loan_amount
     
     # CRITICAL VERIFICATION GUARD:
     # Before setting SANCTIONED or VERIFIED status, check if session is actually verified
-    session = session_store.get(session_id, {})
+    session = store.get_session(session_id) or {}
     is_verified = session.get("verified") == True and session.get("verification_status") == "verified"
     
     # Determine status based on stage and decision_type
@@ -251,11 +394,15 @@ def update_application_status(session_id: str, stage: str, loan_amount: float =
         app.status = new_status
         print(f"[APPLICATION] {session_id} status updated to: {new_status.value}")
     
-    # Update sanction_letter if available in session (only for SANCTIONED, not PENDING_REVIEW)
-    sanction_letter = session.get("sanction_letter")
-    if sanction_letter and new_status == LoanStatus.SANCTIONED:
-        app.sanction_letter = sanction_letter
-        print(f"[APPLICATION] {session_id} sanction_letter set to: {sanction_letter}")
+    # Track the background sanction letter (only for SANCTIONED, not PENDING_REVIEW).
+    # The job table is authoritative - the worker may already have finished.
+    if session.get("sanction_letter_status") and new_status == LoanStatus.SANCTIONED:
+        job = get_letter_queue().get(session_id)
+        if job is not None and job.status != app.sanction_letter_status:
+            app.sanction_letter_status = job.status
+            if job.status == LetterStatus.READY.value:
+                app.sanction_letter = job.file
+            print(f"[APPLICATION] {session_id} sanction_letter {job.status}: {job.file or 'queued'}")
     
     # Update risk assessment data if available
     risk_score = session.get("risk_score")
@@ -266,12 +413,16 @@ def update_application_status(session_id: str, stage: str, loan_amount: float =
         app.risk_level = risk_level
         app.risk_factors = risk_factors
         print(f"[APPLICATION] {session_id} risk: {risk_level} ({risk_score}/100)")
+    
+    # Persist - also refreshes the per-user status index used by has_active_loan
+    store.save_application(app)
 
 
 def get_application_status(session_id: str) -> str:
     """Get current application status."""
-    if session_id in application_store:
-        return application_store[session_id].status.value if hasattr(application_store[session_id].status, 'value') else application_store[session_id].status
+    app = store.get_application(session_id)
+    if app is not None:
+        return app.status.value if hasattr(app.status, 'value') else app.status
     return LoanStatus.INITIATED.value
 
 # ============================================================================
@@ -284,6 +435,52 @@ async def health_check():
     return {"status": "ok", "message": "Agentic Loan Orchestrator is running"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Prometheus text exposition: wall / CPU time histograms and p50/p95/p99
+    per (kind, stage, outcome) for agent nodes, graph nodes, Gemini, Setu PAN,
+    PDF rendering, credit bureau / offer mart and store operations, plus
+    agent executor queue gauges.
+    """
+    stages = agent_executor.stats()["stages"]
+    body = metrics.render_prometheus(gauges={
+        "loanops_agent_queue_depth": (
+            "Agent work waiting for a stage concurrency slot.",
+            {stage: s["queue_depth"] for stage, s in stages.items()},
+        ),
+        "loanops_agent_running": (
+            "Agent work currently running per stage.",
+            {stage: s["running"] for stage, s in stages.items()},
+        ),
+        "loanops_letter_jobs": (
+            "Sanction letter jobs per status.",
+            get_letter_queue().counts(),
+        ),
+    })
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@app.get("/metrics/agents")
+async def agent_executor_metrics():
+    """
+    Agent executor metrics: per-stage queue depth, running count,
+    completed/failed totals and timings.
+    """
+    return agent_executor.stats()
+
+
+@app.get("/metrics/caches")
+async def cache_metrics():
+    """Hit/miss counters and sizes for in-process result caches."""
+    return {
+        "pan_verification": pan_cache.stats(),
+        "explanations": explanation_cache.stats(),
+        "credit_bureau": get_credit_bureau_client().cache.stats(),
+        "offer_mart": get_offer_mart_client().cache.stats(),
+    }
+
+
 # ============================================================================
 # Authentication Endpoints (Email-Only for Hackathon Demo)
 # ============================================================================
@@ -303,14 +500,13 @@ async def signup(request: EmailAuthRequest):
         raise HTTPException(status_code=400, detail="Valid email is required")
     
     # Check if user already exists
-    if email in email_to_user_id:
+    existing_user = store.get_user_by_email(email)
+    if existing_user:
         # User exists - log them in instead (idempotent signup)
-        user_id = email_to_user_id[email]
-        user = user_store.get(user_id)
-        token = str(uuid.uuid4())
-        auth_sessions[token] = user_id
+        user_id = existing_user.user_id
+        token = tokens.issue(user_id)
         print(f"[AUTH] Existing user signup (login): {email}")
-        return AuthResponse(token=token, user_id=user_id, email=email)
+        return AuthResponse(token=token, user_id=user_id, email=email, expires_in=int(tokens.ttl))
     
     # Create new user
     user_id = str(uuid.uuid4())
@@ -321,16 +517,14 @@ async def signup(request: EmailAuthRequest):
     )
     
     # Store user
-    user_store[user_id] = user
-    email_to_user_id[email] = user_id
+    store.save_user(user)
     
     # Create session token
-    token = str(uuid.uuid4())
-    auth_sessions[token] = user_id
+    token = tokens.issue(user_id)
     
     print(f"[AUTH] New user signup: {email} (ID: {user_id})")
     
-    return AuthResponse(token=token, user_id=user_id, email=email)
+    return AuthResponse(token=token, user_id=user_id, email=email, expires_in=int(tokens.ttl))
 
 
 @app.post("/login", response_model=AuthResponse)
@@ -347,21 +541,17 @@ async def login(request: EmailAuthRequest):
         raise HTTPException(status_code=400, detail="Valid email is required")
     
     # Find user by email
-    user_id = email_to_user_id.get(email)
-    if not user_id:
-        raise HTTPException(status_code=401, detail="User not found. Please sign up first.")
-    
-    user = user_store.get(user_id)
+    user = store.get_user_by_email(email)
     if not user:
         raise HTTPException(status_code=401, detail="User not found. Please sign up first.")
+    user_id = user.user_id
     
     # Create session token
-    token = str(uuid.uuid4())
-    auth_sessions[token] = user_id
+    token = tokens.issue(user_id)
     
     print(f"[AUTH] User login: {email}")
     
-    return AuthResponse(token=token, user_id=user_id, email=email)
+    return AuthResponse(token=token, user_id=user_id, email=email, expires_in=int(tokens.ttl))
 
 
 @app.get("/me", response_model=UserResponse)
@@ -381,17 +571,31 @@ async def logout(authorization: Optional[str] = Header(None)):
     """
     Logout and invalidate session token.
     """
-    if authorization:
-        parts = authorization.split(" ")
-        if len(parts) == 2 and parts[0].lower() == "bearer":
-            token = parts[1]
-            if token in auth_sessions:
-                del auth_sessions[token]
-                return {"status": "ok", "message": "Logged out successfully"}
+    token = bearer_token(authorization)
+    if token and tokens.revoke(token):
+        return {"status": "ok", "message": "Logged out successfully"}
     
     return {"status": "ok", "message": "Logged out"}
 
 
+@app.post("/refresh-token", response_model=AuthResponse)
+async def refresh_token(authorization: Optional[str] = Header(None)):
+    """
+    Renew the current token for a full TTL.
+    
+    Opaque tokens also slide on every authenticated request, so this is
+    mainly for signed (stateless) tokens, which are reissued.
+    """
+    token = bearer_token(authorization)
+    user_id = tokens.validate(token) if token else None
+    user = store.get_user(user_id) if user_id else None
+    new_token = tokens.refresh(token) if user else None
+    if not new_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    return AuthResponse(token=new_token, user_id=user.user_id, email=user.email, expires_in=int(tokens.ttl))
+
+
 # ============================================================================
 # KYC Verification Endpoint
 # ============================================================================
@@ -428,25 +632,24 @@ async def verify_endpoint(request: VerifyRequest, authorization: Optional[str] =
         session_id = request.session_id
         
         # Get or create session
-        if session_id not in session_store:
-            session_store[session_id] = {
+        session = store.get_session(session_id)
+        if session is None:
+            session = {
                 "messages": [],
                 "stage": "verification",
                 "loan_amount": None,
                 "session_id": session_id
             }
         
-        session = session_store[session_id]
-        
-        # Import verification agent
-        from agents.verification import verification_agent_node
-        
-        # Process KYC data through verification agent
-        result = verification_agent_node(session, request.details)
+        # PAN lookup on the shared async client, then the agent off-loop
+        pan_number, full_name = extract_pan_inputs(request.details)
+        pan_result = await verify_pan_sandbox_async(pan_number, full_name) if pan_number else None
+        result = await agent_executor.run("verification", verification_agent_node, session, request.details, pan_result)
         
         # Update session with verification results
         session["verified"] = result.get("verified", False)
         session["verification_status"] = result.get("verification_status", "pending")
+        store.save_session(session_id, session)
         
         print(f"[VERIFY] Session {session_id}: verified={session['verified']}")
         
@@ -465,6 +668,110 @@ async def verify_endpoint(request: VerifyRequest, authorization: Optional[str] =
 # ============================================================================
 # Chat Endpoints
 # ============================================================================
+
+ACTIVE_LOAN_BLOCKED_REPLY = "I see that you already have an active loan application.\n\nFor responsible lending, we allow only one active loan at a time.\n\nOnce your current loan is completed or reviewed, you can apply again."
+
+CHAT_ERROR_REPLY = "I apologize, but I encountered an issue processing your request. Please try again."
+
+
+def _validate_chat_request(request: ChatRequest) -> tuple[str, str]:
+    """Validate a chat request and return the stripped (session_id, message)."""
+    if not request.session_id or not request.session_id.strip():
+        raise HTTPException(status_code=400, detail="session_id is required")
+    
+    if not request.message or not request.message.strip():
+        raise HTTPException(status_code=400, detail="message is required")
+    
+    return request.session_id.strip(), request.message.strip()
+
+
+def _active_loan_guardrail(session_id: str, user: User) -> Optional[ChatResponse]:
+    """
+    ONE ACTIVE LOAN PER USER GUARDRAIL
+    Responsible lending: Block new loan if user already has active loan.
+    Returns the blocking response, or None if the turn may proceed.
+    """
+    is_new_session = not store.has_session(session_id)
+    if is_new_session:
+        active_loan, active_loan_id = has_active_loan(user.user_id)
+        if active_loan:
+            print(f"[GUARDRAIL] Blocking new loan for user {user.user_id} - active loan: {active_loan_id}")
+            return ChatResponse(
+                reply=ACTIVE_LOAN_BLOCKED_REPLY,
+                stage="sales",
+                active_agent="SalesAgent",
+                application_status="Blocked"
+            )
+    return None
+
+
+def _finish_chat_turn(session_id: str, session: dict, result: Dict[str, Any]) -> ChatResponse:
+    """Persist a completed supervisor turn and build the structured response."""
+    # Add bot response to history
+    session["messages"].append({"role": "assistant", "content": result["reply"]})
+    
+    # Persist the updated conversation state
+    store.save_session(session_id, session)
+    
+    # Update loan application status based on stage
+    loan_amount = session.get("loan_amount")
+    update_application_status(session_id, result["stage"], loan_amount)
+    
+    # Sanction letter filename / job status. The application only records the
+    # file once the job is ready; until then report the queued name with
+    # status "pending" so the client can poll /applications/{id}/sanction-letter
+    app = store.get_application(session_id)
+    sanction_letter_status = app.sanction_letter_status if app else None
+    sanction_letter = app.sanction_letter if app else None
+    if sanction_letter is None and sanction_letter_status == LetterStatus.PENDING.value:
+        sanction_letter = session.get("sanction_letter")
+    
+    # Get risk assessment data if available (from underwriting stage)
+    risk_score = session.get("risk_score")
+    risk_level = session.get("risk_level")
+    risk_factors = session.get("risk_factors")
+    
+    # Get decision metadata if available (from sanction stage)
+    decision_type = session.get("decision_type")
+    decision_reason = session.get("decision_reason") 
+    decision_source = session.get("decision_source")
+    policy_applied = session.get("policy_applied")
+    
+    # Get verification attention data if available
+    verification_attention_required = session.get("verification_attention_required")
+    verification_issue = session.get("verification_issue")
+    
+    # Get halt_agents from supervisor result (for frontend synchronization)
+    halt_agents = result.get("halt_agents", False)
+    
+    # Tell /events subscribers the pipeline finished for this turn
+    publish_stage_event(session_id, result["stage"], result["active_agent"], event_type="turn_complete")
+    
+    # Get XAI decision rationale if available
+    decision_rationale = session.get("decision_rationale")
+    
+    # Return structured response for frontend
+    return ChatResponse(
+        reply=result["reply"],
+        stage=result["stage"],
+        active_agent=result["active_agent"],
+        application_status=get_application_status(session_id),
+        sanction_letter=sanction_letter,
+        sanction_letter_status=sanction_letter_status,
+        risk_score=risk_score,
+        risk_level=risk_level,
+        risk_factors=risk_factors,
+        decision_type=decision_type,
+        decision_reason=decision_reason,
+        decision_source=decision_source,
+        policy_applied=policy_applied,
+        decision_rationale=decision_rationale,
+        verification_attention_required=verification_attention_required,
+        verification_issue=verification_issue,
+        halt_agents=halt_agents
+    )
+
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest, authorization: Optional[str] = Header(None)):
     """
@@ -491,33 +798,14 @@ async def chat_endpoint(request: ChatRequest, authorization: Optional[str] = Hea
     
     try:
         # Validate input
-        if not request.session_id or not request.session_id.strip():
-            raise HTTPException(status_code=400, detail="session_id is required")
-        
-        if not request.message or not request.message.strip():
-            raise HTTPException(status_code=400, detail="message is required")
-        
-        session_id = request.session_id.strip()
-        message = request.message.strip()
+        session_id, message = _validate_chat_request(request)
         
-        # ======================================================================
-        # ONE ACTIVE LOAN PER USER GUARDRAIL
-        # Responsible lending: Block new loan if user already has active loan
-        # ======================================================================
-        is_new_session = session_id not in session_store
-        if is_new_session:
-            active_loan, active_loan_id = has_active_loan(user.user_id)
-            if active_loan:
-                print(f"[GUARDRAIL] Blocking new loan for user {user.user_id} - active loan: {active_loan_id}")
-                return ChatResponse(
-                    reply="I see that you already have an active loan application.\n\nFor responsible lending, we allow only one active loan at a time.\n\nOnce your current loan is completed or reviewed, you can apply again.",
-                    stage="sales",
-                    active_agent="SalesAgent",
-                    application_status="Blocked"
-                )
+        blocked = _active_loan_guardrail(session_id, user)
+        if blocked:
+            return blocked
         
         # Get or create session (link to authenticated user)
-        session = get_or_create_session(session_id, user.user_id)
+        session = await resume_or_create_session(session_id, user.user_id)
         
         # Add user message to history
         session["messages"].append({"role": "user", "content": message})
@@ -526,58 +814,9 @@ async def chat_endpoint(request: ChatRequest, authorization: Optional[str] = Hea
         # Call the LangGraph Supervisor
         # This is the core orchestration - routes to appropriate agent
         # ======================================================================
-        result = await supervisor_node(session, message)
+        result = await supervisor_node(session, message, session_id=session_id)
         
-        # Add bot response to history
-        session["messages"].append({"role": "assistant", "content": result["reply"]})
-        
-        # Update loan application status based on stage
-        loan_amount = session.get("loan_amount")
-        update_application_status(session_id, result["stage"], loan_amount)
-        
-        # Get sanction_letter if available
-        sanction_letter = session.get("sanction_letter")
-        
-        # Get risk assessment data if available (from underwriting stage)
-        risk_score = session.get("risk_score")
-        risk_level = session.get("risk_level")
-        risk_factors = session.get("risk_factors")
-        
-        # Get decision metadata if available (from sanction stage)
-        decision_type = session.get("decision_type")
-        decision_reason = session.get("decision_reason") 
-        decision_source = session.get("decision_source")
-        policy_applied = session.get("policy_applied")
-        
-        # Get verification attention data if available
-        verification_attention_required = session.get("verification_attention_required")
-        verification_issue = session.get("verification_issue")
-        
-        # Get halt_agents from supervisor result (for frontend synchronization)
-        halt_agents = result.get("halt_agents", False)
-        
-        # Get XAI decision rationale if available
-        decision_rationale = session.get("decision_rationale")
-        
-        # Return structured response for frontend
-        return ChatResponse(
-            reply=result["reply"],
-            stage=result["stage"],
-            active_agent=result["active_agent"],
-            application_status=get_application_status(session_id),
-            sanction_letter=sanction_letter,
-            risk_score=risk_score,
-            risk_level=risk_level,
-            risk_factors=risk_factors,
-            decision_type=decision_type,
-            decision_reason=decision_reason,
-            decision_source=decision_source,
-            policy_applied=policy_applied,
-            decision_rationale=decision_rationale,
-            verification_attention_required=verification_attention_required,
-            verification_issue=verification_issue,
-            halt_agents=halt_agents
-        )
+        return _finish_chat_turn(session_id, session, result)
     
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -589,13 +828,94 @@ async def chat_endpoint(request: ChatRequest, authorization: Optional[str] = Hea
         
         # DEMO SAFETY: Return a safe fallback response - never crash
         return ChatResponse(
-            reply="I apologize, but I encountered an issue processing your request. Please try again.",
+            reply=CHAT_ERROR_REPLY,
             stage="sales",
             active_agent="SalesAgent",
             application_status="Initiated"
         )
 
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest, authorization: Optional[str] = Header(None)):
+    """
+    Streaming variant of /chat (Server-Sent Events).
+    Requires authentication - user must be logged in.
+    
+    Events, in order of availability:
+        - agent_transition:     stage / active_agent changes
+        - underwriting_summary: deterministic eligibility + risk assessment
+        - explanation_delta:    Gemini explanation text chunks
+        - sanction_letter:      queued PDF filename, /files URL and job status URL
+        - done:                 the full ChatResponse payload (same as /chat)
+        - error:                turn failed; payload is the safe fallback response
+    
+    The first event is sent as soon as the supervisor routes the message,
+    instead of after PDF generation and the LLM call have finished.
+    """
+    user = get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Authentication required. Please login to continue.")
+    
+    session_id, message = _validate_chat_request(request)
+    
+    queue: asyncio.Queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+    
+    def sink(event: Dict[str, Any]):
+        # Agents may emit from worker threads - hand events to the loop safely
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+    
+    async def run_turn():
+        sink_token = turn_stream_sink.set(sink)
+        try:
+            blocked = _active_loan_guardrail(session_id, user)
+            if blocked:
+                sink({"type": "done", "response": blocked.model_dump()})
+                return
+            
+            session = await resume_or_create_session(session_id, user.user_id)
+            session["messages"].append({"role": "user", "content": message})
+            
+            # Blocking agent work runs on the agent executor, so events reach
+            # the client while the PDF render / Gemini call is in progress
+            result = await supervisor_node(session, message, session_id=session_id)
+            
+            response = _finish_chat_turn(session_id, session, result)
+            sink({"type": "done", "response": response.model_dump()})
+        
+        except Exception:
+            print(f"[ERROR] Chat stream error: {traceback.format_exc()}")
+            fallback = ChatResponse(
+                reply=CHAT_ERROR_REPLY,
+                stage="sales",
+                active_agent="SalesAgent",
+                application_status="Initiated"
+            )
+            sink({"type": "error", "response": fallback.model_dump()})
+        
+        finally:
+            turn_stream_sink.reset(sink_token)
+            sink(None)
+    
+    async def event_stream():
+        task = asyncio.create_task(run_turn())
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield format_sse(event)
+        finally:
+            # Client disconnects do not abort the turn - let it finish and persist
+            await asyncio.shield(task)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/verify")
 async def verify_endpoint(request: VerificationRequest):
     """
@@ -611,12 +931,15 @@ async def verify_endpoint(request: VerificationRequest):
 
         session = get_or_create_session(request.session_id.strip())
 
-        # Call verification agent with the structured details
-        result = verification_agent_node(session, request.details)
+        # Call verification agent with the structured details (off the event loop)
+        pan_number, full_name = extract_pan_inputs(request.details)
+        pan_result = await verify_pan_sandbox_async(pan_number, full_name) if pan_number else None
+        result = await agent_executor.run("verification", verification_agent_node, session, request.details, pan_result)
 
         # Append messages for traceability
         session["messages"].append({"role": "user", "content": "[verification_submitted]"})
         session["messages"].append({"role": "assistant", "content": result["reply"]})
+        store.save_session(request.session_id.strip(), session)
 
         return result
 
@@ -627,6 +950,32 @@ async def verify_endpoint(request: VerificationRequest):
         raise HTTPException(status_code=500, detail="Verification failed")
 
 
+@app.get("/events/{session_id}")
+async def stream_stage_events(session_id: str, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-Sent Events stream of agent transitions for a session.
+    
+    Emits `agent_transition` events (Sales → Verification → Underwriting → Sanction)
+    as the supervisor moves between agents, and `turn_complete` when a /chat
+    turn finishes. Recent events are replayed on connect; browsers resume
+    automatically via the Last-Event-ID header.
+    """
+    try:
+        after_id = int(last_event_id) if last_event_id else 0
+    except ValueError:
+        after_id = 0
+    
+    async def event_stream():
+        async for event in stage_event_bus.subscribe(session_id, after_id=after_id):
+            yield format_sse(event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/session/{session_id}")
 async def get_session(session_id: str):
     """
@@ -635,10 +984,11 @@ async def get_session(session_id: str):
     
     TODO: Remove or secure this in production.
     """
-    if session_id not in session_store:
+    session = store.get_session(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    return session_store[session_id]
+    return session
 
 
 @app.delete("/session/{session_id}")
@@ -649,8 +999,8 @@ async def clear_session(session_id: str):
     
     TODO: Remove or secure this in production.
     """
-    if session_id in session_store:
-        del session_store[session_id]
+    await delete_checkpoints(session_id)
+    if store.delete_session(session_id):
         return {"status": "ok", "message": f"Session {session_id} cleared"}
     
     raise HTTPException(status_code=404, detail="Session not found")
@@ -678,37 +1028,84 @@ async def get_workflow_stages():
 # Loan Application API Endpoints (Read-Only)
 # ============================================================================
 
+def application_filter(
+    status: Optional[str] = None,
+    risk_level: Optional[str] = None,
+    user_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> ApplicationFilter:
+    """Listing filters shared by /applications and /applications/stats."""
+    return ApplicationFilter(
+        status=status,
+        risk_level=risk_level,
+        user_id=user_id,
+        created_from=created_from,
+        created_to=created_to,
+    )
+
+
 @app.get("/applications", response_model=LoanApplicationListResponse)
-async def list_applications():
+async def list_applications(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    filters: ApplicationFilter = Depends(application_filter),
+):
     """
-    List all loan applications.
+    List loan applications, newest first, one page at a time.
+    
+    Query params:
+        - limit: Page size (1-200, default 50)
+        - cursor: next_cursor from the previous page
+        - status / risk_level / user_id: Exact-match filters
+        - created_from / created_to: Inclusive created_at range (ISO 8601)
+        - with_total: Also count every application matching the filters
+    
+    `count` is the number returned in this page. Counting all matches is a
+    query over the whole filtered set, so a page stays O(page size) unless
+    with_total=true asks for `total` (or use /applications/stats once).
     
-    Returns all applications with their current status.
     This is a read-only endpoint for audit and traceability.
     """
+    try:
+        page, next_cursor = store.list_applications(limit, cursor=cursor, filters=filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     applications = []
-    for app_id, app in application_store.items():
+    for app in page:
         applications.append(LoanApplicationResponse(
             application_id=app.application_id,
             user_id=app.user_id,
             loan_amount=app.loan_amount,
             status=app.status.value if hasattr(app.status, 'value') else app.status,
             sanction_letter=app.sanction_letter,
+            sanction_letter_status=app.sanction_letter_status,
             risk_score=app.risk_score,
             risk_level=app.risk_level,
             risk_factors=app.risk_factors,
             created_at=app.created_at
         ))
     
-    # Sort by created_at descending (newest first)
-    applications.sort(key=lambda x: x.created_at, reverse=True)
-    
     return LoanApplicationListResponse(
-        total=len(applications),
-        applications=applications
+        total=sum(store.count_applications(filters).values()) if with_total else None,
+        count=len(applications),
+        applications=applications,
+        next_cursor=next_cursor
     )
 
 
+@app.get("/applications/stats", response_model=ApplicationStatsResponse)
+async def application_stats(filters: ApplicationFilter = Depends(application_filter)):
+    """
+    Application counts per status for the same filters as /applications,
+    so dashboards can show totals without loading every page.
+    """
+    by_status = store.count_applications(filters)
+    return ApplicationStatsResponse(total=sum(by_status.values()), by_status=by_status)
+
+
 @app.get("/applications/{application_id}", response_model=LoanApplicationResponse)
 async def get_application(application_id: str):
     """
@@ -717,19 +1114,211 @@ async def get_application(application_id: str):
     Returns the application details including status and loan amount.
     This is a read-only endpoint for audit and traceability.
     """
-    if application_id not in application_store:
+    app = store.get_application(application_id)
+    if app is None:
         raise HTTPException(status_code=404, detail="Application not found")
     
-    app = application_store[application_id]
     return LoanApplicationResponse(
         application_id=app.application_id,
         user_id=app.user_id,
         loan_amount=app.loan_amount,
         status=app.status.value if hasattr(app.status, 'value') else app.status,
         sanction_letter=app.sanction_letter,
+        sanction_letter_status=app.sanction_letter_status,
         risk_score=app.risk_score,
         risk_level=app.risk_level,
         risk_factors=app.risk_factors,
         created_at=app.created_at
     )
 
+
+@app.get("/applications/{application_id}/sanction-letter", response_model=SanctionLetterJobResponse)
+async def get_sanction_letter_job(application_id: str):
+    """
+    Status of the application's sanction letter job.
+    
+    Letters are generated in the background after an automated approval;
+    poll until status is "ready" (then download `url`) or "failed".
+    """
+    job = get_letter_queue().get(application_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No sanction letter for this application")
+    
+    return SanctionLetterJobResponse(
+        application_id=job.application_id,
+        status=job.status,
+        attempts=job.attempts,
+        file=job.file,
+        url=f"/files/{job.file}" if job.file else None,
+        error=job.error,
+        created_at=datetime.fromtimestamp(job.created_at),
+        updated_at=datetime.fromtimestamp(job.updated_at),
+    )
+
+
+# ============================================================================
+# Generated Files (sanction letters)
+# ============================================================================
+# Served from the content-addressed artifact store (services/artifact_store.py).
+# The sha256 digest is the ETag; FileResponse handles Range / If-Range.
+
+# A name can be re-pointed at a regenerated letter: always revalidate
+NAMED_FILE_CACHE_CONTROL = "private, no-cache"
+# A digest URL can never change content
+OBJECT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _serve_artifact(request: Request, path: str, name: str, etag: str, media_type: str, cache_control: str):
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return FileResponse(
+        path,
+        media_type=media_type,
+        headers=headers,
+        filename=name,
+        content_disposition_type="inline",
+    )
+
+
+@app.api_route("/files/objects/{digest}", methods=["GET", "HEAD"])
+def get_file_object(digest: str, request: Request):
+    """Generated file by content hash - cacheable forever."""
+    if not DIGEST_RE.match(digest):
+        raise HTTPException(status_code=404, detail="File not found")
+    path = get_artifact_store().object_path(digest)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="File not found")
+    return _serve_artifact(request, path, f"{digest}.pdf", f'"{digest}"', "application/pdf", OBJECT_CACHE_CONTROL)
+
+
+@app.api_route("/files/{name}", methods=["GET", "HEAD"])
+def get_file(name: str, request: Request):
+    """
+    Generated file by name (e.g. sanction_LOAN-1234.pdf).
+    
+    Letters written before the artifact store existed are still served from
+    the flat generated/ directory until imported
+    (python -m services.artifact_store import).
+    """
+    if not is_valid_name(name):
+        raise HTTPException(status_code=404, detail="File not found")
+    artifact_store = get_artifact_store()
+    artifact = artifact_store.get(name)
+    if artifact is not None:
+        return _serve_artifact(
+            request, artifact.path, name, artifact.etag, artifact.media_type, NAMED_FILE_CACHE_CONTROL
+        )
+    legacy_path = os.path.join(artifact_store.root, name)
+    if os.path.isfile(legacy_path):
+        return FileResponse(legacy_path, filename=name, content_disposition_type="inline")
+    raise HTTPException(status_code=404, detail="File not found")
+
+
+# ============================================================================
+# Sanction Letter Export
+# ============================================================================
+
+# Applications fetched per store page while streaming an export
+EXPORT_PAGE_SIZE = 200
+
+
+@app.get("/exports/sanction-letters")
+async def export_sanction_letters(
+    user_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    workers: int = Query(LETTER_EXPORT_WORKERS, ge=1, le=16),
+):
+    """
+    Download every sanction letter for a created_at range and/or user as a ZIP.
+    
+    The archive is streamed as it is built (services/letter_export.py).
+    Letters that were never rendered are generated on the fly, `workers`
+    at a time. manifest.csv inside the archive lists each application.
+    
+    Query params:
+        - user_id: Only this user's applications
+        - created_from / created_to: Inclusive created_at range (ISO 8601)
+        - workers: Parallel renders for missing letters
+    """
+    filters = ApplicationFilter(
+        status=LoanStatus.SANCTIONED,
+        user_id=user_id,
+        created_from=created_from,
+        created_to=created_to,
+    )
+    # First page up front, so bad filters are a 400 rather than a broken stream
+    try:
+        first_page, cursor = store.list_applications(EXPORT_PAGE_SIZE, filters=filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    def applications():
+        page, next_cursor = first_page, cursor
+        while True:
+            yield from page
+            if next_cursor is None:
+                return
+            page, next_cursor = store.list_applications(EXPORT_PAGE_SIZE, cursor=next_cursor, filters=filters)
+    
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    return StreamingResponse(
+        # Sync generator - Starlette iterates it in a worker thread
+        iter_letter_zip(applications(), render=generate_sanction_letter, workers=workers),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="sanction_letters_{stamp}.zip"'},
+    )
+
+
+# ============================================================================
+# Bulk Underwriting
+# ============================================================================
+
+# Request bodies above this size are spooled to disk instead of memory
+BULK_UPLOAD_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+@app.post("/underwriting/batch")
+async def underwriting_batch(
+    request: Request,
+    input_format: Optional[Literal["csv", "jsonl"]] = None,
+    output_format: Literal["csv", "jsonl"] = "jsonl",
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=100, le=100000),
+):
+    """
+    Underwrite an uploaded prospect list (e.g. a pre-approved campaign).
+    
+    The raw request body is a CSV (with header) or JSONL file in the
+    customers.json shape plus optional loan fields - see
+    services/bulk_underwriting.py. Scoring runs in chunks on a process pool
+    and results are streamed back in input order.
+    
+    Query params:
+        - input_format: csv | jsonl (default: from Content-Type, else csv)
+        - output_format: csv | jsonl (default: jsonl)
+        - chunk_size: Rows per worker chunk
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=BULK_UPLOAD_SPOOL_BYTES)
+    async for block in request.stream():
+        spool.write(block)
+    spool.seek(0)
+    
+    source_format = input_format or detect_format(None, request.headers.get("content-type"))
+    source = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+    
+    def generate():
+        # Sync generator - Starlette iterates it in a worker thread
+        try:
+            records = iter_records(source, source_format)
+            yield from format_results(underwrite_stream(records, chunk_size), output_format)
+        finally:
+            source.close()
+    
+    media_type = "text/csv" if output_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="underwriting_results.{output_format}"'},
+    )
@@ -23,6 +23,13 @@ class LoanStatus(str, Enum):
     PENDING_REVIEW = "Pending Review"  # Human-in-the-loop cases
 
 
+class LetterStatus(str, Enum):
+    """Sanction letter generation states (background job, services/letter_jobs.py)."""
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+
+
 class LoanApplication(BaseModel):
     """
     Represents a loan application entity.
@@ -32,14 +39,15 @@ class LoanApplication(BaseModel):
     - Status tracking through the agent workflow
     - Loan amount when captured
     - Risk assessment data
-    - Sanction letter filename when approved
+    - Sanction letter filename and generation status when approved
     - Timestamps for audit trail
     """
     application_id: str  # Same as session_id (LOAN-XXXX format)
     user_id: Optional[str] = None
     loan_amount: Optional[float] = None
     status: LoanStatus = LoanStatus.INITIATED
-    sanction_letter: Optional[str] = None  # PDF filename when sanctioned
+    sanction_letter: Optional[str] = None  # PDF filename once generated
+    sanction_letter_status: Optional[LetterStatus] = None  # pending / ready / failed
     # Risk Assessment Fields
     risk_score: Optional[int] = None  # 0-100, lower is better
     risk_level: Optional[str] = None  # Low / Medium / High
@@ -57,6 +65,7 @@ class LoanApplicationResponse(BaseModel):
     loan_amount: Optional[float] = None
     status: str
     sanction_letter: Optional[str] = None
+    sanction_letter_status: Optional[str] = None
     # Risk Assessment Fields
     risk_score: Optional[int] = None
     risk_level: Optional[str] = None
@@ -65,9 +74,17 @@ class LoanApplicationResponse(BaseModel):
 
 
 class LoanApplicationListResponse(BaseModel):
-    """Response model for applications list."""
-    total: int
+    """Response model for applications list (one page, newest first)."""
+    total: Optional[int] = None  # Applications matching the filters, across all pages (?with_total=true)
+    count: int  # Applications in this page
     applications: list[LoanApplicationResponse]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to fetch the next page; None on last page
+
+
+class ApplicationStatsResponse(BaseModel):
+    """Application counts for the given filters (all pages)."""
+    total: int
+    by_status: dict[str, int]  # Status value -> count; statuses with no match are omitted
 
 
 # ============================================================================
@@ -100,6 +117,7 @@ class AuthResponse(BaseModel):
     token: str
     user_id: str
     email: str
+    expires_in: Optional[int] = None  # seconds until the token expires (slides with use)
 
 
 class UserResponse(BaseModel):
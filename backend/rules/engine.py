@@ -0,0 +1,403 @@
+"""
+Underwriting Rules Engine
+=========================
+Single source of truth for underwriting policy.
+
+Thresholds and rules live in a config file (rules/policy.json by default).
+Each named ruleset is an ordered list of rules; the first rule whose
+conditions all hold decides the outcome, and the last rule must be a
+catch-all. Rulesets in the default policy:
+
+- affordability   EMI-to-salary check used by the underwriting agent
+- sanction        automated approval vs human review (auto approval limit)
+- eligibility     credit score / pre-approved limit rules (run_underwriting)
+
+Compilation: every distinct condition becomes one bit, and the rules are
+precomputed into a decision table indexed by the bit pattern. Evaluating a
+request tests each condition once and does a single table lookup, for one
+application or (with NumPy) a whole batch.
+
+Hot reload: the policy file's mtime is checked at most every
+POLICY_RELOAD_INTERVAL seconds. A changed file is recompiled and swapped in;
+an invalid file is logged and the previous policy stays active.
+
+Rule format:
+    {"name": "instant_approval",
+     "when": [["loan_amount", "le", "preapproved_limit"]],
+     "then": {"status": "approved", "credit_score": "$credit_score"}}
+
+- Conditions are [feature, op, operand] with op in lt/le/gt/ge/eq/ne.
+- Operands are a number, a boolean, a param or feature name, or a product
+  "a * b" of those (e.g. "max_emi_to_salary * salary").
+- Outcome strings are formatted with the params ("{max_emi_to_salary:.0%}");
+  "$name" is replaced by that input's value (single evaluation only).
+
+Configuration (environment):
+- UNDERWRITING_POLICY_PATH=<path>    policy file (default: rules/policy.json)
+- POLICY_RELOAD_INTERVAL=<seconds>   mtime check interval (default: 5)
+
+Usage:
+    from rules.engine import rules_engine
+
+    rules_engine.evaluate("affordability", emi=4000, salary=30000)
+    rules_engine.evaluate_batch("eligibility", loan_amount=amounts, ...)
+    rules_engine.param("auto_approval_limit")
+"""
+
+import json
+import operator
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+DEFAULT_POLICY_PATH = os.path.join(os.path.dirname(__file__), "policy.json")
+POLICY_RELOAD_INTERVAL = float(os.getenv("POLICY_RELOAD_INTERVAL") or 5.0)  # seconds
+
+# Decision tables grow as 2^conditions; longer rulesets fall back to first-match scan
+MAX_TABLE_CONDITIONS = 16
+
+OPERATORS = {
+    "lt": operator.lt,
+    "le": operator.le,
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "eq": operator.eq,
+    "ne": operator.ne,
+}
+
+
+class PolicyError(ValueError):
+    """Raised when a policy file cannot be compiled."""
+
+
+# =============================================================================
+# Features
+# =============================================================================
+# Raw inputs are used as-is (missing numbers count as 0); derived features are
+# computed from them so rules never divide by zero.
+
+INPUT_FEATURES = ("loan_amount", "salary", "emi", "credit_score", "preapproved_limit", "tenure")
+DERIVED_FEATURES = ("emi_to_salary", "income_known")
+
+
+def _derive(values: Dict[str, Any]) -> Dict[str, Any]:
+    salary = values.get("salary") or 0
+    emi = values.get("emi") or 0
+    values["emi_to_salary"] = emi / salary if salary > 0 else 1.0
+    values["income_known"] = bool(salary) and bool(emi)
+    return values
+
+
+def _derive_batch(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    salary = columns.get("salary")
+    emi = columns.get("emi")
+    if salary is not None and emi is not None:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            columns["emi_to_salary"] = np.where(salary > 0, emi / salary, 1.0)
+        columns["income_known"] = (salary != 0) & (emi != 0)
+    return columns
+
+
+# =============================================================================
+# Compilation
+# =============================================================================
+
+class _Operand:
+    """A constant, or coefficient x feature."""
+
+    __slots__ = ("constant", "coefficient", "feature")
+
+    def __init__(self, constant=None, coefficient: float = 1.0, feature: Optional[str] = None):
+        self.constant = constant
+        self.coefficient = coefficient
+        self.feature = feature
+
+    def value(self, values):
+        if self.feature is None:
+            return self.constant
+        return self.coefficient * values[self.feature]
+
+    @property
+    def key(self):
+        return (self.constant, self.coefficient, self.feature)
+
+
+def _parse_operand(spec: Any, params: Dict[str, Any]) -> _Operand:
+    if isinstance(spec, (bool, int, float)):
+        return _Operand(constant=spec)
+    if not isinstance(spec, str):
+        raise PolicyError(f"Unsupported operand: {spec!r}")
+
+    coefficient = 1.0
+    feature = None
+    for term in (t.strip() for t in spec.split("*")):
+        if term in params:
+            coefficient *= params[term]
+        elif term in INPUT_FEATURES or term in DERIVED_FEATURES:
+            if feature is not None:
+                raise PolicyError(f"Operand multiplies two features: {spec!r}")
+            feature = term
+        else:
+            try:
+                coefficient *= float(term)
+            except ValueError:
+                raise PolicyError(f"Unknown name in operand: {term!r}")
+    if feature is None:
+        return _Operand(constant=coefficient)
+    return _Operand(coefficient=coefficient, feature=feature)
+
+
+class _Condition:
+    __slots__ = ("feature", "op", "operand")
+
+    def __init__(self, feature: str, op: str, operand: _Operand):
+        self.feature = feature
+        self.op = op
+        self.operand = operand
+
+    @property
+    def key(self):
+        return (self.feature, self.op, self.operand.key)
+
+    def test(self, values: Dict[str, Any]) -> bool:
+        return bool(OPERATORS[self.op](values[self.feature], self.operand.value(values)))
+
+    def test_batch(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        return np.asarray(OPERATORS[self.op](columns[self.feature], self.operand.value(columns)), dtype=bool)
+
+
+class _Rule:
+    __slots__ = ("name", "mask", "then")
+
+    def __init__(self, name: str, mask: int, then: Dict[str, Any]):
+        self.name = name
+        self.mask = mask
+        self.then = then
+
+
+class CompiledRuleset:
+    """One ruleset compiled to distinct conditions plus a decision table."""
+
+    def __init__(self, name: str, rules: List[Dict[str, Any]], params: Dict[str, Any]):
+        if not rules:
+            raise PolicyError(f"Ruleset '{name}' is empty")
+        if rules[-1].get("when"):
+            raise PolicyError(f"Ruleset '{name}' must end with a catch-all rule (no 'when')")
+
+        self.name = name
+        self.conditions: List[_Condition] = []
+        self.rules: List[_Rule] = []
+        index_by_key: Dict[Tuple, int] = {}
+
+        for position, rule in enumerate(rules):
+            mask = 0
+            for clause in rule.get("when") or []:
+                if len(clause) != 3:
+                    raise PolicyError(f"{name}[{position}]: condition must be [feature, op, operand]")
+                feature, op, operand = clause
+                if feature not in INPUT_FEATURES and feature not in DERIVED_FEATURES:
+                    raise PolicyError(f"{name}[{position}]: unknown feature {feature!r}")
+                if op not in OPERATORS:
+                    raise PolicyError(f"{name}[{position}]: unknown operator {op!r}")
+                condition = _Condition(feature, op, _parse_operand(operand, params))
+                index = index_by_key.get(condition.key)
+                if index is None:
+                    index = index_by_key[condition.key] = len(self.conditions)
+                    self.conditions.append(condition)
+                mask |= 1 << index
+            then = {
+                key: value.format(**params) if isinstance(value, str) and not value.startswith("$") else value
+                for key, value in (rule.get("then") or {}).items()
+            }
+            self.rules.append(_Rule(rule.get("name") or f"rule_{position}", mask, then))
+
+        self.outcome_keys = sorted({key for rule in self.rules for key in rule.then})
+
+        # Decision table: bit pattern of condition results -> index of first matching rule
+        self.table: Optional[np.ndarray] = None
+        if len(self.conditions) <= MAX_TABLE_CONDITIONS:
+            size = 1 << len(self.conditions)
+            table = np.empty(size, dtype=np.int32)
+            for pattern in range(size):
+                table[pattern] = next(i for i, r in enumerate(self.rules) if pattern & r.mask == r.mask)
+            self.table = table
+
+        # Per-rule outcome columns for batch evaluation ($refs are left empty)
+        self._outcome_columns = {
+            key: np.array([_static(rule.then.get(key)) for rule in self.rules], dtype=object)
+            for key in self.outcome_keys
+        }
+        self._rule_names = np.array([rule.name for rule in self.rules], dtype=object)
+
+    def _match(self, values: Dict[str, Any]) -> _Rule:
+        if self.table is not None:
+            pattern = 0
+            for index, condition in enumerate(self.conditions):
+                if condition.test(values):
+                    pattern |= 1 << index
+            return self.rules[self.table[pattern]]
+        for rule in self.rules:
+            if all(self.conditions[i].test(values) for i in _bits(rule.mask)):
+                return rule
+        return self.rules[-1]
+
+    def evaluate(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        rule = self._match(values)
+        outcome = {"rule": rule.name}
+        for key, value in rule.then.items():
+            if isinstance(value, str) and value.startswith("$"):
+                value = values.get(value[1:])
+            outcome[key] = value
+        return outcome
+
+    def evaluate_batch(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        n = len(next(iter(columns.values())))
+        results = [condition.test_batch(columns) for condition in self.conditions]
+
+        if self.table is not None:
+            pattern = np.zeros(n, dtype=np.int64)
+            for index, result in enumerate(results):
+                pattern |= result.astype(np.int64) << index
+            rule_index = self.table[pattern]
+        else:
+            choices = [
+                np.logical_and.reduce([results[i] for i in _bits(rule.mask)]) if rule.mask else np.ones(n, dtype=bool)
+                for rule in self.rules
+            ]
+            rule_index = np.select(choices, np.arange(len(self.rules)), default=len(self.rules) - 1)
+
+        outcome = {"rule": self._rule_names[rule_index]}
+        for key, values in self._outcome_columns.items():
+            outcome[key] = values[rule_index]
+        return outcome
+
+
+def _static(value: Any) -> Any:
+    if isinstance(value, str) and value.startswith("$"):
+        return ""
+    return "" if value is None else value
+
+
+def _bits(mask: int):
+    index = 0
+    while mask:
+        if mask & 1:
+            yield index
+        mask >>= 1
+        index += 1
+
+
+class CompiledPolicy:
+    """All rulesets of one policy file, compiled."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.version = str(config.get("version", "unversioned"))
+        self.params: Dict[str, Any] = dict(config.get("params") or {})
+        clash = set(self.params) & (set(INPUT_FEATURES) | set(DERIVED_FEATURES))
+        if clash:
+            raise PolicyError(f"Params shadow features: {sorted(clash)}")
+        rulesets = config.get("rulesets") or {}
+        if not rulesets:
+            raise PolicyError("Policy defines no rulesets")
+        self.rulesets = {
+            name: CompiledRuleset(name, rules, self.params) for name, rules in rulesets.items()
+        }
+
+    def ruleset(self, name: str) -> CompiledRuleset:
+        try:
+            return self.rulesets[name]
+        except KeyError:
+            raise PolicyError(f"Unknown ruleset: {name}")
+
+
+def compile_policy(config: Dict[str, Any]) -> CompiledPolicy:
+    """Compile a policy dict (as loaded from the policy file)."""
+    return CompiledPolicy(config)
+
+
+# =============================================================================
+# Engine (hot-reloading)
+# =============================================================================
+
+class RulesEngine:
+    """
+    Loads and compiles the policy file, re-checking it for changes.
+
+    Thread-safe. Callers always see a fully compiled policy.
+    """
+
+    def __init__(self, policy_path: str = None, reload_interval: float = POLICY_RELOAD_INTERVAL):
+        self.policy_path = policy_path or DEFAULT_POLICY_PATH
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._policy: Optional[CompiledPolicy] = None
+        self._mtime: Optional[int] = None
+        self._checked_at = 0.0
+
+    def _load(self) -> None:
+        mtime = os.stat(self.policy_path).st_mtime_ns
+        with open(self.policy_path, "r", encoding="utf-8") as f:
+            policy = compile_policy(json.load(f))
+        self._policy = policy
+        self._mtime = mtime
+        print(f"[RULES ENGINE] Loaded policy {policy.version} from {self.policy_path}")
+
+    def policy(self) -> CompiledPolicy:
+        """Return the compiled policy, reloading it if the file changed."""
+        now = time.monotonic()
+        if self._policy is not None and now - self._checked_at < self.reload_interval:
+            return self._policy
+
+        with self._lock:
+            if self._policy is None:
+                self._load()
+                self._checked_at = now
+            elif now - self._checked_at >= self.reload_interval:
+                self._checked_at = now
+                try:
+                    mtime = os.stat(self.policy_path).st_mtime_ns
+                except OSError:
+                    mtime = self._mtime
+                if mtime != self._mtime:
+                    try:
+                        self._load()
+                    except Exception as e:
+                        # Keep serving the last good policy
+                        self._mtime = mtime
+                        print(f"[RULES ENGINE] Reload failed, keeping policy {self._policy.version}: {e}")
+            return self._policy
+
+    def param(self, name: str) -> Any:
+        return self.policy().params[name]
+
+    def evaluate(self, ruleset: str, policy: Optional[CompiledPolicy] = None, **inputs: Any) -> Dict[str, Any]:
+        """
+        Evaluate one request; returns {"rule": name, **outcome}.
+
+        Pass `policy` (from policy()) to evaluate against the same snapshot
+        whose params the caller is using in its messages.
+        """
+        values = {name: inputs.get(name) for name in INPUT_FEATURES}
+        for name in INPUT_FEATURES:
+            if values[name] is None:
+                values[name] = 0
+        return (policy or self.policy()).ruleset(ruleset).evaluate(_derive(values))
+
+    def evaluate_batch(self, ruleset: str, **columns: Any) -> Dict[str, np.ndarray]:
+        """Evaluate equal-length input columns; returns one outcome column per key."""
+        arrays = {
+            name: np.nan_to_num(np.asarray(value, dtype=np.float64))
+            for name, value in columns.items()
+            if name in INPUT_FEATURES
+        }
+        if not arrays:
+            raise ValueError("evaluate_batch needs at least one input column")
+        return self.policy().ruleset(ruleset).evaluate_batch(_derive_batch(arrays))
+
+
+# Process-wide engine used by the agents, rules and bulk underwriting
+rules_engine = RulesEngine(os.getenv("UNDERWRITING_POLICY_PATH") or None)
@@ -1,5 +1,49 @@
-from backend.services.credit_bureau import fetch_credit_score
-from backend.services.offer_mart import get_preapproved_limit
+import asyncio
+
+from services.credit_bureau import get_credit_bureau_client
+from services.offer_mart import get_offer_mart_client
+
+import numpy as np
+
+from rules.engine import rules_engine
+
+
+def evaluate_underwriting_rules(
+    loan_amount: float,
+    salary,
+    expected_emi,
+    credit_score: int,
+    preapproved_limit: float,
+):
+    """
+    Underwriting rules for one application (no I/O).
+
+    Policy: the "eligibility" ruleset in rules/policy.json.
+    """
+    outcome = rules_engine.evaluate(
+        "eligibility",
+        loan_amount=loan_amount,
+        salary=salary,
+        emi=expected_emi,
+        credit_score=credit_score,
+        preapproved_limit=preapproved_limit,
+    )
+    outcome.pop("rule")
+    return outcome
+
+
+async def fetch_underwriting_inputs(customer_id: str):
+    """
+    Fetch (credit_score, preapproved_limit) concurrently.
+
+    Lookups for the same customer_id already in flight are joined, and
+    bureau scores are served from the client's TTL cache.
+    """
+    return await asyncio.gather(
+        get_credit_bureau_client().lookup(customer_id),
+        get_offer_mart_client().lookup(customer_id),
+    )
+
 
 async def run_underwriting(customer_id: str, loan_details: dict):
     """
@@ -10,47 +54,32 @@ async def run_underwriting(customer_id: str, loan_details: dict):
     salary = loan_details.get("salary")
     expected_emi = loan_details.get("expected_emi")
 
-    credit_score = fetch_credit_score(customer_id)
-    preapproved_limit = get_preapproved_limit(customer_id)
-
-    # ❌ Rule 3: Reject if credit score < 700
-    if credit_score < 700:
-        return {
-            "status": "rejected",
-            "reason": "Low credit score",
-            "credit_score": credit_score
-        }
-
-    # ✅ Rule 1: Instant approval
-    if loan_amount <= preapproved_limit:
-        return {
-            "status": "approved",
-            "approval_type": "instant",
-            "credit_score": credit_score
-        }
-
-    # ⚠️ Rule 2: Salary slip required
-    if loan_amount <= 2 * preapproved_limit:
-        if not salary or not expected_emi:
-            return {
-                "status": "salary_slip_required",
-                "message": "Please upload your latest salary slip"
-            }
-
-        if expected_emi <= 0.5 * salary:
-            return {
-                "status": "approved",
-                "approval_type": "salary_verified",
-                "credit_score": credit_score
-            }
-
-        return {
-            "status": "rejected",
-            "reason": "EMI exceeds 50% of salary"
-        }
-
-    # ❌ Rule 3: Loan amount too high
+    credit_score, preapproved_limit = await fetch_underwriting_inputs(customer_id)
+
+    return evaluate_underwriting_rules(loan_amount, salary, expected_emi, credit_score, preapproved_limit)
+
+
+def evaluate_underwriting_rules_batch(loan_amount, salary, expected_emi, credit_score, preapproved_limit):
+    """
+    Vectorized evaluate_underwriting_rules() for bulk underwriting.
+
+    Takes equal-length arrays (missing salary / EMI as 0) and returns
+    columns status, approval_type and reason ("" where not applicable).
+    """
+    outcome = rules_engine.evaluate_batch(
+        "eligibility",
+        loan_amount=loan_amount,
+        salary=salary,
+        emi=expected_emi,
+        credit_score=credit_score,
+        preapproved_limit=preapproved_limit,
+    )
+    reason = outcome.get("reason")
+    message = outcome.get("message")
+    if reason is not None and message is not None:
+        reason = np.where(reason == "", message, reason).astype(object)
     return {
-        "status": "rejected",
-        "reason": "Loan amount exceeds eligibility"
+        "status": outcome["status"],
+        "approval_type": outcome["approval_type"],
+        "reason": reason if reason is not None else message,
     }
@@ -0,0 +1,314 @@
+"""
+Artifact Store
+==============
+Content-addressed, sharded storage for generated files (sanction letters).
+
+Letters used to be written flat into generated/ as sanction_<id>.pdf, one
+directory entry per letter, rewritten in place whenever a letter was
+regenerated. Large flat directories make every create, lookup and listing
+slower, and an in-place rewrite can race a download.
+
+Layout:
+    generated/objects/ab/cd/abcd...ef     one blob per distinct content (sha256)
+    data/artifacts.db                     name -> digest index (SQLite, WAL)
+
+- A blob's path is derived from its digest, so identical content is stored
+  once and a blob is never modified after it is written.
+- Names ("sanction_LOAN-1234.pdf") are rows in the index. Regenerating a
+  letter writes a new blob and re-points the name; the old blob becomes
+  garbage.
+- Two levels of 256-way sharding keep each directory small at millions of
+  blobs.
+
+The digest doubles as a strong ETag: /files/<name> is revalidated cheaply
+with If-None-Match, and /files/objects/<digest> never changes, so it is
+served with a one-year immutable Cache-Control.
+
+Garbage collection removes blobs no name points at (after a grace period, so
+a blob being written is never collected) and, optionally, names whose loan
+application no longer exists.
+
+Configuration (environment):
+- ARTIFACT_ROOT=<dir>            blob directory root (default: generated)
+- ARTIFACT_INDEX=<path>          name index (default: data/artifacts.db)
+- ARTIFACT_GC_GRACE=<seconds>    minimum blob age before GC (default: 3600)
+
+CLI:
+    cd backend
+    python -m services.artifact_store import generated    # adopt flat legacy files
+    python -m services.artifact_store gc [--prune-orphans]
+    python -m services.artifact_store stats
+"""
+
+import argparse
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional
+
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+ARTIFACT_ROOT = os.getenv("ARTIFACT_ROOT") or os.path.join(BACKEND_DIR, "generated")
+ARTIFACT_INDEX = os.getenv("ARTIFACT_INDEX") or os.path.join(BACKEND_DIR, "data", "artifacts.db")
+ARTIFACT_GC_GRACE = float(os.getenv("ARTIFACT_GC_GRACE") or 3600)
+
+OBJECTS_DIR = "objects"
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    name        TEXT PRIMARY KEY,
+    digest      TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    media_type  TEXT NOT NULL,
+    updated_at  REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_artifacts_digest ON artifacts (digest);
+"""
+
+
+class Artifact(NamedTuple):
+    """A named artifact and the blob it points at."""
+    name: str
+    digest: str
+    size: int
+    media_type: str
+    updated_at: float
+    path: str
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest}"'
+
+
+def is_valid_name(name: str) -> bool:
+    """Names are single path segments (no separators, no dot-files)."""
+    return bool(name) and os.path.basename(name) == name and not name.startswith(".")
+
+
+class ArtifactStore:
+    """Content-addressed blobs under `root`, with a SQLite name index."""
+
+    def __init__(self, root: str, index_path: str):
+        self.root = os.path.abspath(root)
+        self.objects_root = os.path.join(self.root, OBJECTS_DIR)
+        self.index_path = index_path
+        self._local = threading.local()
+
+        os.makedirs(self.objects_root, exist_ok=True)
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+
+    # ---- Connection management --------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    # ---- Blobs --------------------------------------------------------------
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_root, digest[:2], digest[2:4], digest)
+
+    def _write_object(self, digest: str, content: bytes) -> str:
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            # Dedup hit. Refresh the mtime so a concurrent GC pass, which only
+            # collects blobs older than the grace period, leaves it alone.
+            os.utime(path)
+            return path
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            os.fchmod(fd, 0o644)
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return path
+
+    # ---- Names --------------------------------------------------------------
+    def put(self, name: str, content: bytes, media_type: Optional[str] = None) -> Artifact:
+        """Store `content` (deduplicated) and point `name` at it."""
+        if not is_valid_name(name):
+            raise ValueError(f"Invalid artifact name: {name!r}")
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._write_object(digest, content)
+        media_type = media_type or mimetypes.guess_type(name)[0] or "application/octet-stream"
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO artifacts (name, digest, size, media_type, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (name, digest, len(content), media_type, now),
+        )
+        return Artifact(name, digest, len(content), media_type, now, path)
+
+    def get(self, name: str) -> Optional[Artifact]:
+        row = self._conn().execute(
+            "SELECT name, digest, size, media_type, updated_at FROM artifacts WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return None
+        return Artifact(*row, path=self.object_path(row[1]))
+
+    def delete(self, name: str) -> bool:
+        """Drop a name; its blob is reclaimed by the next GC pass if unreferenced."""
+        return self._conn().execute("DELETE FROM artifacts WHERE name = ?", (name,)).rowcount > 0
+
+    def stats(self) -> Dict[str, int]:
+        names, blobs, logical = self._conn().execute(
+            "SELECT COUNT(*), COUNT(DISTINCT digest), COALESCE(SUM(size), 0) FROM artifacts"
+        ).fetchone()
+        return {"names": names, "blobs": blobs, "logical_bytes": logical}
+
+    # ---- Maintenance --------------------------------------------------------
+    def import_file(self, path: str, name: Optional[str] = None, remove: bool = False) -> Artifact:
+        """Adopt an existing file (e.g. a legacy flat letter) under `name`."""
+        with open(path, "rb") as f:
+            artifact = self.put(name or os.path.basename(path), f.read())
+        if remove:
+            os.remove(path)
+        return artifact
+
+    def collect_garbage(
+        self,
+        is_live: Optional[Callable[[str], bool]] = None,
+        grace_seconds: float = ARTIFACT_GC_GRACE,
+    ) -> Dict[str, int]:
+        """
+        Delete names rejected by `is_live` (if given), then every blob older
+        than `grace_seconds` that no name points at.
+
+        Blobs are scanned one shard directory at a time, checked against the
+        index rows for that shard's digest prefix, so memory stays flat no
+        matter how many letters exist.
+        """
+        conn = self._conn()
+        names_removed = objects_removed = bytes_freed = 0
+
+        if is_live is not None:
+            dead = [name for (name,) in conn.execute("SELECT name FROM artifacts") if not is_live(name)]
+            for name in dead:
+                conn.execute("DELETE FROM artifacts WHERE name = ?", (name,))
+            names_removed = len(dead)
+
+        cutoff = time.time() - grace_seconds
+        for top in _subdirs(self.objects_root):
+            for leaf in _subdirs(os.path.join(self.objects_root, top)):
+                prefix = top + leaf
+                referenced = {
+                    digest for (digest,) in conn.execute(
+                        "SELECT DISTINCT digest FROM artifacts WHERE digest >= ? AND digest < ?",
+                        (prefix, prefix + "g"),  # "g" sorts after every hex digit
+                    )
+                }
+                with os.scandir(os.path.join(self.objects_root, top, leaf)) as entries:
+                    for entry in entries:
+                        if entry.name in referenced or not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                        if stat.st_mtime > cutoff:
+                            continue
+                        os.remove(entry.path)
+                        objects_removed += 1
+                        bytes_freed += stat.st_size
+
+        print(f"[ARTIFACTS] GC: {names_removed} orphaned names, {objects_removed} blobs ({bytes_freed} bytes) removed")
+        return {"names_removed": names_removed, "objects_removed": objects_removed, "bytes_freed": bytes_freed}
+
+
+def _subdirs(path: str):
+    try:
+        with os.scandir(path) as entries:
+            return sorted(entry.name for entry in entries if entry.is_dir() and len(entry.name) == 2)
+    except FileNotFoundError:
+        return []
+
+
+# =============================================================================
+# Process-wide store
+# =============================================================================
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Return the process-wide artifact store (created on first use)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ArtifactStore(ARTIFACT_ROOT, ARTIFACT_INDEX)
+    return _store
+
+
+def letter_is_live(name: str) -> bool:
+    """A sanction letter is live while its loan application exists."""
+    from services.store import get_store
+
+    match = re.match(r"^sanction_(.+)\.pdf$", name)
+    return match is None or get_store().get_application(match.group(1)) is not None
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain the generated-artifact store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    adopt = commands.add_parser("import", help="Adopt flat files from a directory (e.g. legacy letters)")
+    adopt.add_argument("directory", nargs="?", default=ARTIFACT_ROOT)
+    adopt.add_argument("--pattern", default=r"^sanction_.+\.pdf$")
+    adopt.add_argument("--keep", action="store_true", help="Leave the original files in place")
+
+    gc = commands.add_parser("gc", help="Delete unreferenced blobs")
+    gc.add_argument("--grace", type=float, default=ARTIFACT_GC_GRACE)
+    gc.add_argument("--prune-orphans", action="store_true",
+                    help="Also drop letters whose application is gone (needs STORE_BACKEND=sqlite)")
+
+    commands.add_parser("stats", help="Name / blob counts")
+
+    args = parser.parse_args(argv)
+    store = get_artifact_store()
+
+    if args.command == "import":
+        pattern = re.compile(args.pattern)
+        imported = 0
+        with os.scandir(args.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and pattern.match(entry.name):
+                    store.import_file(entry.path, remove=not args.keep)
+                    imported += 1
+        print(f"[ARTIFACTS] Imported {imported} files from {args.directory}")
+    elif args.command == "gc":
+        if args.prune_orphans and (os.getenv("STORE_BACKEND") or "memory").lower() != "sqlite":
+            print("[ARTIFACTS] --prune-orphans needs a persistent store (STORE_BACKEND=sqlite)")
+            return 2
+        store.collect_garbage(letter_is_live if args.prune_orphans else None, args.grace)
+    else:
+        print(json.dumps(store.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
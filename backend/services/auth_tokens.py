@@ -0,0 +1,238 @@
+"""
+Auth Tokens
+===========
+Session-token issuing and validation with expiry, a per-user cap and
+sliding refresh.
+
+Tokens used to be UUIDs that never expired; every /login added one, so the
+token table only ever grew. Now:
+
+- Every token has an expiry (AUTH_TOKEN_TTL). Validation is one primary-key
+  lookup plus a timestamp compare; expired tokens are rejected immediately
+  and purged in bulk at most once per AUTH_TOKEN_SWEEP_INTERVAL (a timing
+  wheel in the in-memory store, an indexed DELETE in SQLite).
+- Sliding refresh: a token used after AUTH_TOKEN_REFRESH_INTERVAL has
+  elapsed since its last refresh gets a fresh TTL, so active users stay
+  logged in while the store sees at most one write per interval per token.
+- Each user keeps at most AUTH_MAX_TOKENS_PER_USER tokens; logging in once
+  more evicts the oldest.
+
+Token formats:
+- opaque  (default) random 256-bit token, stored server-side
+- signed  "v1.<payload>.<hmac>" carrying user id and expiry, validated with
+          HMAC-SHA256 and no store lookup. Logout revokes it only on this
+          worker (an in-memory denylist until it expires), refresh means
+          exchanging it at POST /refresh-token, and the per-user cap does not
+          apply, so keep the TTL short. Set AUTH_TOKEN_SECRET to the same
+          value on every worker.
+
+Both formats are accepted whatever the mode, so switching modes does not
+log anyone out.
+
+Configuration (environment):
+- AUTH_TOKEN_MODE=opaque|signed          (default: opaque)
+- AUTH_TOKEN_TTL=<seconds>               (default: 86400)
+- AUTH_TOKEN_REFRESH_INTERVAL=<seconds>  (default: 300)
+- AUTH_MAX_TOKENS_PER_USER=<n>           (default: 5)
+- AUTH_TOKEN_SWEEP_INTERVAL=<seconds>    (default: 60)
+- AUTH_TOKEN_SECRET=<string>             HMAC key for signed tokens
+
+Usage:
+    from services.auth_tokens import get_token_manager
+
+    tokens = get_token_manager()
+    token = tokens.issue(user_id)
+    user_id = tokens.validate(token)     # None if unknown / expired / revoked
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from services.store import StorageBackend, get_store
+from utils.expiry_wheel import ExpiryWheel
+
+
+AUTH_TOKEN_MODE = (os.getenv("AUTH_TOKEN_MODE") or "opaque").strip().lower()
+AUTH_TOKEN_TTL = float(os.getenv("AUTH_TOKEN_TTL") or 86400)
+AUTH_TOKEN_REFRESH_INTERVAL = float(os.getenv("AUTH_TOKEN_REFRESH_INTERVAL") or 300)
+AUTH_MAX_TOKENS_PER_USER = int(os.getenv("AUTH_MAX_TOKENS_PER_USER") or 5)
+AUTH_TOKEN_SWEEP_INTERVAL = float(os.getenv("AUTH_TOKEN_SWEEP_INTERVAL") or 60)
+AUTH_TOKEN_SECRET = os.getenv("AUTH_TOKEN_SECRET") or ""
+
+SIGNED_PREFIX = "v1."
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class TokenManager:
+    """Issues, validates, refreshes and revokes auth tokens on top of a store."""
+
+    def __init__(
+        self,
+        store: StorageBackend,
+        mode: str = "opaque",
+        ttl: float = 86400,
+        refresh_interval: float = 300,
+        max_per_user: int = 5,
+        sweep_interval: float = 60,
+        secret: str = "",
+    ):
+        if mode not in ("opaque", "signed"):
+            print(f"[AUTH] Unknown AUTH_TOKEN_MODE '{mode}', using opaque tokens")
+            mode = "opaque"
+        self.store = store
+        self.mode = mode
+        self.ttl = ttl
+        self.refresh_interval = min(refresh_interval, ttl)
+        self.max_per_user = max(1, max_per_user)
+        self.sweep_interval = sweep_interval
+
+        if not secret and mode == "signed":
+            print("[AUTH] AUTH_TOKEN_SECRET not set - signed tokens are only valid in this process")
+        self._key = (secret or secrets.token_hex(32)).encode("utf-8")
+
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+        # Revoked signed tokens (nonce -> expiry) until they would expire anyway
+        self._revoked: Dict[str, float] = {}
+        self._revoked_expiry = ExpiryWheel(resolution=60.0)
+
+    # ---- Issue ----------------------------------------------------------------
+    def issue(self, user_id: str) -> str:
+        """New token for a user (evicting the user's oldest beyond the cap)."""
+        now = time.time()
+        self._maybe_sweep(now)
+        if self.mode == "signed":
+            return self._sign(user_id, now + self.ttl)
+
+        token = secrets.token_urlsafe(32)
+        self.store.save_token(token, user_id, now + self.ttl)
+        surplus = self.store.user_tokens(user_id)[:-self.max_per_user]
+        for old in surplus:
+            self.store.delete_token(old)
+        if surplus:
+            print(f"[AUTH] Evicted {len(surplus)} oldest token(s) for user {user_id}")
+        return token
+
+    # ---- Validate -------------------------------------------------------------
+    def validate(self, token: str) -> Optional[str]:
+        """user_id for a live token, else None. Slides the expiry of opaque tokens."""
+        now = time.time()
+        self._maybe_sweep(now)
+        if token.startswith(SIGNED_PREFIX):
+            claims = self._verify(token)
+            if claims is None or claims[1] <= now or claims[2] in self._revoked:
+                return None
+            return claims[0]
+
+        entry = self.store.get_token(token)
+        if entry is None:
+            return None
+        user_id, expires_at = entry
+        if expires_at <= now:
+            return None
+        # Refresh at most once per refresh_interval (expires_at was set to
+        # refreshed_at + ttl, so the remaining lifetime tells when that was)
+        if expires_at - now < self.ttl - self.refresh_interval:
+            self.store.refresh_token(token, now + self.ttl)
+        return user_id
+
+    # ---- Refresh / revoke -----------------------------------------------------
+    def refresh(self, token: str) -> Optional[str]:
+        """
+        Exchange a live token for one with a full TTL.
+
+        Opaque tokens are extended in place and returned unchanged; signed
+        tokens cannot change, so a new one is issued and the old one revoked.
+        """
+        user_id = self.validate(token)
+        if user_id is None:
+            return None
+        if not token.startswith(SIGNED_PREFIX):
+            self.store.refresh_token(token, time.time() + self.ttl)
+            return token
+        self.revoke(token)
+        return self._sign(user_id, time.time() + self.ttl)
+
+    def revoke(self, token: str) -> bool:
+        """Invalidate a token (logout). Returns True if it was live."""
+        if not token.startswith(SIGNED_PREFIX):
+            return self.store.delete_token(token)
+        claims = self._verify(token)
+        if claims is None or claims[1] <= time.time():
+            return False
+        with self._lock:
+            self._revoked[claims[2]] = claims[1]
+            self._revoked_expiry.schedule(claims[2], claims[1])
+        return True
+
+    def _maybe_sweep(self, now: float) -> None:
+        if now < self._next_sweep:
+            return
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.sweep_interval
+            for nonce in self._revoked_expiry.expired(now):
+                self._revoked.pop(nonce, None)
+        purged = self.store.purge_expired_tokens(now)
+        if purged:
+            print(f"[AUTH] Purged {purged} expired token(s)")
+
+    # ---- Signed tokens --------------------------------------------------------
+    def _signature(self, payload: str) -> str:
+        return _b64encode(hmac.new(self._key, payload.encode("ascii"), hashlib.sha256).digest())
+
+    def _sign(self, user_id: str, expires_at: float) -> str:
+        nonce = secrets.token_hex(8)
+        payload = _b64encode(f"{user_id}|{int(expires_at)}|{nonce}".encode("utf-8"))
+        return f"{SIGNED_PREFIX}{payload}.{self._signature(payload)}"
+
+    def _verify(self, token: str) -> Optional[Tuple[str, float, str]]:
+        """(user_id, expires_at, nonce) if the signature is valid."""
+        try:
+            payload, signature = token[len(SIGNED_PREFIX):].split(".")
+            if not hmac.compare_digest(signature, self._signature(payload)):
+                return None
+            user_id, expires_at, nonce = _b64decode(payload).decode("utf-8").rsplit("|", 2)
+            return user_id, float(expires_at), nonce
+        except (ValueError, UnicodeError):
+            return None
+
+
+# =============================================================================
+# Process-wide manager
+# =============================================================================
+
+_manager: Optional[TokenManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_token_manager() -> TokenManager:
+    """Return the process-wide token manager (created on first use)."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = TokenManager(
+                    get_store(),
+                    mode=AUTH_TOKEN_MODE,
+                    ttl=AUTH_TOKEN_TTL,
+                    refresh_interval=AUTH_TOKEN_REFRESH_INTERVAL,
+                    max_per_user=AUTH_MAX_TOKENS_PER_USER,
+                    sweep_interval=AUTH_TOKEN_SWEEP_INTERVAL,
+                    secret=AUTH_TOKEN_SECRET,
+                )
+    return _manager
@@ -0,0 +1,359 @@
+"""
+Bulk Underwriting
+=================
+Underwrites large prospect lists (e.g. pre-approved campaign uploads) outside
+the conversational /chat flow.
+
+Input is streamed row by row from CSV or JSONL, grouped into chunks, and each
+chunk is scored in a worker process: EMI and risk score via
+utils/batch_scoring.py (vectorized), then the rules in
+rules/underwriting_rules.py. Results are yielded in input order as soon as
+their chunk finishes, so neither the input nor the output is held in memory.
+
+Input fields (per row, customers.json shape plus loan fields):
+- id / customer_id, name, email
+- income / salary                  monthly salary
+- credit_score                     looked up via services/credit_bureau if absent
+- preapproved_limit                looked up via services/offer_mart if absent
+- loan_amount / amount             defaults to the pre-approved limit
+- tenure (months, default 24), interest_rate (default 10.5), is_verified
+
+Configuration (environment):
+- BULK_UNDERWRITING_WORKERS=<n>    process pool size (default: CPU count, 0 = in-process)
+- BULK_UNDERWRITING_CHUNK=<n>      rows per chunk (default: 5000)
+
+CLI:
+    cd backend
+    python -m services.bulk_underwriting prospects.csv -o results.jsonl
+    python -m services.bulk_underwriting prospects.jsonl --output-format csv > results.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from rules.underwriting_rules import evaluate_underwriting_rules_batch
+from services.credit_bureau import fetch_credit_score
+from services.offer_mart import get_preapproved_limit
+from utils.batch_scoring import FACTOR_COLUMNS, score_batch
+
+
+DEFAULT_CHUNK_SIZE = int(os.getenv("BULK_UNDERWRITING_CHUNK") or 5000)
+DEFAULT_WORKERS = int(os.getenv("BULK_UNDERWRITING_WORKERS") or (os.cpu_count() or 2))
+DEFAULT_TENURE = 24
+DEFAULT_INTEREST_RATE = 10.5
+
+INPUT_FORMATS = ("csv", "jsonl")
+
+OUTPUT_FIELDS = [
+    "customer_id", "name", "email",
+    "loan_amount", "salary", "tenure", "interest_rate",
+    "emi", "emi_to_salary_ratio",
+    "risk_score", "risk_level", "risk_factors",
+    "credit_score", "preapproved_limit",
+    "status", "approval_type", "reason",
+    "error",
+]
+
+
+# =============================================================================
+# Input Parsing
+# =============================================================================
+
+def iter_records(stream: IO[str], input_format: str) -> Iterator[Dict[str, Any]]:
+    """Yield one dict per input row from a text stream, without reading it all."""
+    if input_format == "csv":
+        yield from csv.DictReader(stream)
+    elif input_format == "jsonl":
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield {"_error": f"line {line_number}: invalid JSON ({e})"}
+    else:
+        raise ValueError(f"Unsupported input format: {input_format}")
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> str:
+    """Guess csv/jsonl from a filename or content type (default: csv)."""
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson")) or "ndjson" in (content_type or "") or "jsonl" in (content_type or ""):
+        return "jsonl"
+    return "csv"
+
+
+def _chunks(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _first(row: Dict[str, Any], *keys: str) -> Any:
+    for key in keys:
+        value = row.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _number(value: Any, default: Optional[float] = None) -> Optional[float]:
+    if value is None:
+        return default
+    return float(str(value).replace(",", ""))
+
+
+def _flag(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y", "verified")
+
+
+# =============================================================================
+# Chunk Scoring (runs in worker processes)
+# =============================================================================
+
+def underwrite_chunk(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Underwrite one chunk of raw input rows.
+
+    Rows that cannot be parsed are returned with only `error` set, in place,
+    so output order always matches input order.
+    """
+    results: List[Dict[str, Any]] = [None] * len(rows)
+    valid: List[int] = []
+    columns: Dict[str, list] = {
+        "loan_amount": [], "salary": [], "tenure": [], "interest_rate": [],
+        "is_verified": [], "credit_score": [], "preapproved_limit": [],
+    }
+
+    for index, row in enumerate(rows):
+        customer_id = str(_first(row, "customer_id", "id") or "")
+        base = {
+            "customer_id": customer_id,
+            "name": row.get("name"),
+            "email": row.get("email"),
+        }
+        if "_error" in row:
+            results[index] = {**base, "error": row["_error"]}
+            continue
+        try:
+            credit_score = _number(_first(row, "credit_score"))
+            if credit_score is None:
+                credit_score = fetch_credit_score(customer_id)
+            preapproved_limit = _number(_first(row, "preapproved_limit"))
+            if preapproved_limit is None:
+                preapproved_limit = get_preapproved_limit(customer_id)
+            loan_amount = _number(_first(row, "loan_amount", "amount"), preapproved_limit)
+            salary = _number(_first(row, "salary", "income"), 0.0)
+            tenure = _number(_first(row, "tenure"), DEFAULT_TENURE)
+            interest_rate = _number(_first(row, "interest_rate"), DEFAULT_INTEREST_RATE)
+        except (TypeError, ValueError) as e:
+            results[index] = {**base, "error": f"invalid number: {e}"}
+            continue
+
+        results[index] = base
+        valid.append(index)
+        columns["loan_amount"].append(loan_amount)
+        columns["salary"].append(salary)
+        columns["tenure"].append(tenure)
+        columns["interest_rate"].append(interest_rate)
+        columns["is_verified"].append(_flag(row.get("is_verified", False)))
+        columns["credit_score"].append(credit_score)
+        columns["preapproved_limit"].append(preapproved_limit)
+
+    if not valid:
+        return results
+
+    scores = score_batch(
+        loan_amount=np.array(columns["loan_amount"]),
+        salary=np.array(columns["salary"]),
+        tenure=np.array(columns["tenure"]),
+        interest_rate=np.array(columns["interest_rate"]),
+        is_verified=np.array(columns["is_verified"]),
+    )
+    rules = evaluate_underwriting_rules_batch(
+        loan_amount=columns["loan_amount"],
+        salary=columns["salary"],
+        expected_emi=scores["emi"],
+        credit_score=columns["credit_score"],
+        preapproved_limit=columns["preapproved_limit"],
+    )
+
+    # Convert numpy columns to Python values once per chunk
+    out = {
+        "loan_amount": np.asarray(columns["loan_amount"], dtype=np.float64).tolist(),
+        "salary": np.asarray(columns["salary"], dtype=np.float64).tolist(),
+        "tenure": np.asarray(columns["tenure"], dtype=np.int64).tolist(),
+        "interest_rate": np.asarray(columns["interest_rate"], dtype=np.float64).tolist(),
+        "credit_score": np.asarray(columns["credit_score"], dtype=np.int64).tolist(),
+        "preapproved_limit": np.asarray(columns["preapproved_limit"], dtype=np.float64).tolist(),
+        "emi": scores["emi"].tolist(),
+        "emi_to_salary_ratio": np.round(scores["emi_to_salary_ratio"], 4).tolist(),
+        "risk_score": scores["risk_score"].tolist(),
+        "risk_level": scores["risk_level"].tolist(),
+        "status": rules["status"].tolist(),
+        "approval_type": rules["approval_type"].tolist(),
+        "reason": rules["reason"].tolist(),
+    }
+    factor_columns = [scores[name].tolist() for name in FACTOR_COLUMNS]
+
+    for position, index in enumerate(valid):
+        record = results[index]
+        for name, values in out.items():
+            record[name] = values[position]
+        record["risk_factors"] = [codes[position] for codes in factor_columns]
+        record["error"] = None
+
+    return results
+
+
+# =============================================================================
+# Pipeline
+# =============================================================================
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the API process runs threads, which fork does not copy safely
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def underwrite_stream(
+    records: Iterable[Dict[str, Any]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = DEFAULT_WORKERS,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Underwrite an iterable of input rows, yielding results in input order.
+
+    At most 2 x workers chunks are in flight, so memory stays bounded no
+    matter how long the input is. workers=0 scores in the calling process.
+    """
+    if workers <= 0:
+        for chunk in _chunks(records, chunk_size):
+            yield from underwrite_chunk(chunk)
+        return
+
+    pool = _get_pool(workers)
+    in_flight: deque = deque()
+    for chunk in _chunks(records, chunk_size):
+        in_flight.append(pool.submit(underwrite_chunk, chunk))
+        if len(in_flight) >= workers * 2:
+            yield from in_flight.popleft().result()
+    while in_flight:
+        yield from in_flight.popleft().result()
+
+
+# =============================================================================
+# Output Formatting
+# =============================================================================
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return ";".join(str(v) for v in value)
+    return "" if value is None else value
+
+
+def format_results(results: Iterable[Dict[str, Any]], output_format: str, batch_rows: int = 1000) -> Iterator[str]:
+    """Serialize results as CSV or JSONL text, yielding a block every `batch_rows` rows."""
+    if output_format not in INPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+    buffer = io.StringIO()
+    writer = None
+    if output_format == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=OUTPUT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+
+    rows = 0
+    for result in results:
+        if writer is not None:
+            writer.writerow({field: _csv_value(result.get(field)) for field in OUTPUT_FIELDS})
+        else:
+            buffer.write(json.dumps({field: result.get(field) for field in OUTPUT_FIELDS}, default=str))
+            buffer.write("\n")
+        rows += 1
+        if rows % batch_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Underwrite a CSV/JSONL prospect list.")
+    parser.add_argument("input", help="Input file (.csv or .jsonl), or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    parser.add_argument("--input-format", choices=INPUT_FORMATS, help="Default: from file extension")
+    parser.add_argument("--output-format", choices=INPUT_FORMATS, help="Default: from output extension, else jsonl")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args(argv)
+
+    input_format = args.input_format or detect_format(args.input)
+    if args.output_format:
+        output_format = args.output_format
+    elif args.output.lower().endswith(".csv"):
+        output_format = "csv"
+    else:
+        output_format = "jsonl"
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8", newline="")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        results = underwrite_stream(iter_records(source, input_format), args.chunk_size, args.workers)
+        for block in format_results(results, output_format):
+            target.write(block)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+        shutdown_pool()
+
+    print(f"[BULK UNDERWRITING] Wrote {args.output} ({output_format})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
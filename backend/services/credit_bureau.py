@@ -1,11 +1,39 @@
+"""
+Credit Bureau Service
+=====================
+Credit score lookups for underwriting.
+
+- fetch_credit_score(): synchronous lookup in the indexed customer master
+  (services/customer_master.py); used by bulk underwriting workers
+- get_credit_bureau_client(): async client (services/service_client.py)
+  used by run_underwriting. Concurrent lookups for the same customer_id are
+  coalesced into one call and scores are cached for CREDIT_SCORE_CACHE_TTL
+  seconds.
+
+HTTP API (SERVICE_CLIENT_BACKEND=http):
+    GET {CREDIT_BUREAU_URL}/credit-score/{customer_id} -> {"credit_score": int}
+"""
+
+import os
+
+from services.service_client import ServiceClient, ServiceSpec, get_service_client, lookup_local
+
+
+DEFAULT_CREDIT_SCORE = 650  # Returned when the customer is not found
+
+CREDIT_BUREAU_URL = os.getenv("CREDIT_BUREAU_URL") or "http://127.0.0.1:8100"
+CREDIT_SCORE_CACHE_TTL = float(os.getenv("CREDIT_SCORE_CACHE_TTL") or 900.0)  # seconds
+
+CREDIT_BUREAU = ServiceSpec("credit_bureau", "/credit-score", "credit_score", DEFAULT_CREDIT_SCORE)
+
+
 def fetch_credit_score(customer_id: str) -> int:
     """
-    Mock implementation of fetching a credit score for a customer.
+    Credit score from the customer master (one indexed lookup).
     """
-    # Mock data for demonstration purposes
-    mock_credit_scores = {
-        "1": 750,
-        "2": 600,
-        "3": 680
-    }
-    return mock_credit_scores.get(customer_id, 650)  # Default to 650 if not found
\ No newline at end of file
+    return lookup_local(CREDIT_BUREAU, customer_id)
+
+
+def get_credit_bureau_client() -> ServiceClient:
+    """Process-wide credit bureau client; await client.lookup(customer_id) for a score."""
+    return get_service_client(CREDIT_BUREAU, CREDIT_BUREAU_URL, cache_ttl=CREDIT_SCORE_CACHE_TTL)
@@ -0,0 +1,324 @@
+"""
+Customer Master
+===============
+Indexed, memory-mapped customer master data.
+
+data/customers.json is a flat array; looking a customer up by id or email
+means parsing and scanning all of it. The loader converts the source once
+into a SQLite file (data/customers.db) with a primary key on id and indexes
+on email and PAN. Lookups are single index probes against a read-only,
+mmap-backed connection, so startup time and RSS do not grow with the number
+of customers.
+
+The database is rebuilt automatically when the source file is newer. Sources
+are streamed, never loaded whole: JSON arrays (customers.json shape), JSONL
+or CSV.
+
+Configuration (environment):
+- CUSTOMER_MASTER_SOURCE=<path>   source file (default: data/customers.json)
+- CUSTOMER_MASTER_DB=<path>       built database (default: data/customers.db)
+- CUSTOMER_MASTER_MMAP_MB=<n>     mmap window per connection (default: 256)
+
+CLI:
+    cd backend
+    python -m services.customer_master build data/customers.json -o data/customers.db
+    python -m services.customer_master lookup --id 1
+    python -m services.customer_master lookup --email alice@example.com
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+from itertools import islice
+from typing import Any, Dict, Iterator, Optional
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+DEFAULT_SOURCE = os.getenv("CUSTOMER_MASTER_SOURCE") or os.path.join(DATA_DIR, "customers.json")
+DEFAULT_DB_PATH = os.getenv("CUSTOMER_MASTER_DB") or os.path.join(DATA_DIR, "customers.db")
+MMAP_BYTES = int(os.getenv("CUSTOMER_MASTER_MMAP_MB") or 256) * 1024 * 1024
+
+# Indexed / typed columns; any other source field is kept in `extra` (JSON)
+COLUMNS = ("id", "name", "email", "pan", "credit_score", "income", "existing_debt", "preapproved_limit")
+
+SCHEMA = """
+CREATE TABLE customers (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    email TEXT,
+    pan TEXT,
+    credit_score INTEGER,
+    income REAL,
+    existing_debt REAL,
+    preapproved_limit INTEGER,
+    extra TEXT
+) WITHOUT ROWID;
+"""
+
+# Created after the bulk load - cheaper than maintaining them per insert
+INDEXES = (
+    "CREATE INDEX idx_customers_email ON customers(email)",
+    "CREATE INDEX idx_customers_pan ON customers(pan)",
+)
+
+
+# =============================================================================
+# Source Readers (streaming)
+# =============================================================================
+
+def _iter_json_array(path: str, read_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+    """Yield the objects of a top-level JSON array without loading the file."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        started = False
+        eof = False
+        while True:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer and not eof:
+                    chunk = f.read(read_size)
+                    eof = not chunk
+                    buffer += chunk
+                    continue
+                if not buffer.startswith("["):
+                    raise ValueError(f"{path}: expected a JSON array")
+                buffer = buffer[1:]
+                started = True
+                continue
+            if buffer.startswith(","):
+                buffer = buffer[1:]
+                continue
+            if buffer.startswith("]"):
+                return
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except ValueError:
+                if eof:
+                    raise ValueError(f"{path}: truncated JSON array")
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield obj
+            buffer = buffer[end:]
+
+
+def iter_source(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream customer records from .json (array), .jsonl or .csv."""
+    lower = path.lower()
+    if lower.endswith((".jsonl", ".ndjson")):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif lower.endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+    else:
+        yield from _iter_json_array(path)
+
+
+def _normalize_email(email: Any) -> Optional[str]:
+    return str(email).strip().lower() if email not in (None, "") else None
+
+
+def _normalize_pan(pan: Any) -> Optional[str]:
+    return str(pan).strip().upper() if pan not in (None, "") else None
+
+
+def _row(record: Dict[str, Any]) -> tuple:
+    extra = {k: v for k, v in record.items() if k not in COLUMNS}
+    return (
+        str(record.get("id") or record.get("customer_id")),
+        record.get("name"),
+        _normalize_email(record.get("email")),
+        _normalize_pan(record.get("pan") or record.get("pan_number")),
+        _int_or_none(record.get("credit_score")),
+        _float_or_none(record.get("income")),
+        _float_or_none(record.get("existing_debt")),
+        _int_or_none(record.get("preapproved_limit")),
+        json.dumps(extra) if extra else None,
+    )
+
+
+def _int_or_none(value: Any) -> Optional[int]:
+    return int(float(value)) if value not in (None, "") else None
+
+
+def _float_or_none(value: Any) -> Optional[float]:
+    return float(value) if value not in (None, "") else None
+
+
+# =============================================================================
+# Builder
+# =============================================================================
+
+def build_customer_master(source: str = DEFAULT_SOURCE, db_path: str = DEFAULT_DB_PATH, batch_size: int = 10000) -> int:
+    """
+    Convert a customer source file into the indexed database.
+
+    Writes to a temporary file and renames it into place, so readers never
+    see a half-built database. Returns the number of customers loaded.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    tmp_path = f"{db_path}.build.{os.getpid()}"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    count = 0
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executescript(SCHEMA)
+        records = iter_source(source)
+        while True:
+            batch = [_row(r) for r in islice(records, batch_size)]
+            if not batch:
+                break
+            conn.executemany(
+                "INSERT OR REPLACE INTO customers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch
+            )
+            count += len(batch)
+        for statement in INDEXES:
+            conn.execute(statement)
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    print(f"[CUSTOMER MASTER] Built {db_path} ({count} customers)")
+    return count
+
+
+# =============================================================================
+# Reader
+# =============================================================================
+
+class CustomerMaster:
+    """
+    Read-only lookups against the built database.
+
+    Each thread gets its own read-only connection with a memory-mapped
+    window, so lookups are page-cache reads rather than heap copies.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, mmap_bytes: int = MMAP_BYTES):
+        self.db_path = db_path
+        self.mmap_bytes = mmap_bytes
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            uri = f"file:{os.path.abspath(self.db_path)}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            conn.execute("PRAGMA query_only=ON")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        customer = {key: row[key] for key in COLUMNS if row[key] is not None}
+        if row["extra"]:
+            customer.update(json.loads(row["extra"]))
+        return customer
+
+    def get(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT * FROM customers WHERE id = ?", (str(customer_id),)).fetchone()
+        return self._to_dict(row)
+
+    def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT * FROM customers WHERE email = ? LIMIT 1", (_normalize_email(email),)
+        ).fetchone()
+        return self._to_dict(row)
+
+    def get_by_pan(self, pan: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT * FROM customers WHERE pan = ? LIMIT 1", (_normalize_pan(pan),)
+        ).fetchone()
+        return self._to_dict(row)
+
+    def field(self, customer_id: str, column: str) -> Any:
+        """Fetch one indexed column for a customer (None if unknown)."""
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown customer column: {column}")
+        row = self._conn().execute(
+            f"SELECT {column} FROM customers WHERE id = ?", (str(customer_id),)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM customers").fetchone()[0]
+
+
+def _needs_build(source: str, db_path: str) -> bool:
+    if not os.path.exists(db_path):
+        return True
+    return os.path.exists(source) and os.path.getmtime(source) > os.path.getmtime(db_path)
+
+
+_master: Optional[CustomerMaster] = None
+_master_lock = threading.Lock()
+
+
+def get_customer_master() -> CustomerMaster:
+    """Process-wide customer master, building the database first if it is missing or stale."""
+    global _master
+    if _master is None:
+        with _master_lock:
+            if _master is None:
+                if _needs_build(DEFAULT_SOURCE, DEFAULT_DB_PATH):
+                    build_customer_master(DEFAULT_SOURCE, DEFAULT_DB_PATH)
+                _master = CustomerMaster(DEFAULT_DB_PATH)
+    return _master
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build or query the customer master database.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Convert a .json/.jsonl/.csv source into the database")
+    build.add_argument("source", nargs="?", default=DEFAULT_SOURCE)
+    build.add_argument("-o", "--output", default=DEFAULT_DB_PATH)
+
+    lookup = commands.add_parser("lookup", help="Look up one customer")
+    lookup.add_argument("--db", default=DEFAULT_DB_PATH)
+    group = lookup.add_mutually_exclusive_group(required=True)
+    group.add_argument("--id")
+    group.add_argument("--email")
+    group.add_argument("--pan")
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        build_customer_master(args.source, args.output)
+        return 0
+
+    master = CustomerMaster(args.db)
+    if args.id:
+        customer = master.get(args.id)
+    elif args.email:
+        customer = master.get_by_email(args.email)
+    else:
+        customer = master.get_by_pan(args.pan)
+    print(json.dumps(customer, indent=2))
+    return 0 if customer else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
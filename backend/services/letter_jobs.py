@@ -0,0 +1,324 @@
+"""
+Sanction Letter Jobs
+====================
+Durable background queue for sanction letter PDFs.
+
+The sanction agent used to render the letter inline, so a slow or failing
+render delayed or degraded the chat reply. It now enqueues a job and replies
+immediately; worker threads render letters at a bounded rate and record the
+outcome on the loan application.
+
+Jobs live in a small SQLite table (one row per application, WAL mode), so
+pending letters survive a restart and several uvicorn workers on one host
+can share the queue:
+- pending  waiting for a worker (or for its retry backoff to elapse)
+- ready    PDF written; `file` is served from /files
+- failed   gave up after LETTER_JOB_MAX_ATTEMPTS attempts
+
+A worker claims a job by leasing it (UPDATE ... WHERE lease expired). A job
+whose worker died is picked up again once its lease runs out. Failures are
+retried with exponential backoff.
+
+Configuration (environment):
+- LETTER_JOB_DB=<path>                (default: data/letter_jobs.db)
+- LETTER_JOB_WORKERS=<n>              worker threads (default: 2)
+- LETTER_JOB_RATE=<letters/sec>       throughput cap (default: 0 = unlimited)
+- LETTER_JOB_MAX_ATTEMPTS=<n>         (default: 3)
+- LETTER_JOB_RETRY_SECONDS=<secs>     first retry delay, doubled per attempt (default: 2)
+- LETTER_JOB_LEASE_SECONDS=<secs>     (default: 60)
+
+Usage:
+    from services.letter_jobs import get_letter_queue
+
+    queue = get_letter_queue()
+    job = queue.enqueue(application_id, loan_details)
+    queue.get(application_id).status     # "pending" / "ready" / "failed"
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from models import LetterStatus
+
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "letter_jobs.db")
+LETTER_JOB_DB = os.getenv("LETTER_JOB_DB") or DEFAULT_DB_PATH
+LETTER_JOB_WORKERS = int(os.getenv("LETTER_JOB_WORKERS") or 2)
+LETTER_JOB_RATE = float(os.getenv("LETTER_JOB_RATE") or 0)
+LETTER_JOB_MAX_ATTEMPTS = int(os.getenv("LETTER_JOB_MAX_ATTEMPTS") or 3)
+LETTER_JOB_RETRY_SECONDS = float(os.getenv("LETTER_JOB_RETRY_SECONDS") or 2)
+LETTER_JOB_LEASE_SECONDS = float(os.getenv("LETTER_JOB_LEASE_SECONDS") or 60)
+
+# Idle workers re-check the table this often (jobs enqueued by other
+# processes, retries whose backoff elapsed, expired leases)
+POLL_INTERVAL = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS letter_jobs (
+    application_id  TEXT PRIMARY KEY,
+    status          TEXT NOT NULL,
+    payload         TEXT NOT NULL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    file            TEXT,
+    error           TEXT,
+    run_after       REAL NOT NULL,
+    lease_until     REAL,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_letter_jobs_runnable
+    ON letter_jobs (status, run_after);
+"""
+
+_COLUMNS = "application_id, status, attempts, file, error, created_at, updated_at"
+
+
+class LetterJob(NamedTuple):
+    """Public view of one sanction letter job."""
+    application_id: str
+    status: str                   # LetterStatus value
+    attempts: int
+    file: Optional[str]
+    error: Optional[str]
+    created_at: float
+    updated_at: float
+
+
+# Called with (application_id, job) after a job reaches ready / failed
+CompletionHook = Callable[[str, LetterJob], None]
+
+
+class LetterJobQueue:
+    """SQLite-backed sanction letter queue with a pool of worker threads."""
+
+    def __init__(
+        self,
+        path: str,
+        render: Callable[[Dict[str, Any]], Dict[str, Any]],
+        workers: int = 2,
+        rate: float = 0.0,
+        max_attempts: int = 3,
+        retry_seconds: float = 2.0,
+        lease_seconds: float = 60.0,
+    ):
+        self.path = path
+        self.render = render
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_seconds = retry_seconds
+        self.lease_seconds = lease_seconds
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+
+        self._local = threading.local()
+        self._wakeup = threading.Condition()
+        self._rate_lock = threading.Lock()
+        self._next_slot = 0.0
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._hooks: List[CompletionHook] = []
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    # ---- Connection management --------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    # ---- Producer side ----------------------------------------------------
+    def enqueue(self, application_id: str, data: Dict[str, Any]) -> LetterJob:
+        """
+        Queue (or re-queue) the letter for an application and wake a worker.
+
+        Re-enqueueing replaces any earlier job for the application, so a
+        failed letter can be retried by enqueueing it again.
+        """
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO letter_jobs "
+            "(application_id, status, payload, attempts, run_after, created_at, updated_at) "
+            "VALUES (?, ?, ?, 0, ?, ?, ?)",
+            (application_id, LetterStatus.PENDING.value, json.dumps(data, default=str), now, now, now),
+        )
+        self.start()
+        with self._wakeup:
+            self._wakeup.notify()
+        return LetterJob(application_id, LetterStatus.PENDING.value, 0, None, None, now, now)
+
+    def get(self, application_id: str) -> Optional[LetterJob]:
+        row = self._conn().execute(
+            f"SELECT {_COLUMNS} FROM letter_jobs WHERE application_id = ?", (application_id,)
+        ).fetchone()
+        return LetterJob(*row) if row else None
+
+    def payload(self, application_id: str) -> Optional[Dict[str, Any]]:
+        """Loan details the application's letter was queued with."""
+        row = self._conn().execute(
+            "SELECT payload FROM letter_jobs WHERE application_id = ?", (application_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM letter_jobs GROUP BY status").fetchall()
+        counts = {status.value: 0 for status in LetterStatus}
+        counts.update(dict(rows))
+        return counts
+
+    def on_complete(self, hook: CompletionHook) -> None:
+        """Register a callback run (in the worker thread) when a job finishes."""
+        self._hooks.append(hook)
+
+    # ---- Worker lifecycle -------------------------------------------------
+    def start(self) -> None:
+        """Start the worker threads (idempotent)."""
+        with self._wakeup:
+            if self._threads or self._stopping:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"letter-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        print(f"[LETTER JOBS] {self.workers} worker(s) on {self.path}")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the workers, letting in-flight letters finish."""
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+
+    # ---- Worker side ------------------------------------------------------
+    def _claim(self) -> Optional[tuple]:
+        """Lease the oldest runnable job, or return None."""
+        now = time.time()
+        return self._conn().execute(
+            "UPDATE letter_jobs SET lease_until = ?, attempts = attempts + 1, updated_at = ? "
+            "WHERE application_id = ("
+            "  SELECT application_id FROM letter_jobs"
+            "  WHERE status = ? AND run_after <= ? AND (lease_until IS NULL OR lease_until < ?)"
+            "  ORDER BY run_after LIMIT 1"
+            ") RETURNING application_id, payload, attempts",
+            (now + self.lease_seconds, now, LetterStatus.PENDING.value, now, now),
+        ).fetchone()
+
+    def _throttle(self) -> None:
+        """Space job starts LETTER_JOB_RATE apart across all workers."""
+        if not self._interval:
+            return
+        with self._rate_lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + self._interval
+        if start > now:
+            time.sleep(start - now)
+
+    def _worker_loop(self) -> None:
+        while not self._stopping:
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                print(f"[LETTER JOBS] Claim failed: {e}")
+                job = None
+            if job is None:
+                with self._wakeup:
+                    if not self._stopping:
+                        self._wakeup.wait(POLL_INTERVAL)
+                continue
+            self._throttle()
+            self._run(*job)
+
+    def _run(self, application_id: str, payload: str, attempts: int) -> None:
+        try:
+            result = self.render(json.loads(payload))
+            error = result.get("error") if result.get("status") != "generated" else None
+        except Exception as e:
+            result, error = {}, str(e)
+
+        now = time.time()
+        if error is None:
+            self._finish(application_id, LetterStatus.READY, result.get("file"), None, now)
+            print(f"[LETTER JOBS] {application_id} ready: {result.get('file')}")
+        elif attempts < self.max_attempts:
+            delay = self.retry_seconds * (2 ** (attempts - 1))
+            self._conn().execute(
+                "UPDATE letter_jobs SET error = ?, run_after = ?, lease_until = NULL, updated_at = ? "
+                "WHERE application_id = ?",
+                (error, now + delay, now, application_id),
+            )
+            print(f"[LETTER JOBS] {application_id} attempt {attempts} failed ({error}); retrying in {delay:.1f}s")
+        else:
+            self._finish(application_id, LetterStatus.FAILED, None, error, now)
+            print(f"[LETTER JOBS] {application_id} failed after {attempts} attempts: {error}")
+
+    def _finish(self, application_id: str, status: LetterStatus, file: Optional[str], error: Optional[str], now: float) -> None:
+        self._conn().execute(
+            "UPDATE letter_jobs SET status = ?, file = ?, error = ?, lease_until = NULL, updated_at = ? "
+            "WHERE application_id = ?",
+            (status.value, file, error, now, application_id),
+        )
+        job = self.get(application_id)
+        for hook in self._hooks:
+            try:
+                hook(application_id, job)
+            except Exception as e:
+                print(f"[LETTER JOBS] Completion hook failed for {application_id}: {e}")
+
+
+# =============================================================================
+# Process-wide queue
+# =============================================================================
+
+def _render_letter(data: Dict[str, Any]) -> Dict[str, Any]:
+    from services.sanction_letter import write_sanction_letter
+    from utils.metrics import metrics
+
+    with metrics.timed("pdf", "sanction_letter") as span:
+        result = write_sanction_letter(data)
+        span.outcome = result["status"]
+    return result
+
+
+_queue: Optional[LetterJobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_letter_queue() -> LetterJobQueue:
+    """Return the process-wide letter queue (created on first use, workers start lazily)."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = LetterJobQueue(
+                    LETTER_JOB_DB,
+                    _render_letter,
+                    workers=LETTER_JOB_WORKERS,
+                    rate=LETTER_JOB_RATE,
+                    max_attempts=LETTER_JOB_MAX_ATTEMPTS,
+                    retry_seconds=LETTER_JOB_RETRY_SECONDS,
+                    lease_seconds=LETTER_JOB_LEASE_SECONDS,
+                )
+    return _queue
+
+
+def shutdown_letter_queue() -> None:
+    """Stop the worker threads, if they were started."""
+    if _queue is not None:
+        _queue.stop()
@@ -1,11 +1,39 @@
+"""
+Offer Mart Service
+==================
+Pre-approved loan limit lookups for underwriting.
+
+- get_preapproved_limit(): synchronous lookup in the indexed customer master
+  (services/customer_master.py); used by bulk underwriting workers
+- get_offer_mart_client(): async client (services/service_client.py) used
+  by run_underwriting. Concurrent lookups for the same customer_id are
+  coalesced into one call. Offers change with campaigns, so they are not
+  cached by default (OFFER_MART_CACHE_TTL).
+
+HTTP API (SERVICE_CLIENT_BACKEND=http):
+    GET {OFFER_MART_URL}/preapproved-limit/{customer_id} -> {"preapproved_limit": int}
+"""
+
+import os
+
+from services.service_client import ServiceClient, ServiceSpec, get_service_client, lookup_local
+
+
+DEFAULT_PREAPPROVED_LIMIT = 100000  # Returned when the customer is not found
+
+OFFER_MART_URL = os.getenv("OFFER_MART_URL") or "http://127.0.0.1:8100"
+OFFER_MART_CACHE_TTL = float(os.getenv("OFFER_MART_CACHE_TTL") or 0.0)  # seconds, 0 = coalesce only
+
+OFFER_MART = ServiceSpec("offer_mart", "/preapproved-limit", "preapproved_limit", DEFAULT_PREAPPROVED_LIMIT)
+
+
 def get_preapproved_limit(customer_id: str) -> int:
     """
-    Mock implementation of fetching a pre-approved loan limit for a customer.
+    Pre-approved loan limit from the customer master (one indexed lookup).
     """
-    # Mock data for demonstration purposes
-    mock_preapproved_limits = {
-        "1": 500000,
-        "2": 200000,
-        "3": 300000
-    }
-    return mock_preapproved_limits.get(customer_id, 100000)  # Default to 100,000 if not found
\ No newline at end of file
+    return lookup_local(OFFER_MART, customer_id)
+
+
+def get_offer_mart_client() -> ServiceClient:
+    """Process-wide offer mart client; await client.lookup(customer_id) for a limit."""
+    return get_service_client(OFFER_MART, OFFER_MART_URL, cache_ttl=OFFER_MART_CACHE_TTL)
@@ -0,0 +1,391 @@
+"""
+Sanction Letter Renderer
+========================
+Template-cached PDF rendering for sanction letters.
+
+Everything on a sanction letter except a handful of fields (date, reference
+number, name, amount, rate, tenure, EMI) is identical for every customer.
+The layout is rendered with FPDF once per process, uncompressed, with each
+per-customer field drawn as a fixed-width placeholder. A letter is then the
+template bytes with the escaped field values spliced in at recorded offsets,
+padded to the placeholder width so every object offset - and therefore the
+xref table - stays valid. Creation date and document /ID are patched the same
+way; both derive from the letter itself (decision date, hash of the fields),
+so re-rendering an unchanged letter gives identical bytes and the artifact
+store deduplicates it. A value that does not fit its placeholder, or cannot be drawn in the
+template font, is never truncated or substituted: that letter is rendered
+with FPDF from scratch instead (and fails if FPDF cannot draw it either).
+
+Letters are stored in the content-addressed artifact store
+(services/artifact_store.py), whose blobs are written atomically, so /files
+never serves a half-written PDF. Rendering runs in the calling thread by
+default; set SANCTION_PDF_WORKERS to move it to a process pool.
+
+Configuration (environment):
+- SANCTION_PDF_WORKERS=<n>   process pool size (default: 0 = calling thread)
+
+Usage:
+    from services.sanction_letter import write_sanction_letter
+
+    result = write_sanction_letter(loan_details)
+    # {"status": "generated", "file": "sanction_<id>.pdf", "path": ..., "digest": ...}
+"""
+
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+from services.artifact_store import get_artifact_store
+
+
+PDF_WORKERS = int(os.getenv("SANCTION_PDF_WORKERS") or 0)
+
+# Placeholder width (characters) per field. Values are padded with spaces to
+# this width (invisible: every field is left-aligned); a longer value sends
+# the letter down the full-render path.
+FIELD_WIDTHS = {
+    "date_line": 40,
+    "reference_line": 96,
+    "salutation": 72,
+    "customer_name": 56,
+    "loan_amount": 40,
+    "interest_rate": 32,
+    "tenure": 24,
+    "emi": 40,
+}
+
+# Cell text is WinAnsi-encoded for the core Helvetica font
+PDF_TEXT_ENCODING = "cp1252"
+
+
+# =============================================================================
+# Field Formatting
+# =============================================================================
+
+def letter_fields(data: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, str]:
+    """Per-customer text for each template field (same wording as the original letter)."""
+    now = now or datetime.now()
+    session_id = str(data.get("session_id", "unknown"))
+    customer_name = data.get("customer_name", "Valued Customer")
+    loan_amount = data.get("loan_amount", 100000)
+    emi = data.get("emi", 4650.0)
+    return {
+        "date_line": f"Date: {now.strftime('%d %B %Y')}",
+        "reference_line": f"Reference No: LOA/{session_id.upper()}/{now.strftime('%Y%m%d')}",
+        "salutation": f"Dear {customer_name},",
+        "customer_name": str(customer_name),
+        "loan_amount": f"Rs. {loan_amount:,}",
+        "interest_rate": f"{data.get('interest_rate', 10.5)}% per annum",
+        "tenure": f"{data.get('tenure', 24)} months",
+        "emi": f"Rs. {emi:,.2f}",
+    }
+
+
+def letter_date(data: Dict[str, Any]) -> datetime:
+    """Issue date of a letter: the approval decision (`decided_at`), else now."""
+    decided_at = data.get("decided_at")
+    if decided_at:
+        try:
+            return datetime.fromisoformat(str(decided_at))
+        except ValueError:
+            print(f"[SANCTION LETTER] Ignoring malformed decided_at {decided_at!r}")
+    return datetime.now()
+
+
+def document_id(fields: Dict[str, str]) -> str:
+    """PDF /ID (32 hex digits) derived from the letter's content."""
+    digest = hashlib.sha256("\x1f".join(f"{k}={fields[k]}" for k in sorted(fields)).encode("utf-8"))
+    return digest.hexdigest()[:32].upper()
+
+
+def _pdf_date(issued: datetime) -> str:
+    return issued.astimezone(timezone.utc).strftime("%Y%m%d%H%M%SZ")
+
+
+def _placeholder(field: str) -> str:
+    return f"%{field}%".ljust(FIELD_WIDTHS[field], "~")
+
+
+class FieldOverflow(ValueError):
+    """A field value does not fit its template slot as-is."""
+
+
+def _pdf_string(text: str, width: int) -> bytes:
+    """
+    Encode and escape text as a PDF literal body of exactly `width` bytes.
+
+    Raises FieldOverflow if the escaped text is longer than `width` or has
+    characters the template font cannot draw.
+    """
+    if text.isascii() and len(text) <= width and not any(c in text for c in "()\\"):
+        return text.encode("ascii").ljust(width, b" ")
+    out = bytearray()
+    for char in text:
+        try:
+            encoded = char.encode(PDF_TEXT_ENCODING)
+        except UnicodeEncodeError:
+            raise FieldOverflow(f"{char!r} is not in the template font ({PDF_TEXT_ENCODING})") from None
+        if encoded in (b"(", b")", b"\\"):
+            encoded = b"\\" + encoded
+        out += encoded
+    if len(out) > width:
+        raise FieldOverflow(f"{len(out)}-byte value does not fit its {width}-byte slot")
+    return bytes(out.ljust(width, b" "))
+
+
+# =============================================================================
+# Static Layout
+# =============================================================================
+
+def _line(pdf: FPDF, w: float, h: float, text: str, **kwargs) -> None:
+    pdf.cell(w, h, text, new_x=XPos.LMARGIN, new_y=YPos.NEXT, **kwargs)
+
+
+def _draw_layout(pdf: FPDF, field) -> None:
+    """Draw the sanction letter. `field(name)` returns the text for a per-customer field."""
+    pdf.add_page()
+
+    # HEADER
+    pdf.set_font("Helvetica", "B", 20)
+    _line(pdf, 0, 15, "LOANOPS FINANCIAL SERVICES", align="C")
+    pdf.set_font("Helvetica", "", 10)
+    _line(pdf, 0, 6, "Registered NBFC | CIN: U65100MH2024PLC123456", align="C")
+    _line(pdf, 0, 6, "Email: support@loanops.ai | Phone: 1800-XXX-XXXX", align="C")
+    pdf.ln(10)
+    pdf.set_draw_color(0, 0, 0)
+    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+    pdf.ln(5)
+
+    # TITLE
+    pdf.set_font("Helvetica", "B", 16)
+    _line(pdf, 0, 12, "PERSONAL LOAN SANCTION LETTER", align="C")
+    pdf.ln(5)
+
+    # DATE AND REFERENCE
+    pdf.set_font("Helvetica", "", 11)
+    _line(pdf, 0, 8, field("date_line"))
+    _line(pdf, 0, 8, field("reference_line"))
+    pdf.ln(5)
+
+    # SALUTATION
+    _line(pdf, 0, 8, field("salutation"))
+    pdf.ln(3)
+
+    # BODY TEXT
+    pdf.multi_cell(0, 7, (
+        "We are pleased to inform you that your Personal Loan application has been "
+        "approved. Please find the details of your sanctioned loan below:"
+    ))
+    pdf.ln(8)
+
+    # LOAN DETAILS TABLE
+    pdf.set_font("Helvetica", "B", 12)
+    _line(pdf, 0, 10, "LOAN DETAILS")
+    col_width = 95
+    row_height = 10
+    details_table = [
+        ("Applicant Name", field("customer_name")),
+        ("Sanctioned Loan Amount", field("loan_amount")),
+        ("Rate of Interest", field("interest_rate")),
+        ("Loan Tenure", field("tenure")),
+        ("Equated Monthly Instalment (EMI)", field("emi")),
+        ("Processing Fee", "Rs. 1,000 + GST"),
+        ("Disbursement Mode", "Direct Bank Transfer"),
+    ]
+    for label, value in details_table:
+        pdf.set_font("Helvetica", "B", 10)
+        pdf.cell(col_width, row_height, label, border=1)
+        pdf.set_font("Helvetica", "", 10)
+        _line(pdf, col_width, row_height, value, border=1)
+    pdf.ln(10)
+
+    # TERMS AND CONDITIONS
+    pdf.set_font("Helvetica", "B", 12)
+    _line(pdf, 0, 10, "TERMS AND CONDITIONS")
+    pdf.set_font("Helvetica", "", 10)
+    for term in (
+        "1. This sanction is valid for 30 days from the date of issue.",
+        "2. Loan disbursement is subject to document verification.",
+        "3. Prepayment charges may apply as per RBI guidelines.",
+        "4. EMI payment via auto-debit/NACH mandate is mandatory.",
+        "5. The borrower agrees to all terms in the loan agreement.",
+    ):
+        _line(pdf, 0, 7, term)
+    pdf.ln(10)
+
+    # SIGNATURE SECTION
+    _line(pdf, 0, 8, "For LoanOps Financial Services,")
+    pdf.ln(15)
+    pdf.set_font("Helvetica", "B", 11)
+    _line(pdf, 0, 8, "Authorized Signatory")
+    pdf.ln(10)
+
+    # FOOTER
+    pdf.set_font("Helvetica", "I", 9)
+    pdf.set_text_color(100, 100, 100)
+    _line(pdf, 0, 6, "This is a system-generated sanction letter and does not require a physical signature.", align="C")
+    _line(pdf, 0, 6, "For any queries, please contact our customer support.", align="C")
+
+
+# =============================================================================
+# Template
+# =============================================================================
+
+_CREATION_DATE_PREFIX = b"/CreationDate (D:"
+_ID_PREFIX = b"/ID [<"
+_ID_HEX_LEN = 32
+
+
+class LetterTemplate:
+    """Pre-rendered letter bytes plus the byte slots of each variable field."""
+
+    def __init__(self):
+        pdf = FPDF()
+        pdf.set_compression(False)  # placeholders must be findable in the content stream
+        _draw_layout(pdf, _placeholder)
+        self.pdf_bytes = bytes(pdf.output())
+
+        # (start, end, field) sorted by offset; "id" / "creation_date" are metadata
+        slots: List[Tuple[int, int, str]] = []
+        for field, width in FIELD_WIDTHS.items():
+            marker = b"(" + _placeholder(field).encode("ascii") + b")"
+            start = self.pdf_bytes.find(marker)
+            if start < 0 or self.pdf_bytes.find(marker, start + 1) >= 0:
+                raise RuntimeError(f"Sanction letter template: placeholder for {field!r} not found exactly once")
+            slots.append((start + 1, start + 1 + width, field))
+
+        date_at = self.pdf_bytes.find(_CREATION_DATE_PREFIX)
+        if date_at >= 0:
+            date_start = date_at + len(_CREATION_DATE_PREFIX)
+            slots.append((date_start, self.pdf_bytes.index(b")", date_start), "creation_date"))
+        id_at = self.pdf_bytes.find(_ID_PREFIX)
+        if id_at >= 0:
+            id_start = id_at + len(_ID_PREFIX)
+            slots.append((id_start, id_start + _ID_HEX_LEN, "id"))
+            second = id_start + _ID_HEX_LEN + 2  # "><"
+            slots.append((second, second + _ID_HEX_LEN, "id"))
+
+        self.slots = sorted(slots)
+
+    def fill(self, fields: Dict[str, str], issued: datetime) -> bytes:
+        """Letter bytes with every field slot replaced (same length as the template)."""
+        file_id = document_id(fields).encode("ascii")
+        creation_date = _pdf_date(issued).encode("ascii")
+
+        parts = []
+        position = 0
+        for start, end, field in self.slots:
+            parts.append(self.pdf_bytes[position:start])
+            if field == "id":
+                parts.append(file_id)
+            elif field == "creation_date":
+                parts.append(creation_date if len(creation_date) == end - start else self.pdf_bytes[start:end])
+            else:
+                parts.append(_pdf_string(fields[field], end - start))
+            position = end
+        parts.append(self.pdf_bytes[position:])
+        return b"".join(parts)
+
+
+_template: Optional[LetterTemplate] = None
+_template_lock = threading.Lock()
+
+
+def get_template() -> LetterTemplate:
+    """Process-wide template, rendered on first use."""
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = LetterTemplate()
+    return _template
+
+
+def render_sanction_letter(data: Dict[str, Any]) -> bytes:
+    """PDF bytes of a sanction letter for `data` (see generate_sanction_letter)."""
+    issued = letter_date(data)
+    fields = letter_fields(data, issued)
+    try:
+        return get_template().fill(fields, issued)
+    except FieldOverflow as e:
+        print(f"[SANCTION LETTER] {letter_name(data)}: {e} - rendering without the template")
+        return _render_full(fields, issued)
+
+
+class _LetterPDF(FPDF):
+    """FPDF with the content-derived /ID used by template letters."""
+
+    def __init__(self, fields: Dict[str, str]):
+        super().__init__()
+        self._file_id = document_id(fields)
+
+    def file_id(self):
+        return f"<{self._file_id}><{self._file_id}>"
+
+
+def _render_full(fields: Dict[str, str], issued: datetime) -> bytes:
+    """Lay the letter out from scratch (raises if FPDF cannot draw a value)."""
+    pdf = _LetterPDF(fields)
+    pdf.set_creation_date(issued.astimezone(timezone.utc))
+    _draw_layout(pdf, fields.__getitem__)
+    return bytes(pdf.output())
+
+
+# =============================================================================
+# Storage + Process Pool
+# =============================================================================
+
+def letter_name(data: Dict[str, Any]) -> str:
+    """Artifact name a letter is served under (/files/<name>)."""
+    return f"sanction_{data.get('session_id', 'unknown')}.pdf"
+
+
+def _store_letter(data: Dict[str, Any], content: bytes) -> Dict[str, Any]:
+    artifact = get_artifact_store().put(letter_name(data), content, media_type="application/pdf")
+    return {"status": "generated", "file": artifact.name, "path": artifact.path, "digest": artifact.digest}
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the API process runs threads, which fork does not copy safely
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def write_sanction_letter(data: Dict[str, Any], workers: int = PDF_WORKERS) -> Dict[str, Any]:
+    """
+    Render a sanction letter into the artifact store; returns {status, file, path, digest}.
+
+    workers=0 renders in the calling thread (a template fill is a few
+    byte-slice copies); workers>0 renders in the process pool. The letter
+    is stored by the calling process either way.
+    """
+    if workers <= 0:
+        content = render_sanction_letter(data)
+    else:
+        content = _get_pool(workers).submit(render_sanction_letter, data).result()
+    return _store_letter(data, content)
@@ -0,0 +1,151 @@
+"""
+Service Clients
+===============
+Shared async client for the per-customer lookup services that underwriting
+calls (credit bureau, offer mart).
+
+Each service is described by a ServiceSpec: the HTTP path, the response /
+customer master field holding the value, and the default used when the
+customer is unknown. Every client coalesces concurrent lookups for the same
+customer_id into one call and caches results for its cache TTL (0 =
+coalesce only).
+
+Implementations (SERVICE_CLIENT_BACKEND):
+- stub  (default) in-process customer master lookup, no network
+- http  GET {base_url}{spec.path}/{customer_id} -> {spec.field: int}
+        over a pooled httpx.AsyncClient
+        (services/stub_server.py serves these APIs locally for testing)
+
+Configuration (environment):
+- SERVICE_CLIENT_BACKEND=stub|http     (default: stub)
+- SERVICE_CLIENT_TIMEOUT=<seconds>     HTTP timeout (default: 5)
+- SERVICE_STUB_LATENCY=<seconds>       simulated stub latency (default: 0)
+
+Usage:
+    from services.service_client import ServiceSpec, get_service_client
+
+    CREDIT_BUREAU = ServiceSpec("credit_bureau", "/credit-score", "credit_score", 650)
+    client = get_service_client(CREDIT_BUREAU, base_url, cache_ttl=900)
+    score = await client.lookup(customer_id)
+"""
+
+import asyncio
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, NamedTuple, Optional
+
+import httpx
+
+from services.customer_master import get_customer_master
+from utils.async_cache import CoalescingTTLCache
+from utils.metrics import metrics
+
+
+SERVICE_CLIENT_BACKEND = (os.getenv("SERVICE_CLIENT_BACKEND") or "stub").strip().lower()
+SERVICE_TIMEOUT = float(os.getenv("SERVICE_CLIENT_TIMEOUT") or 5.0)  # seconds
+SERVICE_STUB_LATENCY = float(os.getenv("SERVICE_STUB_LATENCY") or 0.0)  # seconds
+
+
+class ServiceSpec(NamedTuple):
+    """One lookup service."""
+    name: str       # cache / metrics label, e.g. "credit_bureau"
+    path: str       # HTTP path prefix, e.g. "/credit-score"
+    field: str      # response key and customer master column, e.g. "credit_score"
+    default: int    # value for a customer the customer master does not know
+
+
+def lookup_local(spec: ServiceSpec, customer_id: str) -> int:
+    """The service's value from the customer master (one indexed lookup)."""
+    value = get_customer_master().field(customer_id, spec.field)
+    return spec.default if value is None else value
+
+
+class ServiceClient(ABC):
+    """Async lookup client with request coalescing and a TTL cache."""
+
+    def __init__(self, spec: ServiceSpec, cache_ttl: float = 0.0):
+        self.spec = spec
+        self.cache = CoalescingTTLCache(spec.name, ttl=cache_ttl)
+
+    async def lookup(self, customer_id: str) -> int:
+        return await self.cache.get_or_fetch(customer_id, lambda: self._timed_fetch(customer_id))
+
+    async def _timed_fetch(self, customer_id: str) -> int:
+        with metrics.timed("service", self.spec.name, cpu=False):
+            return await self._fetch(customer_id)
+
+    @abstractmethod
+    async def _fetch(self, customer_id: str) -> int:
+        """Look up the value upstream (no caching)."""
+
+    async def aclose(self) -> None:
+        pass
+
+
+class StubServiceClient(ServiceClient):
+    """In-process stub reading the customer master, with optional simulated latency."""
+
+    def __init__(self, spec: ServiceSpec, latency: float = 0.0, **kwargs):
+        super().__init__(spec, **kwargs)
+        self.latency = latency
+
+    async def _fetch(self, customer_id: str) -> int:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return lookup_local(self.spec, customer_id)
+
+
+class HttpServiceClient(ServiceClient):
+    """Lookup service over HTTP with a lazily created, pooled client."""
+
+    def __init__(self, spec: ServiceSpec, base_url: str, timeout: float = SERVICE_TIMEOUT, **kwargs):
+        super().__init__(spec, **kwargs)
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+        return self._client
+
+    async def _fetch(self, customer_id: str) -> int:
+        response = await self._http().get(f"{self.spec.path}/{customer_id}")
+        response.raise_for_status()
+        return int(response.json()[self.spec.field])
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# =============================================================================
+# Process-wide clients
+# =============================================================================
+
+_clients: Dict[str, ServiceClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_service_client(spec: ServiceSpec, base_url: str, cache_ttl: float = 0.0) -> ServiceClient:
+    """Process-wide client for a service, selected by SERVICE_CLIENT_BACKEND (stub | http)."""
+    client = _clients.get(spec.name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(spec.name)
+            if client is None:
+                if SERVICE_CLIENT_BACKEND == "http":
+                    client = HttpServiceClient(spec, base_url, cache_ttl=cache_ttl)
+                else:
+                    client = StubServiceClient(spec, latency=SERVICE_STUB_LATENCY, cache_ttl=cache_ttl)
+                _clients[spec.name] = client
+                print(f"[SERVICES] Using {SERVICE_CLIENT_BACKEND} client for {spec.name}")
+    return client
+
+
+async def aclose_service_clients() -> None:
+    """Close the HTTP connection pools of every client created so far (call on shutdown)."""
+    for client in list(_clients.values()):
+        await client.aclose()
@@ -0,0 +1,1021 @@
+"""
+Storage Backends
+================
+Pluggable persistence for sessions, loan applications, users and auth tokens.
+
+Replaces the module-level dicts that used to live in main.py so the API can
+survive restarts and run with several uvicorn workers on one host.
+
+Backends:
+- InMemoryStore: process-local dicts (original hackathon behaviour)
+- SQLiteStore:   SQLite in WAL mode with a write-behind batch buffer and a
+                 read-through LRU cache
+
+Selection (environment):
+- STORE_BACKEND=memory|sqlite   (default: memory)
+- STORE_SQLITE_PATH=<path>      (default: backend/data/loanops.db)
+- STORE_CACHE_TTL=<seconds>     (default: 2.0)
+- STORE_FLUSH_INTERVAL=<secs>   (default: 0.05)
+
+Usage:
+    from services.store import get_store
+
+    store = get_store()
+    session = store.get_session(session_id)
+    ...
+    store.save_session(session_id, session)
+"""
+
+import base64
+import bisect
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from models import LoanApplication, LoanStatus, User
+from utils.expiry_wheel import ExpiryWheel
+from utils.metrics import metrics
+
+
+# Expiry buckets for in-memory auth tokens (seconds)
+TOKEN_WHEEL_RESOLUTION = 60.0
+
+
+def _status_value(status) -> str:
+    """Normalize a LoanStatus enum or its string value to the string value."""
+    return status.value if isinstance(status, LoanStatus) else str(status)
+
+
+def _naive(dt: datetime) -> datetime:
+    """Convert an aware datetime to naive local time (stored timestamps are naive)."""
+    if dt.tzinfo is not None:
+        return dt.astimezone().replace(tzinfo=None)
+    return dt
+
+
+def encode_cursor(created_at: datetime, application_id: str) -> str:
+    """Encode a (created_at, application_id) sort key as an opaque cursor."""
+    raw = f"{_naive(created_at).isoformat()}|{application_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor produced by encode_cursor(). Raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, application_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), application_id
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class ApplicationFilter:
+    """Server-side filters for application listing (all optional, ANDed)."""
+
+    def __init__(
+        self,
+        status: Optional[str] = None,
+        risk_level: Optional[str] = None,
+        user_id: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ):
+        self.status = _status_value(status) if status else None
+        self.risk_level = risk_level
+        self.user_id = user_id
+        self.created_from = _naive(created_from) if created_from else None
+        self.created_to = _naive(created_to) if created_to else None
+
+    def matches(self, application: LoanApplication) -> bool:
+        if self.status and _status_value(application.status) != self.status:
+            return False
+        if self.risk_level and application.risk_level != self.risk_level:
+            return False
+        if self.user_id and application.user_id != self.user_id:
+            return False
+        return True
+
+
+# =============================================================================
+# Backend Interface
+# =============================================================================
+
+class StorageBackend(ABC):
+    """
+    Abstract storage interface used by every API endpoint.
+
+    Session state is a plain dict that agents mutate in place, so callers
+    must call save_session() after a turn to persist the changes. The same
+    applies to LoanApplication models and save_application().
+    """
+
+    # ---- Sessions ----------------------------------------------------------
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the session state dict, or None if it does not exist."""
+
+    @abstractmethod
+    def save_session(self, session_id: str, state: Dict[str, Any]) -> None:
+        """Create or replace a session state."""
+
+    @abstractmethod
+    def delete_session(self, session_id: str) -> bool:
+        """Delete a session. Returns True if it existed."""
+
+    def has_session(self, session_id: str) -> bool:
+        return self.get_session(session_id) is not None
+
+    # ---- Loan applications -------------------------------------------------
+    @abstractmethod
+    def get_application(self, application_id: str) -> Optional[LoanApplication]:
+        """Return a loan application, or None if it does not exist."""
+
+    @abstractmethod
+    def save_application(self, application: LoanApplication) -> None:
+        """Create or replace a loan application."""
+
+    @abstractmethod
+    def iter_applications(self) -> Iterator[LoanApplication]:
+        """Iterate over every stored loan application."""
+
+    @abstractmethod
+    def find_user_application(self, user_id: str, statuses: Iterable[str]) -> Optional[str]:
+        """
+        Return the ID of one of the user's applications in any of `statuses`.
+
+        Served from a per-user (user_id -> status -> application IDs) index,
+        so the cost does not depend on the total number of applications.
+        """
+
+    @abstractmethod
+    def list_applications(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        filters: Optional[ApplicationFilter] = None,
+    ) -> Tuple[List[LoanApplication], Optional[str]]:
+        """
+        Return one page of applications, newest first, plus the next cursor.
+
+        Pages are keyed on (created_at, application_id) and walked from a
+        maintained sorted index, so a page costs O(page size) rather than a
+        sort over the whole store. next_cursor is None on the last page.
+        """
+
+    @abstractmethod
+    def count_applications(self, filters: Optional[ApplicationFilter] = None) -> Dict[str, int]:
+        """
+        Number of applications matching `filters`, per status (statuses with
+        no match are omitted). Sum the values for the filtered total.
+        """
+
+    # ---- Users -------------------------------------------------------------
+    @abstractmethod
+    def get_user(self, user_id: str) -> Optional[User]:
+        """Return a user by ID."""
+
+    @abstractmethod
+    def get_user_by_email(self, email: str) -> Optional[User]:
+        """Return a user by (normalized) email."""
+
+    @abstractmethod
+    def save_user(self, user: User) -> None:
+        """Create or replace a user."""
+
+    # ---- Auth tokens -------------------------------------------------------
+    # Expiry policy (TTL, sliding refresh, per-user cap) lives in
+    # services/auth_tokens.py; the store only keeps (user_id, expires_at).
+    @abstractmethod
+    def get_token(self, token: str) -> Optional[Tuple[str, float]]:
+        """Return (user_id, expires_at) for an auth token - expired or not."""
+
+    @abstractmethod
+    def save_token(self, token: str, user_id: str, expires_at: float) -> None:
+        """Register an auth token for a user."""
+
+    @abstractmethod
+    def refresh_token(self, token: str, expires_at: float) -> bool:
+        """Move a token's expiry (sliding refresh). Returns True if it exists."""
+
+    @abstractmethod
+    def delete_token(self, token: str) -> bool:
+        """Invalidate an auth token. Returns True if it existed."""
+
+    @abstractmethod
+    def user_tokens(self, user_id: str) -> List[str]:
+        """A user's tokens, oldest first."""
+
+    @abstractmethod
+    def purge_expired_tokens(self, now: float) -> int:
+        """Delete every token that expired before `now`; returns how many."""
+
+    # ---- Lifecycle ---------------------------------------------------------
+    def flush(self) -> None:
+        """Persist any buffered writes. No-op for unbuffered backends."""
+
+    def close(self) -> None:
+        """Flush and release resources."""
+        self.flush()
+
+
+# =============================================================================
+# In-Memory Backend
+# =============================================================================
+
+class InMemoryStore(StorageBackend):
+    """
+    Process-local store backed by plain dicts.
+
+    Objects are returned by reference, so in-place mutation is visible
+    immediately; save_* calls just (re)register the object and refresh the
+    secondary indexes.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._applications: Dict[str, LoanApplication] = {}
+        # Secondary index: user_id -> status -> {application_id}
+        self._user_status_index: Dict[str, Dict[str, Set[str]]] = {}
+        # Last indexed (user_id, status) per application, to move entries on update
+        self._indexed_keys: Dict[str, tuple] = {}
+        # Sorted index of (created_at, application_id), ascending
+        self._created_index: List[Tuple[datetime, str]] = []
+        # status -> number of applications, kept with the indexes above
+        self._status_counts: Dict[str, int] = {}
+        self._users: Dict[str, User] = {}
+        self._email_to_user_id: Dict[str, str] = {}
+        # token -> (user_id, expires_at); user_id -> tokens in issue order
+        self._auth_tokens: Dict[str, Tuple[str, float]] = {}
+        self._user_tokens: Dict[str, "OrderedDict[str, None]"] = {}
+        self._token_expiry = ExpiryWheel(resolution=TOKEN_WHEEL_RESOLUTION)
+
+    def get_session(self, session_id):
+        return self._sessions.get(session_id)
+
+    def save_session(self, session_id, state):
+        with self._lock:
+            self._sessions[session_id] = state
+
+    def delete_session(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def has_session(self, session_id):
+        return session_id in self._sessions
+
+    def get_application(self, application_id):
+        return self._applications.get(application_id)
+
+    def save_application(self, application):
+        with self._lock:
+            self._applications[application.application_id] = application
+            self._reindex_application(application)
+
+    def _reindex_application(self, application: LoanApplication) -> None:
+        app_id = application.application_id
+        if app_id not in self._indexed_keys:
+            # created_at never changes, so each application is inserted once
+            bisect.insort(self._created_index, (_naive(application.created_at), app_id))
+
+        new_key = (application.user_id, _status_value(application.status))
+        old_key = self._indexed_keys.get(app_id)
+        if old_key == new_key:
+            return
+
+        if old_key is not None:
+            self._status_counts[old_key[1]] -= 1
+            if not self._status_counts[old_key[1]]:
+                del self._status_counts[old_key[1]]
+        self._status_counts[new_key[1]] = self._status_counts.get(new_key[1], 0) + 1
+
+        if old_key is not None and old_key[0]:
+            by_status = self._user_status_index.get(old_key[0], {})
+            ids = by_status.get(old_key[1])
+            if ids is not None:
+                ids.discard(app_id)
+                if not ids:
+                    del by_status[old_key[1]]
+            if not by_status:
+                self._user_status_index.pop(old_key[0], None)
+
+        if new_key[0]:
+            self._user_status_index.setdefault(new_key[0], {}).setdefault(new_key[1], set()).add(app_id)
+        self._indexed_keys[app_id] = new_key
+
+    def iter_applications(self):
+        with self._lock:
+            applications = list(self._applications.values())
+        return iter(applications)
+
+    def find_user_application(self, user_id, statuses):
+        with self._lock:
+            by_status = self._user_status_index.get(user_id)
+            if not by_status:
+                return None
+            for status in statuses:
+                ids = by_status.get(_status_value(status))
+                if ids:
+                    return next(iter(ids))
+        return None
+
+    def list_applications(self, limit, cursor=None, filters=None):
+        filters = filters or ApplicationFilter()
+        with self._lock:
+            if filters.user_id:
+                # Narrow to the user's applications via the per-user index
+                ids = set().union(*self._user_status_index.get(filters.user_id, {}).values())
+                keys = sorted((_naive(self._applications[i].created_at), i) for i in ids)
+            else:
+                keys = self._created_index
+
+            # Upper bound: cursor (exclusive) or created_to (inclusive)
+            end = len(keys)
+            if cursor:
+                end = bisect.bisect_left(keys, decode_cursor(cursor))
+            if filters.created_to:
+                end = min(end, bisect.bisect_right(keys, (filters.created_to, "\uffff")))
+
+            page: List[LoanApplication] = []
+            position = end - 1
+            while position >= 0 and len(page) < limit:
+                created_at, app_id = keys[position]
+                if filters.created_from and created_at < filters.created_from:
+                    position = -1
+                    break
+                application = self._applications[app_id]
+                if filters.matches(application):
+                    page.append(application)
+                position -= 1
+
+            has_more = position >= 0 and not (
+                filters.created_from and keys[position][0] < filters.created_from
+            )
+
+        next_cursor = None
+        if page and len(page) == limit and has_more:
+            next_cursor = encode_cursor(page[-1].created_at, page[-1].application_id)
+        return page, next_cursor
+
+    def count_applications(self, filters=None):
+        filters = filters or ApplicationFilter()
+        with self._lock:
+            if not (filters.risk_level or filters.created_from or filters.created_to):
+                # Served from the maintained per-status / per-user counts
+                if filters.user_id:
+                    by_status = self._user_status_index.get(filters.user_id, {})
+                    counts = {status: len(ids) for status, ids in by_status.items()}
+                else:
+                    counts = dict(self._status_counts)
+                if filters.status:
+                    counts = {filters.status: counts[filters.status]} if counts.get(filters.status) else {}
+                return counts
+
+            keys = self._created_index
+            start = bisect.bisect_left(keys, (filters.created_from, "")) if filters.created_from else 0
+            end = bisect.bisect_right(keys, (filters.created_to, "\uffff")) if filters.created_to else len(keys)
+            counts: Dict[str, int] = {}
+            for _, app_id in keys[start:end]:
+                application = self._applications[app_id]
+                if filters.matches(application):
+                    status = _status_value(application.status)
+                    counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def get_user(self, user_id):
+        return self._users.get(user_id)
+
+    def get_user_by_email(self, email):
+        user_id = self._email_to_user_id.get(email)
+        return self._users.get(user_id) if user_id else None
+
+    def save_user(self, user):
+        with self._lock:
+            self._users[user.user_id] = user
+            self._email_to_user_id[user.email] = user.user_id
+
+    def get_token(self, token):
+        return self._auth_tokens.get(token)
+
+    def save_token(self, token, user_id, expires_at):
+        with self._lock:
+            self._auth_tokens[token] = (user_id, expires_at)
+            self._user_tokens.setdefault(user_id, OrderedDict())[token] = None
+            self._token_expiry.schedule(token, expires_at)
+
+    def refresh_token(self, token, expires_at):
+        with self._lock:
+            entry = self._auth_tokens.get(token)
+            if entry is None:
+                return False
+            self._auth_tokens[token] = (entry[0], expires_at)
+            self._token_expiry.schedule(token, expires_at)
+            return True
+
+    def delete_token(self, token):
+        with self._lock:
+            if not self._drop_token(token):
+                return False
+            self._token_expiry.cancel(token)
+            return True
+
+    def _drop_token(self, token) -> bool:
+        entry = self._auth_tokens.pop(token, None)
+        if entry is None:
+            return False
+        tokens = self._user_tokens.get(entry[0])
+        if tokens is not None:
+            tokens.pop(token, None)
+            if not tokens:
+                del self._user_tokens[entry[0]]
+        return True
+
+    def user_tokens(self, user_id):
+        with self._lock:
+            return list(self._user_tokens.get(user_id, ()))
+
+    def purge_expired_tokens(self, now):
+        with self._lock:
+            expired = self._token_expiry.expired(now)
+            for token in expired:
+                self._drop_token(token)
+            return len(expired)
+
+
+# =============================================================================
+# SQLite Backend (WAL + write-behind + read-through cache)
+# =============================================================================
+
+class _TTLCache:
+    """Small thread-safe LRU cache with a per-entry time-to-live."""
+
+    _MISSING = object()
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        if self.ttl <= 0:
+            return self._MISSING
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return self._MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return self._MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id  TEXT PRIMARY KEY,
+    data        TEXT NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS applications (
+    application_id  TEXT PRIMARY KEY,
+    user_id         TEXT,
+    status          TEXT NOT NULL,
+    risk_level      TEXT,
+    created_at      TEXT NOT NULL,
+    data            TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_applications_user_status
+    ON applications (user_id, status);
+CREATE INDEX IF NOT EXISTS idx_applications_created
+    ON applications (created_at, application_id);
+CREATE INDEX IF NOT EXISTS idx_applications_status_created
+    ON applications (status, created_at, application_id);
+CREATE INDEX IF NOT EXISTS idx_applications_user_created
+    ON applications (user_id, created_at, application_id);
+CREATE TABLE IF NOT EXISTS users (
+    user_id     TEXT PRIMARY KEY,
+    email       TEXT NOT NULL UNIQUE,
+    data        TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS auth_tokens (
+    token       TEXT PRIMARY KEY,
+    user_id     TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    expires_at  REAL NOT NULL DEFAULT 0
+);
+"""
+
+# Indexes on columns added after the first release (created after _migrate)
+_TOKEN_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_auth_tokens_user ON auth_tokens (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_auth_tokens_expiry ON auth_tokens (expires_at);
+"""
+
+
+class SQLiteStore(StorageBackend):
+    """
+    SQLite-backed store safe for several worker processes on one host.
+
+    Hot-path writes (sessions and applications, saved on every /chat turn)
+    go into a coalescing write-behind buffer that a background thread
+    flushes in one transaction every `flush_interval` seconds, or as soon
+    as `batch_size` keys are pending. Users and auth tokens are written
+    through immediately so a login is visible to every worker at once.
+
+    Reads check the pending buffer, then an LRU cache with a short TTL,
+    then the database, and always return a fresh copy. The TTL bounds how
+    stale a cached object can be when another worker updates it; set
+    STORE_CACHE_TTL=0 to disable caching if requests for one session are
+    not routed to a single worker.
+
+    Applications can be updated by several workers at once (a /chat turn in
+    one, the sanction letter job in another), so save_application() only
+    writes the fields that changed since the copy was loaded: the flush
+    merges them into the current row inside a BEGIN IMMEDIATE transaction
+    instead of replacing the row, and a stale copy cannot undo another
+    worker's update to a field it did not touch.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        cache_ttl: float = 2.0,
+        cache_size: int = 10000,
+        flush_interval: float = 0.05,
+        batch_size: int = 256,
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._local = threading.local()
+        self._session_cache = _TTLCache(cache_size, cache_ttl)
+        self._application_cache = _TTLCache(cache_size, cache_ttl)
+
+        # id(application copy) -> payload it was loaded from or last saved as
+        self._loaded: Dict[int, Dict[str, Any]] = {}
+        self._loaded_lock = threading.Lock()
+
+        # Pending writes: (table, key) -> session row tuple, application
+        # (payload, changed fields or None for the whole row), or None for a delete
+        self._pending: "OrderedDict[tuple, Optional[tuple]]" = OrderedDict()
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        self._migrate(conn)
+        conn.executescript(_TOKEN_INDEXES)
+        conn.commit()
+
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="sqlite-store-flusher", daemon=True
+        )
+        self._flusher.start()
+        print(f"[STORE] SQLite store ready at {path} (WAL, flush every {flush_interval}s)")
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(auth_tokens)")}
+        if "expires_at" not in columns:
+            # Tokens issued before expiry existed are treated as expired
+            conn.execute("ALTER TABLE auth_tokens ADD COLUMN expires_at REAL NOT NULL DEFAULT 0")
+            print("[STORE] Added auth_tokens.expires_at (existing tokens must log in again)")
+
+    # ---- Connection management --------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    # ---- Write-behind buffer ----------------------------------------------
+    def _enqueue(self, table: str, key: str, row: Optional[tuple]) -> None:
+        with self._pending_lock:
+            if table == "applications":
+                row = self._combine(self._pending.get((table, key)), row)
+            self._pending[(table, key)] = row
+            self._pending.move_to_end((table, key))
+            pending_count = len(self._pending)
+        if pending_count >= self.batch_size:
+            self._wakeup.set()
+
+    @staticmethod
+    def _combine(older: Optional[tuple], newer: Optional[tuple]) -> Optional[tuple]:
+        """Coalesce two buffered application writes into one."""
+        if older is None or newer is None or newer[1] is None:
+            return newer
+        payload, fields = newer
+        merged = dict(older[0])
+        merged.update((field, payload[field]) for field in fields)
+        return merged, (None if older[1] is None else older[1] | fields)
+
+    def _pending_lookup(self, table: str, key: str):
+        with self._pending_lock:
+            return self._pending.get((table, key), _TTLCache._MISSING)
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[STORE] Background flush failed: {e}")
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._pending_lock:
+                if not self._pending:
+                    return
+                batch = list(self._pending.items())
+                self._pending.clear()
+
+            conn = self._conn()
+            try:
+                with conn:
+                    # Take the write lock up front: application patches read
+                    # the current row and must not race another worker's flush
+                    conn.execute("BEGIN IMMEDIATE")
+                    for (table, key), row in batch:
+                        if row is None:
+                            column = "session_id" if table == "sessions" else "application_id"
+                            conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (key,))
+                        elif table == "sessions":
+                            conn.execute(
+                                "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) "
+                                "VALUES (?, ?, ?)",
+                                row,
+                            )
+                        else:
+                            payload = self._merge_application(conn, key, *row)
+                            conn.execute(
+                                "INSERT OR REPLACE INTO applications "
+                                "(application_id, user_id, status, risk_level, created_at, data) "
+                                "VALUES (?, ?, ?, ?, ?, ?)",
+                                self._application_row(payload),
+                            )
+            except Exception:
+                # Put the batch back (ahead of any newer writes) so it is retried
+                with self._pending_lock:
+                    for item_key, row in batch:
+                        if item_key not in self._pending:
+                            self._pending[item_key] = row
+                        elif item_key[0] == "applications":
+                            self._pending[item_key] = self._combine(row, self._pending[item_key])
+                raise
+
+    def close(self) -> None:
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+
+    # ---- Sessions ----------------------------------------------------------
+    def get_session(self, session_id):
+        cached = self._session_cache.get(session_id)
+        if cached is not _TTLCache._MISSING:
+            return copy.deepcopy(cached)
+
+        pending = self._pending_lookup("sessions", session_id)
+        if pending is not _TTLCache._MISSING:
+            if pending is None:
+                return None
+            state = json.loads(pending[1])
+        else:
+            row = self._conn().execute(
+                "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            state = json.loads(row[0])
+
+        self._session_cache.put(session_id, state)
+        return copy.deepcopy(state)
+
+    def save_session(self, session_id, state):
+        data = json.dumps(state, default=str)
+        self._session_cache.put(session_id, copy.deepcopy(state))
+        self._enqueue("sessions", session_id, (session_id, data, time.time()))
+
+    def delete_session(self, session_id):
+        existed = self.get_session(session_id) is not None
+        self._session_cache.discard(session_id)
+        self._enqueue("sessions", session_id, None)
+        return existed
+
+    # ---- Loan applications -------------------------------------------------
+    @staticmethod
+    def _application_row(payload: Dict[str, Any]) -> tuple:
+        return (
+            payload["application_id"],
+            payload.get("user_id"),
+            payload.get("status"),
+            payload.get("risk_level"),
+            payload.get("created_at"),
+            json.dumps(payload),
+        )
+
+    @staticmethod
+    def _merge_application(
+        conn: sqlite3.Connection, application_id: str, payload: Dict[str, Any], fields: Optional[Set[str]]
+    ) -> Dict[str, Any]:
+        """Current row with the changed fields applied (the payload itself for a full write)."""
+        if fields is None:
+            return payload
+        row = conn.execute(
+            "SELECT data FROM applications WHERE application_id = ?", (application_id,)
+        ).fetchone()
+        if row is None:
+            return payload
+        current = json.loads(row[0])
+        current.update((field, payload[field]) for field in fields)
+        return current
+
+    def _hand_out(self, payload: Dict[str, Any]) -> LoanApplication:
+        """A caller-owned copy, remembered with the payload it was built from."""
+        application = LoanApplication.model_validate(payload)
+        key = id(application)
+        with self._loaded_lock:
+            self._loaded[key] = payload
+        weakref.finalize(application, self._forget, key)
+        return application
+
+    def _forget(self, key: int) -> None:
+        with self._loaded_lock:
+            self._loaded.pop(key, None)
+
+    def get_application(self, application_id):
+        cached = self._application_cache.get(application_id)
+        if cached is not _TTLCache._MISSING:
+            return self._hand_out(cached)
+
+        pending = self._pending_lookup("applications", application_id)
+        if pending is None:
+            return None
+        if pending is not _TTLCache._MISSING:
+            payload = self._merge_application(self._conn(), application_id, *pending)
+        else:
+            row = self._conn().execute(
+                "SELECT data FROM applications WHERE application_id = ?", (application_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload = json.loads(row[0])
+
+        self._application_cache.put(application_id, payload)
+        return self._hand_out(payload)
+
+    def save_application(self, application):
+        payload = application.model_dump(mode="json")
+        key = id(application)
+        with self._loaded_lock:
+            loaded = self._loaded.get(key)
+            self._loaded[key] = payload
+        if loaded is None:
+            # New application, or one this store did not hand out: write it whole
+            weakref.finalize(application, self._forget, key)
+            fields = None
+        else:
+            fields = {field for field, value in payload.items() if loaded.get(field) != value}
+            if not fields:
+                return
+
+        cached = self._application_cache.get(application.application_id)
+        if fields is None or cached is _TTLCache._MISSING:
+            self._application_cache.put(application.application_id, payload)
+        else:
+            merged = dict(cached)
+            merged.update((field, payload[field]) for field in fields)
+            self._application_cache.put(application.application_id, merged)
+        self._enqueue("applications", application.application_id, (payload, fields))
+
+    def iter_applications(self):
+        self.flush()
+        rows = self._conn().execute("SELECT data FROM applications").fetchall()
+        return (LoanApplication.model_validate_json(row[0]) for row in rows)
+
+    def find_user_application(self, user_id, statuses):
+        wanted = [_status_value(status) for status in statuses]
+        if not user_id or not wanted:
+            return None
+
+        # Buffered writes are newer than the database, so they win
+        with self._pending_lock:
+            pending_apps = {
+                key: row for (table, key), row in self._pending.items() if table == "applications"
+            }
+        for app_id, row in pending_apps.items():
+            if row is not None and row[0].get("user_id") == user_id and row[0].get("status") in wanted:
+                return app_id
+
+        placeholders = ", ".join("?" for _ in wanted)
+        rows = self._conn().execute(
+            f"SELECT application_id FROM applications "
+            f"WHERE user_id = ? AND status IN ({placeholders})",
+            (user_id, *wanted),
+        ).fetchall()
+        for (app_id,) in rows:
+            if app_id not in pending_apps:
+                return app_id
+        return None
+
+    def list_applications(self, limit, cursor=None, filters=None):
+        filters = filters or ApplicationFilter()
+        self.flush()
+
+        clauses, params = self._application_clauses(filters)
+        if cursor:
+            created_at, app_id = decode_cursor(cursor)
+            clauses.append("(created_at, application_id) < (?, ?)")
+            params.extend([created_at.isoformat(), app_id])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT data FROM applications {where} "
+            f"ORDER BY created_at DESC, application_id DESC LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+
+        page = [LoanApplication.model_validate_json(row[0]) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(page[-1].created_at, page[-1].application_id)
+        return page, next_cursor
+
+    def count_applications(self, filters=None):
+        filters = filters or ApplicationFilter()
+        self.flush()
+        clauses, params = self._application_clauses(filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT status, COUNT(*) FROM applications {where} GROUP BY status", params
+        ).fetchall()
+        return dict(rows)
+
+    @staticmethod
+    def _application_clauses(filters: ApplicationFilter) -> Tuple[List[str], List[Any]]:
+        """SQL conditions (ANDed) and parameters for an ApplicationFilter."""
+        clauses: List[str] = []
+        params: List[Any] = []
+        if filters.status:
+            clauses.append("status = ?")
+            params.append(filters.status)
+        if filters.risk_level:
+            clauses.append("risk_level = ?")
+            params.append(filters.risk_level)
+        if filters.user_id:
+            clauses.append("user_id = ?")
+            params.append(filters.user_id)
+        if filters.created_from:
+            clauses.append("created_at >= ?")
+            params.append(filters.created_from.isoformat())
+        if filters.created_to:
+            clauses.append("created_at <= ?")
+            params.append(filters.created_to.isoformat())
+        return clauses, params
+
+    # ---- Users (write-through) --------------------------------------------
+    def get_user(self, user_id):
+        row = self._conn().execute(
+            "SELECT data FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return User.model_validate_json(row[0]) if row else None
+
+    def get_user_by_email(self, email):
+        row = self._conn().execute(
+            "SELECT data FROM users WHERE email = ?", (email,)
+        ).fetchone()
+        return User.model_validate_json(row[0]) if row else None
+
+    def save_user(self, user):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO users (user_id, email, data) VALUES (?, ?, ?)",
+                (user.user_id, user.email, user.model_dump_json()),
+            )
+
+    # ---- Auth tokens (write-through) --------------------------------------
+    def get_token(self, token):
+        row = self._conn().execute(
+            "SELECT user_id, expires_at FROM auth_tokens WHERE token = ?", (token,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def save_token(self, token, user_id, expires_at):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO auth_tokens (token, user_id, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (token, user_id, time.time(), expires_at),
+            )
+
+    def refresh_token(self, token, expires_at):
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute("UPDATE auth_tokens SET expires_at = ? WHERE token = ?", (expires_at, token))
+        return cursor.rowcount > 0
+
+    def delete_token(self, token):
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute("DELETE FROM auth_tokens WHERE token = ?", (token,))
+        return cursor.rowcount > 0
+
+    def user_tokens(self, user_id):
+        rows = self._conn().execute(
+            "SELECT token FROM auth_tokens WHERE user_id = ? ORDER BY created_at", (user_id,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def purge_expired_tokens(self, now):
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute("DELETE FROM auth_tokens WHERE expires_at < ?", (now,))
+        return cursor.rowcount
+
+
+# =============================================================================
+# Backend Selection
+# =============================================================================
+
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "loanops.db")
+
+_store: Optional[StorageBackend] = None
+_store_lock = threading.Lock()
+
+
+def create_store(backend: Optional[str] = None) -> StorageBackend:
+    """Build a storage backend from arguments/environment."""
+    backend = (backend or os.getenv("STORE_BACKEND", "memory")).strip().lower()
+
+    if backend == "sqlite":
+        return SQLiteStore(
+            path=os.getenv("STORE_SQLITE_PATH") or DEFAULT_SQLITE_PATH,
+            cache_ttl=float(os.getenv("STORE_CACHE_TTL") or 2.0),
+            flush_interval=float(os.getenv("STORE_FLUSH_INTERVAL") or 0.05),
+        )
+    if backend != "memory":
+        print(f"[STORE] Unknown STORE_BACKEND '{backend}', using in-memory store")
+    return InMemoryStore()
+
+
+# Operations timed into /metrics (kind="store"); iter_applications is a
+# generator, so timing the call would only measure its creation
+TIMED_OPERATIONS = (
+    "get_session", "save_session", "delete_session",
+    "get_application", "save_application", "find_user_application", "list_applications",
+    "get_user", "get_user_by_email", "save_user",
+    "get_token", "save_token", "refresh_token", "delete_token", "user_tokens", "purge_expired_tokens",
+    "flush",
+)
+
+
+def instrument_store(store: StorageBackend) -> StorageBackend:
+    """Time the store's hot operations by shadowing them on the instance."""
+    for operation in TIMED_OPERATIONS:
+        setattr(store, operation, metrics.wrap("store", operation, getattr(store, operation)))
+    return store
+
+
+def get_store() -> StorageBackend:
+    """Return the process-wide storage backend (created on first use)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = instrument_store(create_store())
+    return _store
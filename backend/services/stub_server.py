@@ -0,0 +1,56 @@
+"""
+Stub Service Server
+===================
+Local stand-in for the credit bureau and offer mart APIs, for testing the
+HTTP service clients (SERVICE_CLIENT_BACKEND=http) without external systems.
+
+Serves the same mock data as the synchronous lookups:
+- GET /credit-score/{customer_id}       -> {"customer_id": ..., "credit_score": int}
+- GET /preapproved-limit/{customer_id}  -> {"customer_id": ..., "preapproved_limit": int}
+
+Run:
+    cd backend
+    python -m services.stub_server --port 8100 --latency 0.05
+"""
+
+import argparse
+import asyncio
+
+from fastapi import FastAPI
+
+from services.credit_bureau import fetch_credit_score
+from services.offer_mart import get_preapproved_limit
+
+
+def create_stub_app(latency: float = 0.0) -> FastAPI:
+    """Build the stub API; `latency` simulates upstream response time in seconds."""
+    app = FastAPI(title="LoanOps Service Stubs")
+    app.state.calls = 0
+
+    @app.get("/credit-score/{customer_id}")
+    async def credit_score(customer_id: str):
+        app.state.calls += 1
+        if latency:
+            await asyncio.sleep(latency)
+        return {"customer_id": customer_id, "credit_score": fetch_credit_score(customer_id)}
+
+    @app.get("/preapproved-limit/{customer_id}")
+    async def preapproved_limit(customer_id: str):
+        app.state.calls += 1
+        if latency:
+            await asyncio.sleep(latency)
+        return {"customer_id": customer_id, "preapproved_limit": get_preapproved_limit(customer_id)}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the credit bureau / offer mart stub server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated response time (seconds)")
+    args = parser.parse_args()
+
+    uvicorn.run(create_stub_app(args.latency), host=args.host, port=args.port)
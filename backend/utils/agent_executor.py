@@ -0,0 +1,223 @@
+"""
+Agent Executor
+==============
+Runs blocking agent work (Gemini calls, FPDF rendering, PAN lookups) on a
+bounded thread pool instead of the event loop, with per-stage concurrency
+limits and queue-depth metrics.
+
+Without this, one slow Gemini response inside supervisor_node stalls every
+other /chat, /login and /health request served by the worker.
+
+Configuration (environment):
+- AGENT_EXECUTOR_WORKERS=<n>       thread pool size (default: 32)
+- AGENT_LIMIT_<STAGE>=<n>          concurrency limit per stage, e.g.
+                                   AGENT_LIMIT_SANCTION=4 (stages and defaults:
+                                   sales, verification, underwriting = 16;
+                                   sanction, explanation = 8)
+
+Usage:
+    from utils.agent_executor import agent_executor
+
+    # From async code - runs func(state, message) in the pool
+    reply = await agent_executor.run("underwriting", underwriting_agent_node, state, message)
+
+    # From code already running in the pool (nested external call)
+    with agent_executor.limit("explanation"):
+        explanation = generate_explanation(decision)
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+from utils.metrics import metrics
+
+
+# Default per-stage concurrency limits
+DEFAULT_STAGE_LIMITS = {
+    "sales": 16,
+    "verification": 16,
+    "underwriting": 16,
+    "sanction": 8,
+    "explanation": 8,
+}
+
+
+class _StageStats:
+    """Counters for one stage (guarded by AgentExecutor._stats_lock)."""
+
+    __slots__ = ("limit", "waiting", "running", "completed", "failed", "total_seconds", "max_seconds")
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "limit": self.limit,
+            "queue_depth": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_seconds": round(self.total_seconds / finished, 4) if finished else 0.0,
+            "max_seconds": round(self.max_seconds, 4),
+        }
+
+
+class AgentExecutor:
+    """
+    Bounded thread pool with per-stage concurrency limits.
+
+    A stage that hits its limit queues further work (visible as queue_depth)
+    without holding a pool thread, so a burst of slow sanctions cannot starve
+    verification or underwriting.
+    """
+
+    def __init__(self, max_workers: int = 32, stage_limits: Dict[str, int] = None):
+        self.max_workers = max_workers
+        self.stage_limits = dict(DEFAULT_STAGE_LIMITS)
+        self.stage_limits.update(stage_limits or {})
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent")
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, _StageStats] = {}
+        # asyncio primitives are loop-bound, so keep one semaphore set per loop
+        self._async_limits: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._thread_limits: Dict[str, threading.BoundedSemaphore] = {}
+
+    def _limit_for(self, stage: str) -> int:
+        return self.stage_limits.get(stage, self.max_workers)
+
+    def _stage_stats(self, stage: str) -> _StageStats:
+        stats = self._stats.get(stage)
+        if stats is None:
+            stats = self._stats[stage] = _StageStats(self._limit_for(stage))
+        return stats
+
+    def _async_semaphore(self, stage: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphores = self._async_limits.get(loop)
+        if semaphores is None:
+            semaphores = self._async_limits[loop] = {}
+        semaphore = semaphores.get(stage)
+        if semaphore is None:
+            semaphore = semaphores[stage] = asyncio.Semaphore(self._limit_for(stage))
+        return semaphore
+
+    def _thread_semaphore(self, stage: str) -> threading.BoundedSemaphore:
+        with self._stats_lock:
+            semaphore = self._thread_limits.get(stage)
+            if semaphore is None:
+                semaphore = self._thread_limits[stage] = threading.BoundedSemaphore(self._limit_for(stage))
+            return semaphore
+
+    def _record(self, stage: str, started: float, failed: bool) -> None:
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            stats = self._stage_stats(stage)
+            stats.running -= 1
+            if failed:
+                stats.failed += 1
+            else:
+                stats.completed += 1
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+
+    async def run(self, stage: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking callable in the pool under the stage's concurrency limit.
+
+        Context variables (e.g. the /chat/stream sink) are propagated to the
+        worker thread.
+        """
+        with self._stats_lock:
+            self._stage_stats(stage).waiting += 1
+
+        semaphore = self._async_semaphore(stage)
+        try:
+            await semaphore.acquire()
+        finally:
+            with self._stats_lock:
+                self._stage_stats(stage).waiting -= 1
+
+        try:
+            with self._stats_lock:
+                self._stage_stats(stage).running += 1
+            started = time.perf_counter()
+            failed = True
+            try:
+                ctx = contextvars.copy_context()
+                call = functools.partial(ctx.run, metrics.wrap("agent", stage, func), *args, **kwargs)
+                result = await asyncio.get_running_loop().run_in_executor(self._pool, call)
+                failed = False
+                return result
+            finally:
+                self._record(stage, started, failed)
+        finally:
+            semaphore.release()
+
+    @contextmanager
+    def limit(self, stage: str):
+        """
+        Synchronous concurrency limit for blocking calls made from inside a
+        pool thread (e.g. the Gemini explanation within the sanction stage).
+        """
+        semaphore = self._thread_semaphore(stage)
+        with self._stats_lock:
+            self._stage_stats(stage).waiting += 1
+        semaphore.acquire()
+        with self._stats_lock:
+            stats = self._stage_stats(stage)
+            stats.waiting -= 1
+            stats.running += 1
+        started = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self._record(stage, started, failed)
+            semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of per-stage queue depth, concurrency and timings."""
+        with self._stats_lock:
+            stages = {stage: stats.as_dict() for stage, stats in self._stats.items()}
+        return {
+            "max_workers": self.max_workers,
+            "queue_depth": sum(s["queue_depth"] for s in stages.values()),
+            "running": sum(s["running"] for s in stages.values()),
+            "stages": stages,
+        }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _limits_from_env() -> Dict[str, int]:
+    limits = {}
+    for stage in DEFAULT_STAGE_LIMITS:
+        value = os.getenv(f"AGENT_LIMIT_{stage.upper()}")
+        if value:
+            limits[stage] = int(value)
+    return limits
+
+
+# Process-wide executor used by the supervisor and API endpoints
+agent_executor = AgentExecutor(
+    max_workers=int(os.getenv("AGENT_EXECUTOR_WORKERS") or 32),
+    stage_limits=_limits_from_env(),
+)
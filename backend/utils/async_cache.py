@@ -0,0 +1,122 @@
+"""
+Async Coalescing Cache
+======================
+TTL cache for async lookups that also coalesces concurrent misses.
+
+If ten underwriting requests for the same customer arrive together, only one
+call goes to the upstream service; the other nine await the same in-flight
+result. Successful results are then served from memory for `ttl` seconds
+(ttl=0 coalesces without caching). Failures are never cached.
+
+Usage:
+    cache = CoalescingTTLCache("credit_bureau", ttl=900)
+    score = await cache.get_or_fetch(customer_id, lambda: client._fetch(customer_id))
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class CoalescingTTLCache:
+    """
+    LRU + TTL result cache with per-key request coalescing.
+
+    The cache is shared across event loops and threads; in-flight fetch
+    tasks are tracked per event loop because asyncio tasks are loop-bound.
+    """
+
+    def __init__(self, name: str, ttl: float = 900.0, max_entries: int = 10000):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value, join an in-flight fetch, or start one."""
+        entry = self._get(key)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            return entry[1]
+
+        loop = asyncio.get_running_loop()
+        in_flight: Dict[Hashable, asyncio.Task] = self._in_flight.setdefault(loop, {})
+        task = in_flight.get(key)
+        if task is not None:
+            with self._lock:
+                self.coalesced += 1
+        else:
+            with self._lock:
+                self.misses += 1
+            # The fetch runs in its own task, so it is owned by no caller:
+            # cancelling the request that started it neither cancels the
+            # fetch nor fails the requests that joined it
+            task = loop.create_task(self._fetch(key, fetch))
+            in_flight[key] = task
+            task.add_done_callback(lambda done: self._fetched(in_flight, key, done))
+        # shield: one waiter being cancelled must not cancel the shared fetch
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        value = await fetch()
+        self._put(key, value)
+        return value
+
+    @staticmethod
+    def _fetched(in_flight: Dict[Hashable, asyncio.Task], key: Hashable, task: asyncio.Task) -> None:
+        if in_flight.get(key) is task:
+            del in_flight[key]
+        if not task.cancelled():
+            # Mark retrieved so a failure nobody awaited any more does not log a warning
+            task.exception()
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,227 @@
+"""
+Graph Checkpointer
+==================
+Pluggable LangGraph checkpointer for the supervisor graph.
+
+Every chat turn is checkpointed under thread_id = session_id, so a session
+can be resumed from its last checkpoint by any worker that shares the
+checkpoint store (see get_checkpointed_session).
+
+Only the latest checkpoint of a session is needed to resume it, so
+prune_checkpoints() drops the older ones after every turn; a session's
+checkpoints therefore cost one copy of its state, not one per turn.
+Checkpoints of a session idle for GRAPH_CHECKPOINT_TTL are deleted, as are
+those of a session deleted through the API.
+
+Backends:
+- none    (default) no checkpointing
+- memory  InMemorySaver, process-local
+- sqlite  AsyncSqliteSaver on a shared file (langgraph-checkpoint-sqlite);
+          several workers on one host can resume each other's sessions
+
+Configuration (environment):
+- GRAPH_CHECKPOINTER=none|memory|sqlite     (default: none)
+- GRAPH_CHECKPOINT_PATH=<path>              (default: data/checkpoints.db)
+- GRAPH_CHECKPOINT_TTL=<seconds>            idle session expiry (default: 86400)
+
+Usage:
+    from utils.checkpointer import get_checkpointer
+
+    checkpointer = await get_checkpointer()     # per event loop
+    graph = builder.compile(checkpointer=checkpointer)
+    ...
+    await prune_checkpoints(session_id)         # after each checkpointed turn
+"""
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+
+from utils.expiry_wheel import ExpiryWheel
+
+
+GRAPH_CHECKPOINTER = (os.getenv("GRAPH_CHECKPOINTER") or "none").strip().lower()
+DEFAULT_CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "checkpoints.db")
+CHECKPOINT_PATH = os.getenv("GRAPH_CHECKPOINT_PATH") or DEFAULT_CHECKPOINT_PATH
+GRAPH_CHECKPOINT_TTL = float(os.getenv("GRAPH_CHECKPOINT_TTL") or 86400)
+
+# Idle sessions are looked for at most this often
+EXPIRY_SWEEP_INTERVAL = 60.0
+
+# Expiry of SQLite checkpoint threads, shared by every worker on the file
+_EXPIRY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoint_expiry (
+    thread_id   TEXT PRIMARY KEY,
+    expires_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_checkpoint_expiry ON checkpoint_expiry (expires_at);
+"""
+
+# InMemorySaver is loop-agnostic and shared; the aiosqlite connection behind
+# AsyncSqliteSaver is bound to the loop that opened it
+_memory_saver: Optional[InMemorySaver] = None
+_sqlite_savers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+# Expiry of in-memory checkpoint threads (the saver is shared across loops)
+_memory_expiry = ExpiryWheel(resolution=EXPIRY_SWEEP_INTERVAL)
+_memory_expiry_lock = threading.Lock()
+_next_sweep = 0.0
+
+
+async def _open_sqlite_saver() -> BaseCheckpointSaver:
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    os.makedirs(os.path.dirname(os.path.abspath(CHECKPOINT_PATH)), exist_ok=True)
+    conn = await aiosqlite.connect(CHECKPOINT_PATH)
+    await conn.execute("PRAGMA journal_mode=WAL")
+    saver = AsyncSqliteSaver(conn)
+    await saver.setup()
+    await conn.executescript(_EXPIRY_SCHEMA)
+    await conn.commit()
+    print(f"[CHECKPOINT] Using SQLite checkpointer at {CHECKPOINT_PATH}")
+    return saver
+
+
+async def get_checkpointer() -> Optional[BaseCheckpointSaver]:
+    """Return the configured checkpointer for the running event loop (None = disabled)."""
+    global _memory_saver
+    if GRAPH_CHECKPOINTER == "none":
+        return None
+    if GRAPH_CHECKPOINTER == "sqlite":
+        loop = asyncio.get_running_loop()
+        saver = _sqlite_savers.get(loop)
+        if saver is None:
+            saver = await _open_sqlite_saver()
+            _sqlite_savers[loop] = saver
+        return saver
+    if GRAPH_CHECKPOINTER != "memory":
+        print(f"[CHECKPOINT] Unknown GRAPH_CHECKPOINTER '{GRAPH_CHECKPOINTER}', using in-memory checkpointer")
+    if _memory_saver is None:
+        _memory_saver = InMemorySaver()
+    return _memory_saver
+
+
+def thread_config(session_id: str) -> Dict[str, Any]:
+    """RunnableConfig addressing one session's checkpoint thread."""
+    return {"configurable": {"thread_id": session_id}}
+
+
+async def get_checkpointed_session(session_id: str) -> Optional[Dict[str, Any]]:
+    """Conversation state from the session's latest checkpoint, if any."""
+    checkpointer = await get_checkpointer()
+    if checkpointer is None:
+        return None
+    checkpoint = await checkpointer.aget_tuple(thread_config(session_id))
+    if checkpoint is None:
+        return None
+    return checkpoint.checkpoint["channel_values"].get("session")
+
+
+async def delete_checkpoints(session_id: str) -> None:
+    """Drop every checkpoint for a session."""
+    checkpointer = await get_checkpointer()
+    if checkpointer is None:
+        return
+    await checkpointer.adelete_thread(session_id)
+    if isinstance(checkpointer, InMemorySaver):
+        with _memory_expiry_lock:
+            _memory_expiry.cancel(session_id)
+    else:
+        async with checkpointer.lock:
+            await checkpointer.conn.execute("DELETE FROM checkpoint_expiry WHERE thread_id = ?", (session_id,))
+            await checkpointer.conn.commit()
+
+
+# =============================================================================
+# Pruning and expiry
+# =============================================================================
+
+async def prune_checkpoints(session_id: str) -> None:
+    """
+    Keep only the session's latest checkpoint, push its expiry back to
+    GRAPH_CHECKPOINT_TTL from now and, at most once per
+    EXPIRY_SWEEP_INTERVAL, delete the checkpoints of idle sessions.
+    """
+    global _next_sweep
+    checkpointer = await get_checkpointer()
+    if checkpointer is None:
+        return
+    now = time.time()
+    if isinstance(checkpointer, InMemorySaver):
+        _prune_memory(checkpointer, session_id)
+        with _memory_expiry_lock:
+            _memory_expiry.schedule(session_id, now + GRAPH_CHECKPOINT_TTL)
+    else:
+        await _prune_sqlite(checkpointer, session_id, now + GRAPH_CHECKPOINT_TTL)
+
+    if now < _next_sweep:
+        return
+    _next_sweep = now + EXPIRY_SWEEP_INTERVAL
+    if isinstance(checkpointer, InMemorySaver):
+        with _memory_expiry_lock:
+            expired = _memory_expiry.expired(now)
+        for thread_id in expired:
+            await checkpointer.adelete_thread(thread_id)
+    else:
+        expired = await _expire_sqlite(checkpointer, now)
+    if expired:
+        print(f"[CHECKPOINT] Expired checkpoints of {len(expired)} idle session(s)")
+
+
+def _prune_memory(saver: InMemorySaver, thread_id: str) -> None:
+    for checkpoint_ns, checkpoints in saver.storage.get(thread_id, {}).items():
+        if len(checkpoints) <= 1:
+            continue
+        # Checkpoint ids are time-ordered (uuid6)
+        latest = max(checkpoints)
+        kept = saver.serde.loads_typed(checkpoints[latest][0])["channel_versions"].items()
+        for checkpoint_id in [cid for cid in checkpoints if cid != latest]:
+            checkpoint = saver.serde.loads_typed(checkpoints.pop(checkpoint_id)[0])
+            saver.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            for channel, version in checkpoint["channel_versions"].items():
+                if (channel, version) not in kept:
+                    saver.blobs.pop((thread_id, checkpoint_ns, channel, version), None)
+
+
+async def _prune_sqlite(saver: BaseCheckpointSaver, thread_id: str, expires_at: float) -> None:
+    async with saver.lock:
+        for table in ("checkpoints", "writes"):
+            await saver.conn.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_id < ("
+                "  SELECT MAX(checkpoint_id) FROM checkpoints AS latest"
+                f"  WHERE latest.thread_id = {table}.thread_id AND latest.checkpoint_ns = {table}.checkpoint_ns"
+                ")",
+                (thread_id,),
+            )
+        await saver.conn.execute(
+            "INSERT OR REPLACE INTO checkpoint_expiry (thread_id, expires_at) VALUES (?, ?)",
+            (thread_id, expires_at),
+        )
+        await saver.conn.commit()
+
+
+async def _expire_sqlite(saver: BaseCheckpointSaver, now: float) -> List[str]:
+    async with saver.lock:
+        async with saver.conn.execute(
+            "SELECT thread_id FROM checkpoint_expiry WHERE expires_at <= ?", (now,)
+        ) as cursor:
+            expired = [thread_id for (thread_id,) in await cursor.fetchall()]
+        for thread_id in expired:
+            for table in ("checkpoints", "writes", "checkpoint_expiry"):
+                await saver.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+        await saver.conn.commit()
+    return expired
+
+
+async def close_checkpointer() -> None:
+    """Close the SQLite connection opened on the running loop."""
+    saver = _sqlite_savers.pop(asyncio.get_running_loop(), None)
+    if saver is not None:
+        await saver.conn.close()
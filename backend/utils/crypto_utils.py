@@ -1,11 +1,49 @@
-from cryptography.fernet import Fernet
+"""
+Crypto Utilities
+================
+Fernet encryption for verification snapshots (demo-only key storage).
+
+A process-wide KeyManager loads the key file once and reuses a single
+MultiFernet instance, so encrypt/decrypt no longer hit the disk per call.
+
+Key rotation without restart:
+- The key file holds one key per line; the FIRST line is the primary key
+  used for encryption, all lines are accepted for decryption.
+- rotate_key() prepends a fresh key. Other processes pick up the change
+  because the file's mtime is re-checked at most every KEY_RELOAD_INTERVAL
+  seconds.
+- rotate_tokens() re-encrypts existing tokens under the new primary key.
+"""
+
+from cryptography.fernet import Fernet, MultiFernet
+from functools import lru_cache
+from typing import Iterable, List, Optional
 import os
+import threading
+import time
+
+
+DEFAULT_KEY_PATH = os.path.join(os.path.dirname(__file__), ".fernet_key")
+KEY_RELOAD_INTERVAL = float(os.getenv("FERNET_KEY_RELOAD_INTERVAL") or 30.0)  # seconds
+
+
+def _read_keys(key_path: str) -> List[bytes]:
+    with open(key_path, "rb") as f:
+        return [line.strip() for line in f.read().splitlines() if line.strip()]
+
+
+def _write_keys(key_path: str, keys: List[bytes]) -> None:
+    # Write atomically so concurrent readers never see a partial key file
+    tmp_path = f"{key_path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(b"\n".join(keys) + b"\n")
+    os.replace(tmp_path, key_path)
 
 
 def get_or_create_key(key_path: str = None) -> bytes:
-    """Return an existing key or create one and persist it to disk (demo-only)."""
+    """Return the primary key, creating and persisting one if missing (demo-only)."""
     if key_path is None:
-        key_path = os.path.join(os.path.dirname(__file__), ".fernet_key")
+        key_path = DEFAULT_KEY_PATH
 
     # Create key file if missing
     if not os.path.exists(key_path):
@@ -17,31 +55,128 @@ def get_or_create_key(key_path: str = None) -> bytes:
             # Best-effort: if writing fails, just return the generated key
             return key
     else:
-        with open(key_path, "rb") as f:
-            key = f.read()
+        key = _read_keys(key_path)[0]
 
     return key
 
 
+class KeyManager:
+    """
+    Loads Fernet keys once and caches a MultiFernet for the process.
+
+    Thread-safe. The key file is re-stat'ed at most every `reload_interval`
+    seconds to pick up rotations done by other processes.
+    """
+
+    def __init__(self, key_path: str = None, reload_interval: float = KEY_RELOAD_INTERVAL):
+        self.key_path = key_path or DEFAULT_KEY_PATH
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._fernet: Optional[MultiFernet] = None
+        self._keys: List[bytes] = []
+        self._mtime: Optional[int] = None
+        self._checked_at = 0.0
+
+    def _load(self) -> None:
+        if os.path.exists(self.key_path):
+            keys = _read_keys(self.key_path)
+            mtime = os.stat(self.key_path).st_mtime_ns
+        else:
+            keys = [get_or_create_key(self.key_path)]
+            mtime = os.stat(self.key_path).st_mtime_ns if os.path.exists(self.key_path) else None
+
+        self._keys = keys
+        self._fernet = MultiFernet([Fernet(k) for k in keys])
+        self._mtime = mtime
+        self._checked_at = time.monotonic()
+
+    def fernet(self) -> MultiFernet:
+        """Return the cached MultiFernet, reloading if the key file changed."""
+        now = time.monotonic()
+        if self._fernet is not None and now - self._checked_at < self.reload_interval:
+            return self._fernet
+
+        with self._lock:
+            if self._fernet is None:
+                self._load()
+            elif now - self._checked_at >= self.reload_interval:
+                self._checked_at = now
+                try:
+                    mtime = os.stat(self.key_path).st_mtime_ns
+                except OSError:
+                    mtime = self._mtime
+                if mtime != self._mtime:
+                    print("[CRYPTO] Key file changed - reloading keys")
+                    self._load()
+            return self._fernet
+
+    @property
+    def primary_key(self) -> bytes:
+        self.fernet()
+        return self._keys[0]
+
+    def rotate_key(self, retain: int = 3) -> bytes:
+        """
+        Generate a new primary key, keeping up to `retain` previous keys for
+        decryption. Returns the new key.
+        """
+        with self._lock:
+            if self._fernet is None:
+                self._load()
+            new_key = Fernet.generate_key()
+            keys = [new_key] + self._keys[:max(retain, 0)]
+            _write_keys(self.key_path, keys)
+            self._load()
+            print(f"[CRYPTO] Rotated encryption key ({len(keys)} active)")
+            return new_key
+
+    def invalidate(self) -> None:
+        """Force a reload on next use (e.g. after an out-of-band key change)."""
+        with self._lock:
+            self._fernet = None
+
+
+key_manager = KeyManager()
+
+
+@lru_cache(maxsize=16)
+def _fernet_for_key(key: bytes) -> Fernet:
+    return Fernet(key)
+
+
+def _to_bytes(value: bytes | str) -> bytes:
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
 def encrypt_data(plaintext: bytes | str, key: bytes | None = None) -> bytes:
     """Encrypt bytes/string using Fernet and return token bytes."""
-    if isinstance(plaintext, str):
-        plaintext = plaintext.encode("utf-8")
+    plaintext = _to_bytes(plaintext)
 
-    if key is None:
-        key = get_or_create_key()
-
-    f = Fernet(key)
+    f = key_manager.fernet() if key is None else _fernet_for_key(key)
     return f.encrypt(plaintext)
 
 
 def decrypt_data(token: bytes | str, key: bytes | None = None) -> bytes:
     """Decrypt token (bytes/str) and return plaintext bytes."""
-    if isinstance(token, str):
-        token = token.encode("utf-8")
-
-    if key is None:
-        key = get_or_create_key()
+    token = _to_bytes(token)
 
-    f = Fernet(key)
+    f = key_manager.fernet() if key is None else _fernet_for_key(key)
     return f.decrypt(token)
+
+
+def encrypt_many(plaintexts: Iterable[bytes | str]) -> List[bytes]:
+    """Encrypt many session blobs with one key lookup."""
+    f = key_manager.fernet()
+    return [f.encrypt(_to_bytes(p)) for p in plaintexts]
+
+
+def decrypt_many(tokens: Iterable[bytes | str]) -> List[bytes]:
+    """Decrypt many tokens with one key lookup. Raises InvalidToken on any bad token."""
+    f = key_manager.fernet()
+    return [f.decrypt(_to_bytes(t)) for t in tokens]
+
+
+def rotate_tokens(tokens: Iterable[bytes | str]) -> List[bytes]:
+    """Re-encrypt tokens under the current primary key (after rotate_key())."""
+    f = key_manager.fernet()
+    return [f.rotate(_to_bytes(t)) for t in tokens]
@@ -14,12 +14,16 @@ All values are read-only from existing computations.
 
 from typing import Dict, List, Any, Optional
 
+from rules.engine import rules_engine
+
 
 # =============================================================================
-# POLICY THRESHOLDS (mirrors existing values for explanation only)
+# POLICY THRESHOLDS
 # =============================================================================
-AUTO_APPROVAL_LIMIT = 50000  # Rs. - loans above this need human review
-EMI_INCOME_THRESHOLD = 0.5   # 50% - max EMI-to-income ratio for approval
+# Read from the rules engine policy (rules/policy.json) at call time, so the
+# explanation always quotes the thresholds the decision was made with:
+# - auto_approval_limit: loans above this need human review
+# - max_emi_to_salary: max EMI-to-income ratio for approval
 
 
 def generate_decision_rationale(
@@ -52,6 +56,10 @@ def generate_decision_rationale(
         - metrics: dict - relevant numeric values
         - decision_mode: str - always "AI-assisted, rule-based underwriting"
     """
+    policy = rules_engine.policy()
+    auto_approval_limit = policy.params["auto_approval_limit"]
+    emi_income_threshold = policy.params["max_emi_to_salary"]
+    
     # Calculate derived values
     emi_ratio = (emi / salary * 100) if salary > 0 else 0
     emi_ratio_str = f"{emi_ratio:.1f}%"
@@ -62,7 +70,7 @@ def generate_decision_rationale(
     
     if decision == "APPROVED":
         # Explain why approved
-        key_factors.append("EMI-to-income ratio is within acceptable limits (≤50%)")
+        key_factors.append(f"EMI-to-income ratio is within acceptable limits (≤{emi_income_threshold:.0%})")
         key_factors.append(f"Loan amount (Rs. {loan_amount:,.0f}) qualifies for automated approval")
         
         if risk_level == "Low":
@@ -81,8 +89,8 @@ def generate_decision_rationale(
             
     elif decision == "REJECTED":
         # Explain why rejected
-        if emi_ratio > 50:
-            key_factors.append(f"EMI-to-income ratio ({emi_ratio_str}) exceeds 50% threshold")
+        if emi_ratio > emi_income_threshold * 100:
+            key_factors.append(f"EMI-to-income ratio ({emi_ratio_str}) exceeds {emi_income_threshold:.0%} threshold")
             key_factors.append("Monthly EMI burden is too high relative to income")
         
         key_factors.append("Based on current eligibility rules, approval is not possible")
@@ -91,8 +99,8 @@ def generate_decision_rationale(
         
     elif decision == "MANUAL_REVIEW":
         # Explain why manual review needed
-        if loan_amount > AUTO_APPROVAL_LIMIT:
-            key_factors.append(f"Loan amount (Rs. {loan_amount:,.0f}) exceeds auto-approval limit (Rs. {AUTO_APPROVAL_LIMIT:,})")
+        if loan_amount > auto_approval_limit:
+            key_factors.append(f"Loan amount (Rs. {loan_amount:,.0f}) exceeds auto-approval limit (Rs. {auto_approval_limit:,})")
             key_factors.append("Higher loan amounts require human verification")
         
         if risk_level == "High":
@@ -0,0 +1,80 @@
+"""
+Expiry Wheel
+============
+Timing wheel for expiring keys (auth tokens, revocation entries).
+
+Keys are bucketed by expiry time at a fixed resolution. Scheduling,
+rescheduling (sliding refresh) and cancelling are O(1) set operations, and
+a sweep only touches buckets that have fully elapsed - unlike a heap, a
+refreshed key leaves no stale entry behind, so memory is exactly one slot
+per live key.
+
+Not thread-safe; callers hold their own lock.
+
+Usage:
+    wheel = ExpiryWheel(resolution=60)
+    wheel.schedule(token, expires_at)
+    for token in wheel.expired(time.time()):
+        ...
+"""
+
+from typing import Dict, Hashable, List, Optional, Set
+
+
+class ExpiryWheel:
+    """Keys bucketed by floor(expires_at / resolution)."""
+
+    def __init__(self, resolution: float = 60.0):
+        self.resolution = resolution
+        self._buckets: Dict[int, Set[Hashable]] = {}
+        self._slots: Dict[Hashable, int] = {}
+        self._cursor: Optional[int] = None  # every slot below this has been swept
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _slot(self, timestamp: float) -> int:
+        return int(timestamp // self.resolution)
+
+    def schedule(self, key: Hashable, expires_at: float) -> None:
+        """Add a key, or move it if it is already scheduled."""
+        slot = self._slot(expires_at)
+        if self._cursor is not None and slot < self._cursor:
+            slot = self._cursor  # already past: collected by the next sweep
+        current = self._slots.get(key)
+        if current == slot:
+            return
+        if current is not None:
+            self._discard(key, current)
+        self._buckets.setdefault(slot, set()).add(key)
+        self._slots[key] = slot
+
+    def cancel(self, key: Hashable) -> bool:
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return False
+        self._discard(key, slot)
+        return True
+
+    def _discard(self, key: Hashable, slot: int) -> None:
+        bucket = self._buckets[slot]
+        bucket.discard(key)
+        if not bucket:
+            del self._buckets[slot]
+
+    def expired(self, now: float) -> List[Hashable]:
+        """Remove and return every key in a bucket that ended at or before `now`."""
+        limit = self._slot(now)  # slots < limit have fully elapsed
+        if self._cursor is None or limit - self._cursor > len(self._buckets):
+            # First sweep or long idle gap: visit occupied buckets, not every empty slot
+            slots = sorted(slot for slot in self._buckets if slot < limit)
+        else:
+            slots = [slot for slot in range(self._cursor, limit) if slot in self._buckets]
+        self._cursor = limit if self._cursor is None else max(limit, self._cursor)
+
+        keys: List[Hashable] = []
+        for slot in slots:
+            for key in self._buckets.pop(slot):
+                del self._slots[key]
+                keys.append(key)
+        return keys
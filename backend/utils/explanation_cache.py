@@ -0,0 +1,267 @@
+"""
+Explanation Cache
+=================
+Caches Gemini explanations so most sanctions skip the LLM round trip.
+
+The prompt built by gemini_explainer._build_prompt depends only on the
+decision status, the reason and three numbers. Two modes:
+
+- exact     key on the exact prompt inputs; reuses text only for identical
+            decisions.
+- template  (default) Gemini is asked for an explanation with the
+            placeholders <LOAN_AMOUNT>, <SALARY> and <EMI> in place of the
+            figures. The template is cached under a key of status, reason
+            and bucketed amounts (loan band, salary band, EMI/salary ratio
+            band). Each customer's figures are then substituted in, so one
+            generation serves many customers.
+
+Tiers: an in-process LRU (with TTL) and an optional on-disk tier shared by
+workers and restarts (EXPLANATION_CACHE_DIR). Only successful generations
+are cached; fallback messages never are.
+
+Configuration (environment):
+- EXPLANATION_CACHE_MODE=template|exact|off   (default: template)
+- EXPLANATION_CACHE_SIZE=<n>                  LRU entries (default: 1024)
+- EXPLANATION_CACHE_TTL=<seconds>             entry lifetime (default: 86400)
+- EXPLANATION_CACHE_DIR=<path>                enable the disk tier
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+
+# =============================================================================
+# Placeholders & Buckets
+# =============================================================================
+
+PLACEHOLDERS = {
+    "loan_amount": "<LOAN_AMOUNT>",
+    "salary": "<SALARY>",
+    "emi": "<EMI>",
+}
+
+# Upper bounds (Rs.) of each band; values above the last bound share one band
+LOAN_AMOUNT_BANDS = [25000, 50000, 100000, 200000, 500000, 1000000, 2500000]
+SALARY_BANDS = [15000, 25000, 40000, 60000, 100000, 200000]
+EMI_RATIO_BANDS = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6]
+
+
+def _to_number(value: Any) -> Optional[float]:
+    try:
+        return float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def _band(value: Any, bounds) -> str:
+    number = _to_number(value)
+    if number is None:
+        return "na"
+    return str(bisect.bisect_left(bounds, number))
+
+
+def _emi_ratio_band(emi: Any, salary: Any) -> str:
+    emi_value, salary_value = _to_number(emi), _to_number(salary)
+    if emi_value is None or not salary_value:
+        return "na"
+    return str(bisect.bisect_left(EMI_RATIO_BANDS, emi_value / salary_value))
+
+
+def _normalize_text(text: Any) -> str:
+    return " ".join(str(text).lower().split())
+
+
+def format_amount(value: Any) -> str:
+    """Render a figure the way it should appear in customer text."""
+    number = _to_number(value)
+    if number is None:
+        return str(value)
+    return f"{number:,.0f}" if number == int(number) else f"{number:,.2f}"
+
+
+def bucket_key(status: str, reason: str, loan_amount, salary, emi, context: str) -> str:
+    """Cache key for template mode: similar decisions share one key."""
+    return "|".join([
+        "template",
+        context,
+        status.upper(),
+        _normalize_text(reason),
+        _band(loan_amount, LOAN_AMOUNT_BANDS),
+        _band(salary, SALARY_BANDS),
+        _emi_ratio_band(emi, salary),
+    ])
+
+
+def exact_key(status: str, reason: str, loan_amount, salary, emi, context: str) -> str:
+    """Cache key for exact mode."""
+    return "|".join([
+        "exact", context, status.upper(), _normalize_text(reason),
+        str(loan_amount), str(salary), str(emi),
+    ])
+
+
+def substitute(template: str, loan_amount, salary, emi) -> str:
+    """Fill template placeholders with a customer's figures."""
+    values = {"loan_amount": loan_amount, "salary": salary, "emi": emi}
+    for name, token in PLACEHOLDERS.items():
+        template = template.replace(token, format_amount(values[name]))
+    return template
+
+
+def substitute_stream(chunks: Iterable[str], loan_amount, salary, emi) -> Iterator[str]:
+    """
+    Substitute placeholders in a streamed template.
+
+    A placeholder may be split across chunks, so text after an unclosed "<"
+    is held back until the next chunk arrives.
+    """
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        cut = pending.rfind("<")
+        if cut != -1 and ">" not in pending[cut:]:
+            ready, pending = pending[:cut], pending[cut:]
+        else:
+            ready, pending = pending, ""
+        if ready:
+            yield substitute(ready, loan_amount, salary, emi)
+    if pending:
+        yield substitute(pending, loan_amount, salary, emi)
+
+
+# =============================================================================
+# Cache
+# =============================================================================
+
+class ExplanationCache:
+    """
+    Two-tier (memory LRU + optional disk) cache of explanation text.
+
+    Thread-safe. Disk entries are one JSON file per key, written atomically.
+    """
+
+    def __init__(
+        self,
+        mode: str = "template",
+        max_entries: int = 1024,
+        ttl: float = 86400.0,
+        disk_dir: Optional[str] = None,
+    ):
+        self.mode = mode
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ("template", "exact")
+
+    @property
+    def templated(self) -> bool:
+        return self.mode == "template"
+
+    def key_for(self, status: str, reason: str, loan_amount, salary, emi, context: str) -> str:
+        key_func = bucket_key if self.templated else exact_key
+        return key_func(status, reason, loan_amount, salary, emi, context)
+
+    def _disk_path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.json")
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, str]]:
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("key") != key:
+            return None
+        return entry["expires_at"], entry["text"]
+
+    def _write_disk(self, key: str, expires_at: float, text: str) -> None:
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "expires_at": expires_at, "text": text}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[EXPLANATION CACHE] Disk write failed: {e}")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, text = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return text
+                del self._entries[key]
+
+        if self.disk_dir:
+            entry = self._read_disk(key)
+            if entry is not None and entry[0] > now:
+                with self._lock:
+                    self._store(key, entry)
+                    self.disk_hits += 1
+                return entry[1]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _store(self, key: str, entry: Tuple[float, str]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, key: str, text: str) -> None:
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, (expires_at, text))
+        if self.disk_dir:
+            self._write_disk(key, expires_at, text)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "mode": self.mode,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "disk_tier": bool(self.disk_dir),
+            }
+
+
+# Process-wide cache used by gemini_explainer
+explanation_cache = ExplanationCache(
+    mode=(os.getenv("EXPLANATION_CACHE_MODE") or "template").lower(),
+    max_entries=int(os.getenv("EXPLANATION_CACHE_SIZE") or 1024),
+    ttl=float(os.getenv("EXPLANATION_CACHE_TTL") or 86400.0),
+    disk_dir=os.getenv("EXPLANATION_CACHE_DIR") or None,
+)
@@ -8,8 +8,12 @@ This is a READ-ONLY enhancement:
 - Gemini does NOT control routing
 - If Gemini fails, the system uses default fallback messages
 
+Explanations are cached (see utils/explanation_cache.py). By default Gemini
+writes a template with placeholders for the figures, so one generation is
+reused for every customer whose decision falls in the same bucket.
+
 Usage:
-    from utils.gemini_explainer import generate_explanation
+    from utils.gemini_explainer import generate_explanation, generate_explanations
     
     explanation = generate_explanation({
         "status": "APPROVED",
@@ -17,48 +21,28 @@ Usage:
         "loan_amount": 100000,
         "salary": 40000
     })
+    
+    # Backfills: deduplicated, concurrent, results in input order
+    explanations = generate_explanations(decisions)
 """
 
-import os
-from pathlib import Path
-import google.generativeai as genai
-from typing import Optional
-
-# Load environment variables from .env file
-try:
-    from dotenv import load_dotenv
-    # Look for .env in project root (parent of backend folder)
-    env_path = Path(__file__).resolve().parent.parent.parent / ".env"
-    if env_path.exists():
-        load_dotenv(env_path)
-        print(f"[GEMINI] Loaded .env from {env_path}")
-    else:
-        # Try backend folder
-        env_path_backend = Path(__file__).resolve().parent.parent / ".env"
-        if env_path_backend.exists():
-            load_dotenv(env_path_backend)
-            print(f"[GEMINI] Loaded .env from {env_path_backend}")
-except ImportError:
-    print("[GEMINI] python-dotenv not installed, using system environment only")
+import asyncio
+from typing import Dict, Iterator, List, Optional
 
-# Configure Gemini API (reads from environment variable)
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
+from utils.explanation_cache import (
+    PLACEHOLDERS,
+    exact_key,
+    explanation_cache,
+    substitute,
+    substitute_stream,
+)
+from utils.llm_client import llm_registry
 
-# Flag to enable/disable Gemini (for demo safety)
-GEMINI_ENABLED = bool(GEMINI_API_KEY)
+# Model used for customer-facing explanations (client shared via llm_registry)
+EXPLAINER_MODEL = "gemini-2.0-flash"
 
-if GEMINI_ENABLED:
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        print("[GEMINI] API configured successfully")
-    except Exception as e:
-        print(f"[GEMINI] Configuration failed: {e}")
-        GEMINI_ENABLED = False
-        model = None
-else:
-    print("[GEMINI] No API key found. Using fallback responses.")
-    model = None
+# Flag to enable/disable Gemini (for demo safety)
+GEMINI_ENABLED = llm_registry.enabled
 
 
 # =============================================================================
@@ -133,22 +117,27 @@ def generate_explanation(
     
     FAIL-SAFE: If Gemini API fails, returns a sensible default message.
     """
-    status = decision.get("status", "UNKNOWN").upper()
-    reason = decision.get("reason", "Standard policy criteria")
-    loan_amount = decision.get("loan_amount", "N/A")
-    salary = decision.get("salary", "N/A")
-    emi = decision.get("emi", "N/A")
+    status, reason, loan_amount, salary, emi = _decision_fields(decision)
     
     # If Gemini is disabled or unavailable, use fallback
-    if not GEMINI_ENABLED or model is None:
+    if not GEMINI_ENABLED:
         return _get_fallback_message(status, reason)
     
+    # Serve from cache (templated explanations get this customer's figures)
+    cache_key = None
+    if explanation_cache.enabled:
+        cache_key = explanation_cache.key_for(status, reason, loan_amount, salary, emi, context)
+        cached = explanation_cache.get(cache_key)
+        if cached is not None:
+            print("[GEMINI] Explanation cache hit")
+            return _render_cached(cached, loan_amount, salary, emi)
+    
     # Build prompt for Gemini
-    prompt = _build_prompt(status, reason, loan_amount, salary, emi, context)
+    prompt = _build_prompt(status, reason, loan_amount, salary, emi, context,
+                           templated=explanation_cache.templated)
     
     try:
-        response = model.generate_content(prompt)
-        explanation = response.text.strip()
+        explanation = llm_registry.generate(prompt, model_name=EXPLAINER_MODEL).strip()
         
         # Basic validation - ensure we got something useful
         if len(explanation) < 20:
@@ -156,22 +145,205 @@ def generate_explanation(
             return _get_fallback_message(status, reason)
         
         print(f"[GEMINI] Generated explanation ({len(explanation)} chars)")
-        return explanation
+        if cache_key is not None:
+            explanation_cache.put(cache_key, explanation)
+        return _render_cached(explanation, loan_amount, salary, emi)
     
     except Exception as e:
         print(f"[GEMINI] API call failed: {e}")
         return _get_fallback_message(status, reason)
 
 
+def stream_explanation(
+    decision: dict,
+    context: str = "loan_decision"
+) -> Iterator[str]:
+    """
+    Streaming variant of generate_explanation().
+    
+    Yields the explanation in chunks as Gemini produces them, so callers can
+    forward tokens to the client before the full response is ready.
+    
+    FAIL-SAFE: If Gemini is unavailable or fails before producing any text,
+    yields the default fallback message as a single chunk.
+    """
+    status, reason, loan_amount, salary, emi = _decision_fields(decision)
+    
+    if not GEMINI_ENABLED:
+        yield _get_fallback_message(status, reason)
+        return
+    
+    cache_key = None
+    if explanation_cache.enabled:
+        cache_key = explanation_cache.key_for(status, reason, loan_amount, salary, emi, context)
+        cached = explanation_cache.get(cache_key)
+        if cached is not None:
+            print("[GEMINI] Explanation cache hit")
+            yield _render_cached(cached, loan_amount, salary, emi)
+            return
+    
+    prompt = _build_prompt(status, reason, loan_amount, salary, emi, context,
+                           templated=explanation_cache.templated)
+    
+    parts = []
+    failed = False
+    
+    def _raw_chunks():
+        nonlocal failed
+        try:
+            for text in llm_registry.stream(prompt, model_name=EXPLAINER_MODEL):
+                parts.append(text)
+                yield text
+        except Exception as e:
+            failed = True
+            print(f"[GEMINI] Streaming call failed: {e}")
+    
+    chunks = _raw_chunks()
+    if explanation_cache.templated:
+        chunks = substitute_stream(chunks, loan_amount, salary, emi)
+    
+    produced = 0
+    for text in chunks:
+        produced += len(text)
+        yield text
+    
+    if produced == 0:
+        yield _get_fallback_message(status, reason)
+        return
+    
+    print(f"[GEMINI] Streamed explanation ({produced} chars)")
+    explanation = "".join(parts).strip()
+    if cache_key is not None and not failed and len(explanation) >= 20:
+        explanation_cache.put(cache_key, explanation)
+
+
+# =============================================================================
+# Batch Explanations (backfills / re-runs)
+# =============================================================================
+
+async def generate_explanations_async(
+    decisions: List[dict],
+    context: str = "loan_decision",
+    concurrency: Optional[int] = None
+) -> List[str]:
+    """
+    Generate explanations for many decisions, returned in input order.
+    
+    Identical prompts (same cache key) are generated once, cached entries
+    are served without a call, and the remaining prompts run concurrently,
+    at most `concurrency` at a time (default: the LLM registry limit).
+    
+    FAIL-SAFE: each item that cannot be generated gets its fallback message.
+    """
+    fields = [_decision_fields(d) for d in decisions]
+    
+    if not GEMINI_ENABLED:
+        return [_get_fallback_message(f[0], f[1]) for f in fields]
+    
+    # Group items by prompt key so duplicates share one generation
+    groups: Dict[str, List[int]] = {}
+    for index, (status, reason, loan_amount, salary, emi) in enumerate(fields):
+        if explanation_cache.enabled:
+            key = explanation_cache.key_for(status, reason, loan_amount, salary, emi, context)
+        else:
+            key = exact_key(status, reason, loan_amount, salary, emi, context)
+        groups.setdefault(key, []).append(index)
+    
+    texts: Dict[str, Optional[str]] = {}
+    pending = []
+    for key, indexes in groups.items():
+        cached = explanation_cache.get(key) if explanation_cache.enabled else None
+        if cached is not None:
+            texts[key] = cached
+        else:
+            pending.append((key, indexes[0]))
+    
+    semaphore = asyncio.Semaphore(concurrency or llm_registry.max_concurrency)
+    
+    async def _generate(key: str, index: int) -> None:
+        status, reason, loan_amount, salary, emi = fields[index]
+        prompt = _build_prompt(status, reason, loan_amount, salary, emi, context,
+                               templated=explanation_cache.templated)
+        async with semaphore:
+            try:
+                text = (await llm_registry.generate_async(prompt, model_name=EXPLAINER_MODEL)).strip()
+            except Exception as e:
+                print(f"[GEMINI] Batch item failed: {e}")
+                text = ""
+        if len(text) < 20:
+            texts[key] = None
+            return
+        texts[key] = text
+        if explanation_cache.enabled:
+            explanation_cache.put(key, text)
+    
+    await asyncio.gather(*(_generate(key, index) for key, index in pending))
+    
+    print(f"[GEMINI] Batch: {len(decisions)} decisions, {len(groups)} unique, "
+          f"{len(pending)} generated")
+    
+    results: List[str] = [""] * len(decisions)
+    for key, indexes in groups.items():
+        text = texts.get(key)
+        for index in indexes:
+            status, reason, loan_amount, salary, emi = fields[index]
+            if text is None:
+                results[index] = _get_fallback_message(status, reason)
+            else:
+                results[index] = _render_cached(text, loan_amount, salary, emi)
+    return results
+
+
+def generate_explanations(
+    decisions: List[dict],
+    context: str = "loan_decision",
+    concurrency: Optional[int] = None
+) -> List[str]:
+    """
+    Blocking wrapper around generate_explanations_async() for scripts and
+    worker threads. Do not call from a running event loop.
+    """
+    return asyncio.run(generate_explanations_async(decisions, context, concurrency))
+
+
+def _decision_fields(decision: dict):
+    """Extract (status, reason, loan_amount, salary, emi) with defaults."""
+    return (
+        decision.get("status", "UNKNOWN").upper(),
+        decision.get("reason", "Standard policy criteria"),
+        decision.get("loan_amount", "N/A"),
+        decision.get("salary", "N/A"),
+        decision.get("emi", "N/A"),
+    )
+
+
+def _render_cached(text: str, loan_amount, salary, emi) -> str:
+    """Fill placeholders when the cache holds templates."""
+    if explanation_cache.templated:
+        return substitute(text, loan_amount, salary, emi)
+    return text
+
+
 def _build_prompt(
     status: str,
     reason: str,
     loan_amount,
     salary,
     emi,
-    context: str
+    context: str,
+    templated: bool = False
 ) -> str:
-    """Build the prompt for Gemini based on decision context."""
+    """
+    Build the prompt for Gemini based on decision context.
+    
+    With templated=True the figures are replaced by placeholders that
+    Gemini must keep verbatim, so the reply can be reused for any customer
+    in the same bucket.
+    """
+    if templated:
+        loan_amount = PLACEHOLDERS["loan_amount"]
+        salary = PLACEHOLDERS["salary"]
+        emi = PLACEHOLDERS["emi"]
     
     base_prompt = """You are a professional loan officer at a modern NBFC (Non-Banking Financial Company).
 Your task is to write a brief, friendly, and clear message to a customer about their loan application.
@@ -184,6 +356,10 @@ RULES:
 - Use simple language
 - Include an emoji or two for friendliness
 
+"""
+    if templated:
+        base_prompt += """- Write figures ONLY as the placeholders <LOAN_AMOUNT>, <SALARY> and <EMI>, exactly as written
+
 """
 
     if status == "APPROVED":
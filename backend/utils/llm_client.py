@@ -0,0 +1,255 @@
+"""
+LLM Client Registry
+===================
+One place to build and reuse Gemini model clients.
+
+Before this, the sales agent constructed a new genai.GenerativeModel on every
+message and the explainer configured its own global model at import time.
+The registry configures the SDK once, builds each (model, system prompt)
+pair once, and bounds concurrent calls with a semaphore and a per-request
+timeout.
+
+Backends (LLM_BACKEND):
+- gemini  (default) Google Gemini; disabled when GEMINI_API_KEY is missing
+- fake    deterministic local responses, no network - for offline
+          benchmarking of the agents (latency via LLM_FAKE_LATENCY)
+- off     always disabled; callers use their fallback messages
+
+Configuration (environment):
+- LLM_MAX_CONCURRENCY=<n>   concurrent LLM requests per process (default: 8)
+- LLM_TIMEOUT=<seconds>     per-request timeout (default: 20)
+- LLM_FAKE_LATENCY=<sec>    simulated response time for the fake backend
+
+Usage:
+    from utils.llm_client import llm_registry
+
+    if llm_registry.enabled:
+        text = llm_registry.generate(prompt, model_name="gemini-2.0-flash")
+        text = await llm_registry.generate_async(prompt, model_name="gemini-2.0-flash")
+        for chunk in llm_registry.stream(prompt, model_name="gemini-2.0-flash"):
+            ...
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from utils.metrics import metrics
+
+# Load environment variables from .env file
+try:
+    from dotenv import load_dotenv
+    # Look for .env in project root (parent of backend folder), then backend
+    for env_path in (
+        Path(__file__).resolve().parent.parent.parent / ".env",
+        Path(__file__).resolve().parent.parent / ".env",
+    ):
+        if env_path.exists():
+            load_dotenv(env_path)
+            print(f"[LLM] Loaded .env from {env_path}")
+            break
+except ImportError:
+    print("[LLM] python-dotenv not installed, using system environment only")
+
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+
+# =============================================================================
+# Fake Backend (offline benchmarking)
+# =============================================================================
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """
+    Drop-in stand-in for genai.GenerativeModel that never touches the network.
+
+    Responses are deterministic for a given prompt so benchmarks are repeatable.
+    """
+
+    def __init__(self, model_name: str, system_instruction: Optional[str] = None, latency: float = 0.0):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.latency = latency
+
+    def _text(self, prompt: str) -> str:
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        return (
+            f"[{self.model_name} offline reply {digest}] Thank you for reaching out to LoanOps. "
+            "We have noted your request and will guide you through the next steps."
+        )
+
+    def generate_content(self, prompt: str, stream: bool = False, request_options: Dict = None):
+        if self.latency:
+            time.sleep(self.latency)
+        text = self._text(prompt)
+        if not stream:
+            return _FakeResponse(text)
+        words = text.split(" ")
+        return iter(_FakeResponse(w + (" " if i < len(words) - 1 else "")) for i, w in enumerate(words))
+
+    async def generate_content_async(self, prompt: str, request_options: Dict = None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return _FakeResponse(self._text(prompt))
+
+
+# =============================================================================
+# Registry
+# =============================================================================
+
+class LLMRegistry:
+    """
+    Process-wide cache of configured model clients.
+
+    Thread-safe. Sync calls (from agent pool threads) share a thread
+    semaphore; async calls share a per-event-loop asyncio semaphore. Both
+    use the same concurrency limit.
+    """
+
+    def __init__(
+        self,
+        backend: str = "gemini",
+        api_key: str = "",
+        max_concurrency: int = 8,
+        timeout: float = 20.0,
+        fake_latency: float = 0.0,
+    ):
+        self.backend = backend
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.fake_latency = fake_latency
+
+        self._lock = threading.Lock()
+        self._models: Dict[Tuple[str, Optional[str]], Any] = {}
+        self._configured = False
+        self._thread_limit = threading.BoundedSemaphore(max_concurrency)
+        # asyncio primitives are loop-bound, so keep one semaphore per loop
+        self._async_limits: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+        if self.backend == "gemini" and not self.api_key:
+            print("[LLM] No API key found. Using fallback responses.")
+
+    @property
+    def enabled(self) -> bool:
+        if self.backend == "fake":
+            return True
+        return self.backend == "gemini" and bool(self.api_key)
+
+    def _configure(self) -> None:
+        import google.generativeai as genai
+        genai.configure(api_key=self.api_key)
+        self._configured = True
+        print("[LLM] Gemini API configured successfully")
+
+    def get_model(self, model_name: str = DEFAULT_MODEL, system_instruction: Optional[str] = None):
+        """Return the cached client for (model_name, system_instruction), building it once."""
+        if not self.enabled:
+            raise RuntimeError(f"LLM backend '{self.backend}' is disabled")
+
+        key = (model_name, system_instruction)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                if self.backend == "fake":
+                    model = FakeModel(model_name, system_instruction, latency=self.fake_latency)
+                else:
+                    if not self._configured:
+                        self._configure()
+                    import google.generativeai as genai
+                    model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+                self._models[key] = model
+                print(f"[LLM] Built {self.backend} client for {model_name}")
+        return model
+
+    def _request_options(self, timeout: Optional[float]) -> Dict[str, float]:
+        return {"timeout": timeout or self.timeout}
+
+    def generate(
+        self,
+        prompt: str,
+        model_name: str = DEFAULT_MODEL,
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """Blocking generation. Raises on API errors or timeout."""
+        model = self.get_model(model_name, system_instruction)
+        with self._thread_limit, metrics.timed("llm", model_name):
+            response = model.generate_content(prompt, request_options=self._request_options(timeout))
+        return response.text
+
+    def stream(
+        self,
+        prompt: str,
+        model_name: str = DEFAULT_MODEL,
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[str]:
+        """Blocking streaming generation; holds a concurrency slot until exhausted."""
+        model = self.get_model(model_name, system_instruction)
+        # cpu=False: the consumer's work between chunks runs inside the span
+        with self._thread_limit, metrics.timed("llm_stream", model_name, cpu=False):
+            for chunk in model.generate_content(
+                prompt, stream=True, request_options=self._request_options(timeout)
+            ):
+                text = chunk.text
+                if text:
+                    yield text
+
+    def _async_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_limits.get(loop)
+        if semaphore is None:
+            semaphore = self._async_limits[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def generate_async(
+        self,
+        prompt: str,
+        model_name: str = DEFAULT_MODEL,
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """Non-blocking generation. Raises on API errors or asyncio.TimeoutError."""
+        model = self.get_model(model_name, system_instruction)
+        timeout = timeout or self.timeout
+        async with self._async_semaphore():
+            with metrics.timed("llm", model_name, cpu=False):
+                response = await asyncio.wait_for(
+                    model.generate_content_async(prompt, request_options=self._request_options(timeout)),
+                    timeout=timeout,
+                )
+        return response.text
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "enabled": self.enabled,
+            "models": [name for name, _ in self._models],
+            "max_concurrency": self.max_concurrency,
+            "timeout": self.timeout,
+        }
+
+
+# Process-wide registry shared by the sales agent and the explainer
+llm_registry = LLMRegistry(
+    backend=(os.getenv("LLM_BACKEND") or "gemini").lower(),
+    api_key=os.getenv("GEMINI_API_KEY", ""),
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY") or 8),
+    timeout=float(os.getenv("LLM_TIMEOUT") or 20.0),
+    fake_latency=float(os.getenv("LLM_FAKE_LATENCY") or 0.0),
+)
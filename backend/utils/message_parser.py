@@ -0,0 +1,160 @@
+"""
+Message Parser
+==============
+Single-pass extraction of routing signals from a chat message.
+
+The supervisor needs three things from each user message: whether it shows
+loan intent (or acknowledges a verification warning), the loan amount, and
+the monthly salary. All of them come from one precompiled pattern scanned
+once over the lowercased message.
+
+Amounts understand Indian formats:
+- "100000", "1,00,000", "Rs. 2,50,000.50"
+- "5 lakh", "5 lakhs", "1.5 lac", "2.5 crore", "3 cr", "50k"
+
+Usage:
+    from utils.message_parser import parse_message
+
+    parsed = parse_message("I need a loan of 5 lakh, my salary is 60,000")
+    parsed.intent      # True
+    parsed.amount      # 500000
+    parsed.salary      # 60000
+
+Microbenchmark:
+    cd backend
+    python -m utils.message_parser
+"""
+
+import re
+from typing import NamedTuple, Optional
+
+
+# Keyword lists used by determine_next_stage. Matched as substrings, as the
+# supervisor always has ("needed" counts as "need").
+INTENT_KEYWORDS = ("loan", "lakh", "amount", "borrow", "need", "want", "rupees")
+ACKNOWLEDGE_KEYWORDS = ("continue", "proceed", "okay", "ok", "yes", "go ahead", "confirm")
+SALARY_KEYWORDS = ("salary", "earn", "income", "monthly")
+
+UNIT_MULTIPLIERS = {
+    "k": 1_000,
+    "lakh": 100_000, "lakhs": 100_000, "lac": 100_000, "lacs": 100_000,
+    "crore": 10_000_000, "crores": 10_000_000, "cr": 10_000_000,
+}
+
+MIN_LOAN_AMOUNT = 1000                 # smaller numbers are not treated as loan amounts
+SALARY_RANGE = (5000, 500000)          # fallback: unlabelled numbers in this range
+
+_NUMBER = r"\d[\d,]*(?:\.\d+)?"
+_UNIT = r"lakhs?|lacs?|crores?|cr|k"
+
+
+def _alternation(keywords) -> str:
+    # Longest first so "okay" wins over "ok"
+    return "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+
+
+# One alternation, tried left to right at each position:
+#   salary  - salary keyword followed by a number ("salary is 50,000")
+#   number  - any other number with an optional unit ("5 lakh", "1,00,000")
+#   intent  - loan intent keyword
+#   ack     - acknowledgement keyword
+#
+# No keyword contains another group's keyword, so a single finditer() sees
+# every keyword any(k in message) would - except "lakh" swallowed as a unit,
+# which is checked explicitly.
+_TOKEN_RE = re.compile(
+    rf"(?:{_alternation(SALARY_KEYWORDS)})\s*(?:is|of)?\s*"
+    rf"(?P<salary>{_NUMBER})(?:\s*(?P<salary_unit>{_UNIT})\b)?"
+    rf"|(?P<number>{_NUMBER})(?:\s*(?P<unit>{_UNIT})\b)?"
+    rf"|(?P<intent>{_alternation(INTENT_KEYWORDS)})"
+    rf"|(?P<ack>{_alternation(ACKNOWLEDGE_KEYWORDS)})"
+)
+_AMOUNT_RE = re.compile(rf"(?P<value>{_NUMBER})(?:\s*(?P<unit>{_UNIT})\b)?")
+
+
+class ParsedMessage(NamedTuple):
+    """Routing signals extracted from one message."""
+    intent: bool = False              # loan intent keyword present
+    acknowledged: bool = False        # acknowledgement keyword present
+    amount: Optional[int] = None      # first number >= MIN_LOAN_AMOUNT
+    salary: Optional[int] = None      # labelled salary, else first number in SALARY_RANGE
+    salary_labelled: bool = False     # salary came from "salary/earn/income/monthly <n>"
+
+
+def _to_rupees(value: str, unit: Optional[str]) -> Optional[int]:
+    try:
+        number = float(value.replace(",", ""))
+    except ValueError:
+        return None  # e.g. a lone ","
+    if unit:
+        number *= UNIT_MULTIPLIERS[unit]
+    return int(round(number))
+
+
+def parse_amount(text: str) -> Optional[int]:
+    """Convert "1,00,000", "5 lakh", "2.5 crore" or "50k" to rupees (None if unparseable)."""
+    match = _AMOUNT_RE.match(text.strip().lower())
+    if not match:
+        return None
+    return _to_rupees(match.group("value"), match.group("unit"))
+
+
+def parse_message(message: str) -> ParsedMessage:
+    """Scan a message once and return its intent, acknowledgement, amount and salary."""
+    intent = acknowledged = False
+    amount = salary = fallback_salary = None
+
+    for match in _TOKEN_RE.finditer(message.lower()):
+        number, unit, salary_text, keyword_intent, keyword_ack = match.group(
+            "number", "unit", "salary", "intent", "ack"
+        )
+        if number is not None:
+            value = _to_rupees(number, unit)
+            if value is None:
+                continue
+            if amount is None and value >= MIN_LOAN_AMOUNT:
+                amount = value
+            if fallback_salary is None and SALARY_RANGE[0] <= value <= SALARY_RANGE[1]:
+                fallback_salary = value
+        elif salary_text is not None:
+            unit = match.group("salary_unit")
+            if salary is None:
+                salary = _to_rupees(salary_text, unit)
+        elif keyword_intent is not None:
+            intent = True
+        elif keyword_ack is not None:
+            acknowledged = True
+        if unit and unit.startswith("lakh"):
+            intent = True
+
+    labelled = salary is not None
+    return ParsedMessage(
+        intent=intent,
+        acknowledged=acknowledged,
+        amount=amount,
+        salary=salary if labelled else fallback_salary,
+        salary_labelled=labelled,
+    )
+
+
+# =============================================================================
+# Microbenchmark
+# =============================================================================
+
+if __name__ == "__main__":
+    import timeit
+
+    samples = [
+        "Hi, I need a personal loan of 5 lakh for 24 months",
+        "I want to borrow Rs. 1,00,000 please",
+        "My monthly salary is 65,000 and I need 2.5 crore",
+        "okay, go ahead",
+        "Hello there, what products do you offer?",
+        "Can I get 50k? I earn 30000 per month",
+    ]
+    for sample in samples:
+        print(f"{sample!r:60} -> {parse_message(sample)}")
+
+    number = 200_000
+    seconds = timeit.timeit(lambda: [parse_message(s) for s in samples], number=number // len(samples))
+    print(f"\nparse_message: {seconds / number * 1e6:.2f} us/message ({number} messages)")
@@ -0,0 +1,233 @@
+"""
+Latency Metrics
+===============
+Hot-path wall/CPU timing for agent nodes, external calls and store
+operations, exported in Prometheus text format at GET /metrics.
+
+Every span is recorded under (kind, stage, outcome):
+- kind     "agent", "graph_node", "llm", "pan", "pdf", "service", "store"
+- stage    agent stage, model name, store operation, ...
+- outcome  "ok" / "error" by default; callers can set a domain outcome
+           (e.g. the PAN verification status)
+
+Each series is a fixed-bucket histogram: recording is one bisect and a few
+integer increments under a lock, with no allocation. p50/p95/p99 are
+estimated from the buckets at scrape time, the same way Prometheus'
+histogram_quantile() does.
+
+Exported series:
+- loanops_span_wall_seconds         histogram
+- loanops_span_cpu_seconds          histogram (same-thread spans only)
+- loanops_span_latency_seconds      summary: p50/p95/p99 wall time per series
+- loanops_agent_queue_depth         gauge per agent stage
+- loanops_agent_running             gauge per agent stage
+
+Usage:
+    from utils.metrics import metrics
+
+    with metrics.timed("pdf", "sanction_letter"):
+        render()
+
+    with metrics.timed("pan", "setu", cpu=False) as span:   # awaits inside
+        result = await call()
+        span.outcome = result["verification_status"]
+"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+# Upper bounds in seconds: ~1.5x steps from 0.5 ms to 60 s, so quantile
+# estimates are within one bucket width of the true value
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.002, 0.003, 0.005, 0.0075, 0.01, 0.015, 0.025, 0.04,
+    0.06, 0.1, 0.15, 0.25, 0.4, 0.6, 1.0, 1.5, 2.5, 4.0, 6.0, 10.0, 15.0,
+    25.0, 40.0, 60.0,
+)
+QUANTILES = (0.5, 0.95, 0.99)
+
+_Key = Tuple[str, str, str]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (not thread-safe; guarded by Metrics)."""
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # last = +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """Linear interpolation within the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = LATENCY_BUCKETS[i - 1] if i else 0.0
+                if i == len(LATENCY_BUCKETS):
+                    return lower  # +Inf bucket: report the largest finite bound
+                upper = LATENCY_BUCKETS[i]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return LATENCY_BUCKETS[-1]
+
+
+class Span:
+    """Handle yielded by Metrics.timed(); set `outcome` to label the result."""
+
+    __slots__ = ("outcome",)
+
+    def __init__(self):
+        self.outcome: Optional[str] = None
+
+
+class Metrics:
+    """Process-wide registry of wall / CPU histograms keyed by (kind, stage, outcome)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wall: Dict[_Key, Histogram] = {}
+        self._cpu: Dict[_Key, Histogram] = {}
+
+    def observe(self, kind: str, stage: str, outcome: str, wall: float, cpu: Optional[float] = None) -> None:
+        key = (kind, stage, outcome)
+        with self._lock:
+            histogram = self._wall.get(key)
+            if histogram is None:
+                histogram = self._wall[key] = Histogram()
+            histogram.observe(wall)
+            if cpu is not None:
+                histogram = self._cpu.get(key)
+                if histogram is None:
+                    histogram = self._cpu[key] = Histogram()
+                histogram.observe(cpu)
+
+    @contextmanager
+    def timed(self, kind: str, stage: str, cpu: bool = True) -> Iterator[Span]:
+        """
+        Time the enclosed block.
+
+        CPU time is this thread's CPU time, so pass cpu=False for blocks that
+        await - the event loop thread runs other requests in the meantime.
+        """
+        span = Span()
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time() if cpu else 0.0
+        try:
+            yield span
+        except BaseException:
+            if span.outcome is None:
+                span.outcome = "error"
+            raise
+        finally:
+            wall = time.perf_counter() - wall_started
+            cpu_seconds = time.thread_time() - cpu_started if cpu else None
+            self.observe(kind, stage, span.outcome or "ok", wall, cpu_seconds)
+
+    def wrap(self, kind: str, stage: str, func: Callable) -> Callable:
+        """Return func timed under (kind, stage)."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.timed(kind, stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """p50/p95/p99 wall time per series, as JSON-friendly dicts."""
+        with self._lock:
+            return {
+                "/".join(key): {
+                    "count": h.count,
+                    **{f"p{int(q * 100)}": round(h.quantile(q), 6) for q in QUANTILES},
+                }
+                for key, h in sorted(self._wall.items())
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._wall.clear()
+            self._cpu.clear()
+
+    # -------------------------------------------------------------------------
+    # Prometheus exposition
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _labels(key: _Key, **extra: str) -> str:
+        kind, stage, outcome = key
+        pairs = [("kind", kind), ("stage", stage), ("outcome", outcome), *extra.items()]
+        return ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+    def _histogram_lines(self, name: str, help_text: str, series: Dict[_Key, Histogram]) -> List[str]:
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for key, h in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, h.counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{self._labels(key, le=repr(bound))}}} {cumulative}')
+            lines.append(f'{name}_bucket{{{self._labels(key, le="+Inf")}}} {h.count}')
+            lines.append(f"{name}_sum{{{self._labels(key)}}} {h.sum:.6f}")
+            lines.append(f"{name}_count{{{self._labels(key)}}} {h.count}")
+        return lines
+
+    def render_prometheus(self, gauges: Optional[Dict[str, Tuple[str, Dict[str, float]]]] = None) -> str:
+        """
+        Prometheus text exposition (format 0.0.4).
+
+        Args:
+            gauges: extra gauges as {name: (help, {stage: value})}
+        """
+        with self._lock:
+            wall = {key: _copy(h) for key, h in self._wall.items()}
+            cpu = {key: _copy(h) for key, h in self._cpu.items()}
+
+        lines = self._histogram_lines(
+            "loanops_span_wall_seconds", "Wall-clock time per agent node, external call and store operation.", wall
+        )
+        lines += self._histogram_lines(
+            "loanops_span_cpu_seconds", "Thread CPU time per span (spans that do not await).", cpu
+        )
+
+        name = "loanops_span_latency_seconds"
+        lines += [f"# HELP {name} Estimated wall-time quantiles per series.", f"# TYPE {name} summary"]
+        for key, h in sorted(wall.items()):
+            for q in QUANTILES:
+                lines.append(f'{name}{{{self._labels(key, quantile=str(q))}}} {h.quantile(q):.6f}')
+            lines.append(f"{name}_sum{{{self._labels(key)}}} {h.sum:.6f}")
+            lines.append(f"{name}_count{{{self._labels(key)}}} {h.count}")
+
+        for gauge, (help_text, values) in (gauges or {}).items():
+            lines += [f"# HELP {gauge} {help_text}", f"# TYPE {gauge} gauge"]
+            for stage, value in sorted(values.items()):
+                lines.append(f'{gauge}{{stage="{_escape(stage)}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+
+def _copy(h: Histogram) -> Histogram:
+    clone = Histogram()
+    clone.counts = list(h.counts)
+    clone.count = h.count
+    clone.sum = h.sum
+    return clone
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Process-wide registry
+metrics = Metrics()
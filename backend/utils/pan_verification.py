@@ -4,6 +4,14 @@ PAN Verification Utility (Setu Sandbox)
 Isolated function for verifying PAN via Setu API sandbox.
 Includes PAN format validation and falls back to simulation if API fails.
 
+Network access goes through shared, long-lived HTTP clients (connection
+pooling, keep-alive, HTTP/2 when available) guarded by a circuit breaker:
+after repeated Setu failures, calls go straight to the simulation fallback
+until a cooldown expires instead of waiting out the timeout every time.
+
+Results are cached (bounded LRU + TTL, keyed on upper-cased PAN and name),
+so a resubmitted KYC form does not trigger another external call.
+
 This is SANDBOX-ONLY code for hackathon demo purposes.
 Never use production endpoints or claim government verification.
 """
@@ -11,7 +19,12 @@ Never use production endpoints or claim government verification.
 import os
 import re
 import logging
-from typing import Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from utils.metrics import metrics
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -22,6 +35,18 @@ SETU_CLIENT_ID = os.getenv("SETU_CLIENT_ID", "")
 SETU_CLIENT_SECRET = os.getenv("SETU_CLIENT_SECRET", "")
 SETU_PRODUCT_INSTANCE_ID = os.getenv("SETU_PRODUCT_INSTANCE_ID", "")
 
+# HTTP client / resilience settings
+SETU_TIMEOUT = float(os.getenv("SETU_TIMEOUT") or 10.0)  # seconds, per call
+SETU_CONNECT_TIMEOUT = float(os.getenv("SETU_CONNECT_TIMEOUT") or 3.0)
+SETU_MAX_CONNECTIONS = int(os.getenv("SETU_MAX_CONNECTIONS") or 20)
+SETU_BREAKER_THRESHOLD = int(os.getenv("SETU_BREAKER_THRESHOLD") or 5)  # consecutive failures
+SETU_BREAKER_COOLDOWN = float(os.getenv("SETU_BREAKER_COOLDOWN") or 30.0)  # seconds
+
+# Result cache settings
+PAN_CACHE_SIZE = int(os.getenv("PAN_CACHE_SIZE") or 10000)
+PAN_CACHE_TTL = float(os.getenv("PAN_CACHE_TTL") or 86400.0)  # verified / invalid_format
+PAN_CACHE_SIMULATED_TTL = float(os.getenv("PAN_CACHE_SIMULATED_TTL") or 300.0)  # fallbacks retry sooner
+
 # Official PAN format: 5 letters + 4 digits + 1 letter (e.g., ABCDE1234F)
 PAN_REGEX = r'^[A-Z]{5}[0-9]{4}[A-Z]$'
 
@@ -49,30 +74,235 @@ def is_valid_pan_format(pan: str) -> bool:
     return bool(re.match(PAN_REGEX, pan.upper()))
 
 
-def verify_pan_sandbox(pan_number: str, full_name: str = "") -> Dict[str, Any]:
+# ================================================================
+# Result Cache (LRU + TTL)
+# ================================================================
+class PanResultCache:
     """
-    Verify PAN number via Setu sandbox API with graceful fallback.
+    Bounded LRU cache of verification outcomes with per-entry TTL.
     
-    Flow:
-    1. Validate PAN format (if invalid, return invalid_format status)
-    2. If format valid, attempt Setu sandbox API (if credentials exist)
-    3. If API fails or no credentials, return simulated result
+    Keyed on (upper-cased PAN, normalized name). Simulated (fallback)
+    outcomes get a shorter TTL so a recovered Setu endpoint is retried soon.
+    """
     
-    Args:
-        pan_number: 10-character PAN number (e.g., ABCDE1234F)
-        full_name: Name for optional matching (not used in basic verification)
+    def __init__(self, max_entries: int = PAN_CACHE_SIZE, ttl: float = PAN_CACHE_TTL,
+                 simulated_ttl: float = PAN_CACHE_SIMULATED_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.simulated_ttl = simulated_ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
     
-    Returns:
-        Dict with verification result:
-        - pan_verified: True | False | "SIMULATED"
-        - verification_source: Source description for UI display
-        - verification_status: "verified" | "invalid_format" | "simulated"
-        - pan_format_valid: Boolean indicating if format passed validation
+    @staticmethod
+    def key(pan_number: str, full_name: str = "") -> Tuple[str, str]:
+        return (pan_number or "").strip().upper(), " ".join((full_name or "").split()).lower()
     
-    Note:
-        - NEVER blocks loan flow on any failure
-        - NEVER exposes raw error messages to users
-        - Logs errors server-side only
+    def get(self, pan_number: str, full_name: str = "") -> Optional[Dict[str, Any]]:
+        key = self.key(pan_number, full_name)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1])
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+    
+    def put(self, pan_number: str, full_name: str, result: Dict[str, Any]) -> None:
+        ttl = self.simulated_ttl if result.get("verification_status") == "simulated" else self.ttl
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        key = self.key(pan_number, full_name)
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, dict(result))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+pan_cache = PanResultCache()
+
+
+def _cached_result(pan_number: str, full_name: str) -> Optional[Dict[str, Any]]:
+    result = pan_cache.get(pan_number, full_name)
+    if result is not None:
+        print(f"[PAN VERIFY] Cache hit for PAN: {pan_number[:5]}XXXXX ({result.get('verification_status')})")
+    return result
+
+
+# ================================================================
+# Circuit Breaker
+# ================================================================
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for the Setu endpoint.
+    
+    - CLOSED: calls go through
+    - OPEN: after `threshold` consecutive failures, calls are short-circuited
+      to the simulation fallback for `cooldown` seconds
+    - HALF-OPEN: after the cooldown, one trial call is let through; success
+      closes the circuit, failure re-opens it, and a trial that ends any other
+      way (cancelled, httpx missing) is released so the next call can retry
+    
+    allow_request() tells the caller whether it claimed the half-open trial;
+    only that call passes trial=True back, so a call admitted while the
+    circuit was still closed cannot end another call's trial.
+    """
+    
+    def __init__(self, threshold: int = SETU_BREAKER_THRESHOLD, cooldown: float = SETU_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                return "half_open"
+            return "open"
+    
+    def allow_request(self) -> Tuple[bool, bool]:
+        """(allowed, trial): trial is True only for the call that claimed the half-open trial."""
+        with self._lock:
+            if self._opened_at is None:
+                return True, False
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return False, False
+            if self._trial_in_flight:
+                return False, False
+            self._trial_in_flight = True
+            return True, True
+    
+    def record_success(self, trial: bool = False) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            if trial:
+                self._trial_in_flight = False
+    
+    def record_failure(self, trial: bool = False) -> None:
+        with self._lock:
+            self._failures += 1
+            if trial:
+                self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                if self._opened_at is None:
+                    print(f"[PAN VERIFY] Circuit OPEN after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+    
+    def release_trial(self) -> None:
+        """End this call's half-open trial without an outcome (no-op if already recorded)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+setu_breaker = CircuitBreaker()
+
+
+# ================================================================
+# Shared HTTP Clients (connection pooling + keep-alive)
+# ================================================================
+_sync_client = None
+_async_client = None
+_client_lock = threading.Lock()
+
+
+def _client_options(timeout: float) -> Dict[str, Any]:
+    import httpx
+    
+    options = {
+        "base_url": SETU_BASE_URL,
+        "timeout": httpx.Timeout(timeout, connect=min(SETU_CONNECT_TIMEOUT, timeout)),
+        "limits": httpx.Limits(
+            max_connections=SETU_MAX_CONNECTIONS,
+            max_keepalive_connections=SETU_MAX_CONNECTIONS,
+            keepalive_expiry=60.0,
+        ),
+        "headers": {
+            "x-client-id": SETU_CLIENT_ID,
+            "x-client-secret": SETU_CLIENT_SECRET,
+            "x-product-instance-id": SETU_PRODUCT_INSTANCE_ID,
+            "Content-Type": "application/json"
+        },
+    }
+    try:
+        import h2  # noqa: F401 - HTTP/2 needs the optional h2 package (httpx[http2])
+        options["http2"] = True
+    except ImportError:
+        pass
+    return options
+
+
+def _get_sync_client():
+    global _sync_client
+    if _sync_client is None:
+        with _client_lock:
+            if _sync_client is None:
+                import httpx
+                _sync_client = httpx.Client(**_client_options(SETU_TIMEOUT))
+    return _sync_client
+
+
+def _get_async_client():
+    global _async_client
+    if _async_client is None:
+        import httpx
+        _async_client = httpx.AsyncClient(**_client_options(SETU_TIMEOUT))
+    return _async_client
+
+
+def _request_options(timeout: Optional[float]) -> Dict[str, Any]:
+    """Per-call timeout keeping the client's connect limit (client default if None)."""
+    if timeout is None:
+        return {}
+    import httpx
+    
+    return {"timeout": httpx.Timeout(timeout, connect=min(SETU_CONNECT_TIMEOUT, timeout))}
+
+
+async def aclose_pan_clients() -> None:
+    """Close the shared HTTP clients (call on application shutdown)."""
+    global _sync_client, _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+
+
+# ================================================================
+# Verification Flow
+# ================================================================
+def _precheck(pan_number: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    Steps 1-2 shared by the sync and async paths.
+    Returns (result, trial): a final result if no API call should be made,
+    else None, and whether the call holds the breaker's half-open trial.
     """
     print(f"[PAN VERIFY] Starting verification for PAN: {pan_number[:5]}XXXXX" if pan_number and len(pan_number) >= 5 else "[PAN VERIFY] No/short PAN provided")
     
@@ -87,7 +317,7 @@ def verify_pan_sandbox(pan_number: str, full_name: str = "") -> Dict[str, Any]:
             "name_on_pan": "",
             "verification_status": "invalid_format",
             "pan_format_valid": False
-        }
+        }, False
     
     print(f"[PAN VERIFY] PAN format valid: {pan_number[:5]}XXXXX")
     
@@ -96,58 +326,180 @@ def verify_pan_sandbox(pan_number: str, full_name: str = "") -> Dict[str, Any]:
     # ================================================================
     if not all([SETU_CLIENT_ID, SETU_CLIENT_SECRET, SETU_PRODUCT_INSTANCE_ID]):
         print("[PAN VERIFY] Setu credentials not configured - using simulation fallback")
-        return _simulation_fallback("Sandbox-ready (credentials not configured)")
+        return _simulation_fallback("Sandbox-ready (credentials not configured)"), False
     
     # ================================================================
-    # Step 3: Attempt Setu Sandbox API call
+    # Step 2b: Circuit breaker - skip the call while Setu is degraded
     # ================================================================
-    try:
-        import httpx
+    allowed, trial = setu_breaker.allow_request()
+    if not allowed:
+        return _simulation_fallback("Circuit open (Setu endpoint degraded)"), False
+    
+    return None, trial
+
+
+def _setu_payload(pan_number: str) -> Dict[str, Any]:
+    return {
+        "pan": pan_number.upper(),
+        "consent": "Y",
+        "reason": "Loan application identity verification"
+    }
+
+
+def _handle_response(response, trial: bool) -> Dict[str, Any]:
+    """Map a Setu HTTP response to a verification result and update the breaker."""
+    print(f"[PAN VERIFY] API Response status: {response.status_code}")
+    
+    if response.status_code == 200:
+        setu_breaker.record_success(trial)
+        data = response.json()
+        name_on_pan = data.get("data", {}).get("name", "")
+        print(f"[PAN VERIFY] SUCCESS - Name on PAN: {name_on_pan[:10]}..." if name_on_pan else "[PAN VERIFY] SUCCESS - No name returned")
         
-        url = f"{SETU_BASE_URL}/api/verify/pan"
-        headers = {
-            "x-client-id": SETU_CLIENT_ID,
-            "x-client-secret": SETU_CLIENT_SECRET,
-            "x-product-instance-id": SETU_PRODUCT_INSTANCE_ID,
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "pan": pan_number.upper(),
-            "consent": "Y",
-            "reason": "Loan application identity verification"
+        return {
+            "pan_verified": True,
+            "verification_source": "Setu PAN Verification API (Sandbox)",
+            "name_on_pan": name_on_pan,
+            "verification_status": "verified",
+            "pan_format_valid": True
         }
+    
+    # 5xx / 429 mean the endpoint is degraded; other statuses are per-request answers
+    if response.status_code >= 500 or response.status_code == 429:
+        setu_breaker.record_failure(trial)
+    else:
+        setu_breaker.record_success(trial)
+    logger.warning(f"PAN API returned status {response.status_code}")
+    return _simulation_fallback(f"API returned status {response.status_code}")
+
+
+def _handle_error(e: Exception, trial: bool) -> Dict[str, Any]:
+    setu_breaker.record_failure(trial)
+    logger.error(f"PAN verification API error: {e}")
+    print(f"[PAN VERIFY] API Error (logged): {type(e).__name__}")
+    return _simulation_fallback("API request failed")
+
+
+def verify_pan_sandbox(pan_number: str, full_name: str = "", timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Verify PAN number via Setu sandbox API with graceful fallback.
+    
+    Flow:
+    1. Validate PAN format (if invalid, return invalid_format status)
+    2. If format valid, attempt Setu sandbox API (if credentials exist
+       and the circuit breaker is closed)
+    3. If API fails or no credentials, return simulated result
+    
+    Args:
+        pan_number: 10-character PAN number (e.g., ABCDE1234F)
+        full_name: Name for optional matching (not used in basic verification)
+        timeout: Per-call timeout in seconds (default: SETU_TIMEOUT)
+    
+    Returns:
+        Dict with verification result:
+        - pan_verified: True | False | "SIMULATED"
+        - verification_source: Source description for UI display
+        - verification_status: "verified" | "invalid_format" | "simulated"
+        - pan_format_valid: Boolean indicating if format passed validation
+    
+    Note:
+        - NEVER blocks loan flow on any failure
+        - NEVER exposes raw error messages to users
+        - Logs errors server-side only
+        - Outcomes are cached per (PAN, name); see PanResultCache
+    """
+    cached = _cached_result(pan_number, full_name)
+    if cached is not None:
+        return cached
+    
+    result, trial = _precheck(pan_number)
+    if result is None:
+        with metrics.timed("pan", "setu") as span:
+            result = _call_setu_sync(pan_number, timeout, trial)
+            span.outcome = result.get("verification_status")
+    
+    pan_cache.put(pan_number, full_name, result)
+    return result
+
+
+def _call_setu_sync(pan_number: str, timeout: Optional[float], trial: bool) -> Dict[str, Any]:
+    # ================================================================
+    # Step 3: Attempt Setu Sandbox API call (pooled client)
+    # ================================================================
+    try:
+        client = _get_sync_client()
         
         print(f"[PAN VERIFY] Calling Setu sandbox API...")
         
-        with httpx.Client(timeout=10.0) as client:
-            response = client.post(url, json=payload, headers=headers)
-        
-        print(f"[PAN VERIFY] API Response status: {response.status_code}")
-        
-        if response.status_code == 200:
-            data = response.json()
-            name_on_pan = data.get("data", {}).get("name", "")
-            print(f"[PAN VERIFY] SUCCESS - Name on PAN: {name_on_pan[:10]}..." if name_on_pan else "[PAN VERIFY] SUCCESS - No name returned")
-            
-            return {
-                "pan_verified": True,
-                "verification_source": "Setu PAN Verification API (Sandbox)",
-                "name_on_pan": name_on_pan,
-                "verification_status": "verified",
-                "pan_format_valid": True
-            }
-        else:
-            logger.warning(f"PAN API returned status {response.status_code}")
-            return _simulation_fallback(f"API returned status {response.status_code}")
+        response = client.post(
+            "/api/verify/pan",
+            json=_setu_payload(pan_number),
+            **_request_options(timeout),
+        )
+        return _handle_response(response, trial)
             
     except ImportError:
         print("[PAN VERIFY] httpx not installed - using simulation fallback")
         return _simulation_fallback("HTTP client not available")
         
     except Exception as e:
-        logger.error(f"PAN verification API error: {e}")
-        print(f"[PAN VERIFY] API Error (logged): {type(e).__name__}")
-        return _simulation_fallback("API request failed")
+        return _handle_error(e, trial)
+    
+    finally:
+        # A half-open trial must not stay claimed if it ended without an
+        # outcome (cancelled, httpx missing); only the claiming call releases it
+        if trial:
+            setu_breaker.release_trial()
+
+
+async def verify_pan_sandbox_async(pan_number: str, full_name: str = "", timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Async variant of verify_pan_sandbox() for use from async handlers.
+    
+    Uses a shared httpx.AsyncClient (pooled, keep-alive, HTTP/2 when the h2
+    package is installed) so repeated KYC submissions reuse connections
+    instead of paying a TCP+TLS handshake each time.
+    Same result contract, caching and fail-safe behaviour as the sync version.
+    """
+    cached = _cached_result(pan_number, full_name)
+    if cached is not None:
+        return cached
+    
+    result, trial = _precheck(pan_number)
+    if result is None:
+        with metrics.timed("pan", "setu", cpu=False) as span:
+            result = await _call_setu_async(pan_number, timeout, trial)
+            span.outcome = result.get("verification_status")
+    
+    pan_cache.put(pan_number, full_name, result)
+    return result
+
+
+async def _call_setu_async(pan_number: str, timeout: Optional[float], trial: bool) -> Dict[str, Any]:
+    try:
+        client = _get_async_client()
+        
+        print(f"[PAN VERIFY] Calling Setu sandbox API (async)...")
+        
+        response = await client.post(
+            "/api/verify/pan",
+            json=_setu_payload(pan_number),
+            **_request_options(timeout),
+        )
+        return _handle_response(response, trial)
+    
+    except ImportError:
+        print("[PAN VERIFY] httpx not installed - using simulation fallback")
+        return _simulation_fallback("HTTP client not available")
+    
+    except Exception as e:
+        return _handle_error(e, trial)
+    
+    finally:
+        # A half-open trial must not stay claimed if it ended without an
+        # outcome (cancelled, httpx missing); only the claiming call releases it
+        if trial:
+            setu_breaker.release_trial()
 
 
 def _simulation_fallback(reason: str) -> Dict[str, Any]:
@@ -157,6 +509,7 @@ def _simulation_fallback(reason: str) -> Dict[str, Any]:
     Used when:
     - Credentials not configured
     - API call fails
+    - Circuit breaker is open
     
     Args:
         reason: Internal reason for fallback (not shown to user)
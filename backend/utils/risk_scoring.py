@@ -5,11 +5,73 @@ Computes a deterministic risk score (0-100) with explainable factors.
 
 This is a rule-based scoring system, NOT ML/AI prediction.
 Used to explain why underwriting decisions are made.
+
+The factor bands below are shared with the vectorized portfolio scorer in
+utils/batch_scoring.py, so both always agree.
 """
 
+from bisect import bisect_left
 from typing import List, Dict, Any
 
 
+# =============================================================================
+# Factor Bands
+# =============================================================================
+# A value falls in the first band whose upper bound it does not exceed
+# (value <= bound); values above every bound fall in the last band.
+# Each band is (points, factor code, explanation).
+
+EMI_RATIO_BOUNDS = [0.3, 0.4, 0.5]
+EMI_RATIO_BANDS = [
+    (10, "EMI_RATIO_EXCELLENT", "✓ EMI-to-income ratio is excellent (under 30%)"),
+    (20, "EMI_RATIO_ACCEPTABLE", "✓ EMI-to-income ratio within acceptable limits"),
+    (30, "EMI_RATIO_BORDERLINE", "⚠ EMI-to-income ratio approaching threshold"),
+    (40, "EMI_RATIO_HIGH", "⚠ EMI-to-income ratio exceeds recommended limits"),
+]
+
+LOAN_SALARY_BOUNDS = [3, 6, 10]
+LOAN_SALARY_BANDS = [
+    (5, "LOAN_RATIO_CONSERVATIVE", "✓ Loan amount is conservative relative to income"),
+    (15, "LOAN_RATIO_MODERATE", "✓ Loan amount is moderate relative to income"),
+    (25, "LOAN_RATIO_ELEVATED", "⚠ Loan amount is elevated relative to income"),
+    (30, "LOAN_RATIO_HIGH", "⚠ Loan amount is high relative to income"),
+]
+
+TENURE_BOUNDS = [12, 24, 36]
+TENURE_BANDS = [
+    (5, "TENURE_SHORT", "✓ Short loan tenure reduces overall exposure"),
+    (10, "TENURE_STANDARD", "✓ Standard loan tenure"),
+    (15, "TENURE_EXTENDED", "⚠ Extended tenure increases interest burden"),
+    (20, "TENURE_LONG", "⚠ Long tenure increases repayment risk"),
+]
+
+# Indexed by is_verified (False, True)
+VERIFICATION_BANDS = [
+    (10, "VERIFICATION_PENDING", "⚠ Identity verification pending"),
+    (0, "VERIFICATION_COMPLETE", "✓ Identity verification complete"),
+]
+
+# Risk level by total score (score <= bound)
+RISK_LEVEL_BOUNDS = [40, 70]
+RISK_LEVELS = ["Low", "Medium", "High"]
+
+# Factor code -> explanation, for rendering batch results
+FACTOR_MESSAGES = {
+    code: message
+    for bands in (EMI_RATIO_BANDS, LOAN_SALARY_BANDS, TENURE_BANDS, VERIFICATION_BANDS)
+    for _, code, message in bands
+}
+
+
+def compute_emi(loan_amount: float, annual_rate: float, tenure: int) -> float:
+    """Standard reducing-balance EMI, rounded to paise."""
+    monthly_rate = annual_rate / 100 / 12
+    if monthly_rate == 0:
+        return round(loan_amount / tenure, 2)
+    growth = (1 + monthly_rate) ** tenure
+    return round(loan_amount * monthly_rate * growth / (growth - 1), 2)
+
+
 def compute_risk_score(
     loan_amount: float,
     salary: float,
@@ -22,6 +84,8 @@ def compute_risk_score(
     
     Lower score = lower risk = better for approval.
     
+    For scoring many applications at once use utils.batch_scoring.score_batch.
+    
     Factors (weighted contributions to risk):
     - EMI-to-income ratio: 40 points max
     - Loan-to-salary ratio: 30 points max
@@ -59,93 +123,36 @@ def compute_risk_score(
     # Factor 1: EMI-to-Income Ratio (40 points max)
     # =========================================================================
     emi_ratio = emi / salary
-    
-    if emi_ratio <= 0.3:
-        # Excellent - EMI is under 30% of salary
-        emi_points = 10
-        risk_factors.append("✓ EMI-to-income ratio is excellent (under 30%)")
-    elif emi_ratio <= 0.4:
-        # Good - EMI is 30-40% of salary
-        emi_points = 20
-        risk_factors.append("✓ EMI-to-income ratio within acceptable limits")
-    elif emi_ratio <= 0.5:
-        # Borderline - EMI is 40-50% of salary
-        emi_points = 30
-        risk_factors.append("⚠ EMI-to-income ratio approaching threshold")
-    else:
-        # High risk - EMI exceeds 50%
-        emi_points = 40
-        risk_factors.append("⚠ EMI-to-income ratio exceeds recommended limits")
-    
+    emi_points, _, message = EMI_RATIO_BANDS[bisect_left(EMI_RATIO_BOUNDS, emi_ratio)]
+    risk_factors.append(message)
     risk_score += emi_points
     
     # =========================================================================
     # Factor 2: Loan-to-Salary Ratio (30 points max)
     # =========================================================================
     loan_salary_ratio = loan_amount / salary
-    
-    if loan_salary_ratio <= 3:
-        # Loan is 3x or less of salary - low risk
-        loan_points = 5
-        risk_factors.append("✓ Loan amount is conservative relative to income")
-    elif loan_salary_ratio <= 6:
-        # Loan is 3-6x salary - moderate
-        loan_points = 15
-        risk_factors.append("✓ Loan amount is moderate relative to income")
-    elif loan_salary_ratio <= 10:
-        # Loan is 6-10x salary - elevated
-        loan_points = 25
-        risk_factors.append("⚠ Loan amount is elevated relative to income")
-    else:
-        # Loan exceeds 10x salary - high risk
-        loan_points = 30
-        risk_factors.append("⚠ Loan amount is high relative to income")
-    
+    loan_points, _, message = LOAN_SALARY_BANDS[bisect_left(LOAN_SALARY_BOUNDS, loan_salary_ratio)]
+    risk_factors.append(message)
     risk_score += loan_points
     
     # =========================================================================
     # Factor 3: Tenure Risk (20 points max)
     # =========================================================================
-    if tenure <= 12:
-        # Short tenure - lower risk
-        tenure_points = 5
-        risk_factors.append("✓ Short loan tenure reduces overall exposure")
-    elif tenure <= 24:
-        # Medium tenure - moderate
-        tenure_points = 10
-        risk_factors.append("✓ Standard loan tenure")
-    elif tenure <= 36:
-        # Longer tenure - elevated
-        tenure_points = 15
-        risk_factors.append("⚠ Extended tenure increases interest burden")
-    else:
-        # Very long tenure - higher risk
-        tenure_points = 20
-        risk_factors.append("⚠ Long tenure increases repayment risk")
-    
+    tenure_points, _, message = TENURE_BANDS[bisect_left(TENURE_BOUNDS, tenure)]
+    risk_factors.append(message)
     risk_score += tenure_points
     
     # =========================================================================
     # Factor 4: Verification Status (10 points max)
     # =========================================================================
-    if is_verified:
-        verification_points = 0
-        risk_factors.append("✓ Identity verification complete")
-    else:
-        verification_points = 10
-        risk_factors.append("⚠ Identity verification pending")
-    
+    verification_points, _, message = VERIFICATION_BANDS[1 if is_verified else 0]
+    risk_factors.append(message)
     risk_score += verification_points
     
     # =========================================================================
     # Compute Final Risk Level
     # =========================================================================
-    if risk_score <= 40:
-        risk_level = "Low"
-    elif risk_score <= 70:
-        risk_level = "Medium"
-    else:
-        risk_level = "High"
+    risk_level = RISK_LEVELS[bisect_left(RISK_LEVEL_BOUNDS, risk_score)]
     
     print(f"[RISK SCORING] Score: {risk_score}, Level: {risk_level}")
     
@@ -0,0 +1,195 @@
+"""
+Stage Event Bus
+===============
+Pushes agent-transition events (Sales -> Verification -> Underwriting -> Sanction)
+to clients as they happen, instead of sleeping in the request path so the
+frontend can "see" transitions.
+
+The supervisor publishes events; the /events/{session_id} endpoint streams
+them to the browser as Server-Sent Events. Visual pacing is the client's job.
+
+Scope: events are delivered in-process. With several workers, a client only
+receives events for turns handled by the worker it is subscribed to.
+
+Usage:
+    from utils.stage_events import publish_stage_event, stage_event_bus
+
+    publish_stage_event(session_id, stage="underwriting",
+                        active_agent="UnderwritingAgent", previous_agent="VerificationAgent")
+
+    async for event in stage_event_bus.subscribe(session_id):
+        ...
+
+Per-turn streaming (/chat/stream):
+    Agents call emit_turn_event() to push partial output (underwriting
+    summary, explanation tokens, sanction letter link). It is a no-op unless
+    the current context has a sink installed via turn_stream_sink.
+"""
+
+import asyncio
+import contextvars
+import json
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+
+class StageEventBus:
+    """
+    Per-session publish/subscribe for orchestration events.
+
+    Keeps a short replay history per session so a client that subscribes
+    just after /chat returned still sees the transitions of that turn.
+    """
+
+    def __init__(self, history_size: int = 20, max_sessions: int = 10000, queue_size: int = 100):
+        self.history_size = history_size
+        self.max_sessions = max_sessions
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._history: "OrderedDict[str, deque]" = OrderedDict()
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._sequence = 0
+
+    def publish(self, session_id: str, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Record an event and fan it out to every subscriber of the session."""
+        with self._lock:
+            self._sequence += 1
+            event = {"id": self._sequence, "session_id": session_id, **event}
+
+            history = self._history.get(session_id)
+            if history is None:
+                history = deque(maxlen=self.history_size)
+                self._history[session_id] = history
+                while len(self._history) > self.max_sessions:
+                    self._history.popitem(last=False)
+            else:
+                self._history.move_to_end(session_id)
+            history.append(event)
+
+            subscribers = list(self._subscribers.get(session_id, []))
+
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._offer, queue, event)
+        return event
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+        # Slow consumer: drop the oldest event rather than block the publisher
+        if queue.full():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(event)
+
+    def history(self, session_id: str, after_id: int = 0) -> List[Dict[str, Any]]:
+        """Return buffered events for a session newer than `after_id`."""
+        with self._lock:
+            return [e for e in self._history.get(session_id, ()) if e["id"] > after_id]
+
+    async def subscribe(
+        self,
+        session_id: str,
+        after_id: int = 0,
+        keepalive: Optional[float] = 15.0,
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield buffered events newer than `after_id`, then live events.
+
+        Yields None every `keepalive` seconds of silence so the caller can
+        send a heartbeat and notice disconnected clients.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        entry = (loop, queue)
+
+        with self._lock:
+            self._subscribers.setdefault(session_id, []).append(entry)
+            replay = [e for e in self._history.get(session_id, ()) if e["id"] > after_id]
+
+        try:
+            last_id = after_id
+            for event in replay:
+                last_id = event["id"]
+                yield event
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event["id"] <= last_id:
+                    continue  # already delivered from replay
+                last_id = event["id"]
+                yield event
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(session_id, [])
+                if entry in subscribers:
+                    subscribers.remove(entry)
+                if not subscribers:
+                    self._subscribers.pop(session_id, None)
+
+
+# Process-wide bus used by the supervisor and the /events endpoint
+stage_event_bus = StageEventBus()
+
+
+# =============================================================================
+# Per-Turn Stream Sink
+# =============================================================================
+# Set by the /chat/stream endpoint for the duration of one turn. Context
+# variables follow asyncio tasks and asyncio.to_thread(), so agents running
+# off the event loop still reach the right stream.
+
+turn_stream_sink: contextvars.ContextVar[Optional[Callable[[Dict[str, Any]], None]]] = (
+    contextvars.ContextVar("turn_stream_sink", default=None)
+)
+
+
+def is_streaming_turn() -> bool:
+    """True when the current turn is being streamed to the client."""
+    return turn_stream_sink.get() is not None
+
+
+def emit_turn_event(event_type: str, **data: Any) -> None:
+    """Push a partial-output event to the current turn's stream, if any."""
+    sink = turn_stream_sink.get()
+    if sink is None:
+        return
+    try:
+        sink({"type": event_type, **data})
+    except Exception as e:
+        print(f"[STAGE EVENTS] Failed to emit {event_type}: {e}")
+
+
+def publish_stage_event(
+    session_id: Optional[str],
+    stage: str,
+    active_agent: str,
+    previous_agent: Optional[str] = None,
+    event_type: str = "agent_transition",
+) -> Optional[Dict[str, Any]]:
+    """Publish an agent transition to the current turn stream and session subscribers."""
+    payload = {
+        "stage": stage,
+        "active_agent": active_agent,
+        "previous_agent": previous_agent,
+        "timestamp": datetime.now().isoformat(),
+    }
+    emit_turn_event(event_type, **payload)
+    if not session_id:
+        return None
+    return stage_event_bus.publish(session_id, {"type": event_type, **payload})
+
+
+def format_sse(event: Optional[Dict[str, Any]]) -> str:
+    """Serialize an event (or a heartbeat for None) in text/event-stream format."""
+    if event is None:
+        return ": keepalive\n\n"
+    data = json.dumps(event, default=str)
+    if "id" in event:
+        return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+    return f"event: {event['type']}\ndata: {data}\n\n"
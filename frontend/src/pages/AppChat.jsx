@@ -162,6 +162,7 @@ export default function AppChat() {
     const [isLoading, setIsLoading] = useState(false)
     const [currentStage, setCurrentStage] = useState('sales')
     const [sanctionLetter, setSanctionLetter] = useState(null)
+    const [letterStatus, setLetterStatus] = useState(null) // 'pending' | 'ready' | 'failed'
     const [applicationStatus, setApplicationStatus] = useState('Initiated')
     const [riskAssessment, setRiskAssessment] = useState(null) // { score, level, factors }
     const [decisionInfo, setDecisionInfo] = useState(null) // { type, reason, source, policy }
@@ -189,6 +190,32 @@ export default function AppChat() {
         messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' })
     }, [messages, isLoading, orchestrationStep])
 
+    // Letters are rendered in the background: keep the file name, and only
+    // enable the download once the job reports "ready"
+    const showSanctionLetter = (data) => {
+        setSanctionLetter(data.sanction_letter)
+        setLetterStatus(data.sanction_letter_status || 'ready')
+    }
+
+    useEffect(() => {
+        if (!sanctionLetter || letterStatus !== 'pending') return
+
+        const timer = setInterval(async () => {
+            try {
+                const response = await fetch(`http://localhost:8000/applications/${sessionIdRef.current}/sanction-letter`)
+                if (!response.ok) return
+                const job = await response.json()
+                if (job.status !== 'pending') {
+                    if (job.file) setSanctionLetter(job.file)
+                    setLetterStatus(job.status)
+                }
+            } catch (err) {
+                // Transient - try again on the next tick
+            }
+        }, 1500)
+        return () => clearInterval(timer)
+    }, [sanctionLetter, letterStatus])
+
     // Orchestration Playback Effect - runs when we have a pending response
     useEffect(() => {
         if (!pendingResponse || !isOrchestrating) return
@@ -244,7 +271,7 @@ export default function AppChat() {
 
             if (data.stage) setCurrentStage(data.stage)
             if (data.application_status) setApplicationStatus(data.application_status)
-            if (data.sanction_letter) setSanctionLetter(data.sanction_letter)
+            if (data.sanction_letter) showSanctionLetter(data)
 
             if (data.risk_score !== null && data.risk_score !== undefined) {
                 setRiskAssessment({
@@ -343,7 +370,7 @@ export default function AppChat() {
 
                 if (data.stage) setCurrentStage(data.stage)
                 if (data.application_status) setApplicationStatus(data.application_status)
-                if (data.sanction_letter) setSanctionLetter(data.sanction_letter)
+                if (data.sanction_letter) showSanctionLetter(data)
 
                 // Show KYC form when entering verification stage
                 if (data.stage === 'verification' && !showKYCForm) {
@@ -927,16 +954,33 @@ export default function AppChat() {
                                             <span className="text-xs text-slate-500">Credit & Risk Assessment Passed</span>
                                         </div>
                                         <div className="flex items-center gap-2">
-                                            <CheckCircle2 size={14} className="text-emerald-500" />
-                                            <span className="text-xs text-slate-500">Sanction Letter Generated</span>
+                                            {letterStatus === 'pending' ? (
+                                                <Loader2 size={14} className="text-slate-400 animate-spin" />
+                                            ) : letterStatus === 'failed' ? (
+                                                <AlertTriangle size={14} className="text-amber-500" />
+                                            ) : (
+                                                <CheckCircle2 size={14} className="text-emerald-500" />
+                                            )}
+                                            <span className="text-xs text-slate-500">
+                                                {letterStatus === 'pending'
+                                                    ? 'Preparing Sanction Letter...'
+                                                    : letterStatus === 'failed'
+                                                        ? 'Sanction Letter will be sent by email'
+                                                        : 'Sanction Letter Generated'}
+                                            </span>
                                         </div>
                                     </div>
                                     <button
                                         onClick={() => window.open(`http://localhost:8000/files/${sanctionLetter}`, '_blank')}
-                                        className="w-full bg-slate-900 text-white py-3 rounded-xl font-bold text-xs tracking-widest uppercase hover:bg-black transition-colors flex items-center justify-center gap-2 group/btn mb-3"
+                                        disabled={letterStatus !== 'ready'}
+                                        className="w-full bg-slate-900 text-white py-3 rounded-xl font-bold text-xs tracking-widest uppercase hover:bg-black transition-colors flex items-center justify-center gap-2 group/btn mb-3 disabled:opacity-50 disabled:cursor-not-allowed disabled:hover:bg-slate-900"
                                     >
-                                        <Download size={16} className="group-hover/btn:animate-bounce" />
-                                        Download Sanction Letter
+                                        {letterStatus === 'pending' ? (
+                                            <Loader2 size={16} className="animate-spin" />
+                                        ) : (
+                                            <Download size={16} className="group-hover/btn:animate-bounce" />
+                                        )}
+                                        {letterStatus === 'pending' ? 'Preparing Letter' : 'Download Sanction Letter'}
                                     </button>
                                     {/* End-of-Flow Closure */}
                                     <div className="text-center pt-3 border-t border-slate-100">
@@ -298,17 +298,28 @@ const ApplicationRow = ({ app, index }) => {
 
 export default function Applications() {
     const [applications, setApplications] = useState([])
+    const [nextCursor, setNextCursor] = useState(null)
+    const [stats, setStats] = useState({ total: 0, by_status: {} })
     const [loading, setLoading] = useState(true)
+    const [loadingMore, setLoadingMore] = useState(false)
     const [error, setError] = useState(null)
 
+    const PAGE_SIZE = 50
+
     const fetchApplications = async () => {
         setLoading(true)
         setError(null)
         try {
-            const response = await fetch('http://localhost:8000/applications')
-            if (!response.ok) throw new Error('Failed to fetch applications')
+            // Cards use server-side counts, not just the pages loaded so far
+            const [response, statsResponse] = await Promise.all([
+                fetch(`http://localhost:8000/applications?limit=${PAGE_SIZE}`),
+                fetch('http://localhost:8000/applications/stats'),
+            ])
+            if (!response.ok || !statsResponse.ok) throw new Error('Failed to fetch applications')
             const data = await response.json()
             setApplications(data.applications || [])
+            setNextCursor(data.next_cursor || null)
+            setStats(await statsResponse.json())
         } catch (err) {
             setError(err.message)
         } finally {
@@ -316,10 +327,30 @@ export default function Applications() {
         }
     }
 
+    // Fetch the next page using the server-provided cursor
+    const fetchMoreApplications = async () => {
+        if (!nextCursor) return
+        setLoadingMore(true)
+        try {
+            const params = new URLSearchParams({ limit: PAGE_SIZE, cursor: nextCursor })
+            const response = await fetch(`http://localhost:8000/applications?${params}`)
+            if (!response.ok) throw new Error('Failed to fetch applications')
+            const data = await response.json()
+            setApplications(prev => [...prev, ...(data.applications || [])])
+            setNextCursor(data.next_cursor || null)
+        } catch (err) {
+            setError(err.message)
+        } finally {
+            setLoadingMore(false)
+        }
+    }
+
     useEffect(() => {
         fetchApplications()
     }, [])
 
+    const countOf = (...statuses) => statuses.reduce((sum, status) => sum + (stats.by_status[status] || 0), 0)
+
     return (
         <div className="min-h-screen bg-slate-50">
             {/* Header */}
@@ -360,24 +391,24 @@ export default function Applications() {
                 {/* Stats Summary */}
                 <div className="grid grid-cols-2 md:grid-cols-4 gap-4 mb-6">
                     <div className="bg-white rounded-xl p-4 border border-slate-200">
-                        <p className="text-2xl font-bold text-slate-900">{applications.length}</p>
+                        <p className="text-2xl font-bold text-slate-900">{stats.total}</p>
                         <p className="text-xs text-slate-500 uppercase tracking-wide">Total Applications</p>
                     </div>
                     <div className="bg-white rounded-xl p-4 border border-slate-200">
                         <p className="text-2xl font-bold text-emerald-600">
-                            {applications.filter(a => a.status === 'Sanctioned' || a.status === 'Approved').length}
+                            {countOf('Sanctioned', 'Approved')}
                         </p>
                         <p className="text-xs text-slate-500 uppercase tracking-wide">Approved</p>
                     </div>
                     <div className="bg-white rounded-xl p-4 border border-slate-200">
                         <p className="text-2xl font-bold text-amber-600">
-                            {applications.filter(a => a.status === 'Initiated' || a.status === 'Verified' || a.status === 'Pending Review').length}
+                            {countOf('Initiated', 'Verified', 'Pending Review')}
                         </p>
                         <p className="text-xs text-slate-500 uppercase tracking-wide">In Progress</p>
                     </div>
                     <div className="bg-white rounded-xl p-4 border border-slate-200">
                         <p className="text-2xl font-bold text-red-600">
-                            {applications.filter(a => a.status === 'Rejected').length}
+                            {countOf('Rejected')}
                         </p>
                         <p className="text-xs text-slate-500 uppercase tracking-wide">Rejected</p>
                     </div>
@@ -434,6 +465,17 @@ export default function Applications() {
                                     ))}
                                 </tbody>
                             </table>
+                            {nextCursor && (
+                                <div className="flex justify-center py-4 border-t border-slate-100">
+                                    <button
+                                        onClick={fetchMoreApplications}
+                                        disabled={loadingMore}
+                                        className="px-4 py-2 text-sm font-medium text-slate-700 bg-white border border-slate-200 rounded-lg hover:bg-slate-50 disabled:opacity-50 transition-colors"
+                                    >
+                                        {loadingMore ? 'Loading...' : 'Load more'}
+                                    </button>
+                                </div>
+                            )}
                         </div>
                     )}
                 </div>